@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import zlib
+import shutil
+import struct
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+log = logging.getLogger("afk-andy")
+
+BACKUP_DIR = os.path.expanduser(os.getenv("BACKUP_DIR", "~/afk-andy/backups"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "48"))
+BACKUP_INTERVAL = float(os.getenv("BACKUP_INTERVAL_MINUTES", "0"))
+BACKUP_WORKERS = int(os.getenv("BACKUP_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+SECTOR = 4096
+REGION_HEADER = 2 * SECTOR
+BLOCK = 4 * 1024 * 1024
+SKIP_FILES = {"session.lock"}
+FLUSH_TIMEOUT = 60
+INDEX_FILE = "index.json"
+SUMMARY_KEYS = ("name", "created", "total_bytes", "changed_files", "new_bytes", "seconds")
+
+
+def split_region(data: bytes) -> list:
+    """Cut an .mca file at chunk boundaries so each chunk is its own piece.
+
+    Unchanged chunks then hash the same across snapshots even when other
+    chunks in the same region were rewritten.
+    """
+    if len(data) < REGION_HEADER:
+        return [data]
+    cuts = {0, REGION_HEADER, len(data)}
+    for (loc,) in struct.iter_unpack(">I", data[:SECTOR]):
+        if loc:
+            start, count = (loc >> 8) * SECTOR, (loc & 0xFF) * SECTOR
+            cuts.add(min(start, len(data)))
+            cuts.add(min(start + count, len(data)))
+    cuts = sorted(cuts)
+    return [data[a:b] for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def split_blocks(data: bytes) -> list:
+    return [data[i:i + BLOCK] for i in range(0, len(data), BLOCK)] or [b""]
+
+
+def object_path(objects_dir: str, digest: str) -> str:
+    return os.path.join(objects_dir, digest[:2], digest)
+
+
+def store_file(path: str, objects_dir: str) -> tuple:
+    """Hash and store one file's pieces. Runs in a worker process.
+
+    Returns (piece digests, bytes of new compressed objects written).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    pieces = split_region(data) if path.endswith(".mca") else split_blocks(data)
+    digests, written = [], 0
+    for piece in pieces:
+        digest = hashlib.sha256(piece).hexdigest()
+        digests.append(digest)
+        dest = object_path(objects_dir, digest)
+        if os.path.exists(dest):
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        packed = zlib.compress(piece, 6)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, dest)
+        written += len(packed)
+    return digests, written
+
+
+def restore_file(dest: str, digests: list, objects_dir: str):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest, "wb") as out:
+        for digest in digests:
+            with open(object_path(objects_dir, digest), "rb") as f:
+                out.write(zlib.decompress(f.read()))
+
+
+def summarize(manifest: dict) -> dict:
+    """A manifest without its per-file piece lists, for listings."""
+    summary = {k: manifest.get(k) for k in SUMMARY_KEYS}
+    summary["file_count"] = len(manifest.get("files", {}))
+    return summary
+
+
+def world_dirs(mc_dir: str) -> list:
+    """World folders for the configured level-name (overworld, nether, end)."""
+    level = "world"
+    try:
+        with open(os.path.join(mc_dir, "server.properties")) as f:
+            for line in f:
+                if line.startswith("level-name="):
+                    level = line.split("=", 1)[1].strip() or level
+    except FileNotFoundError:
+        pass
+    names = [level, f"{level}_nether", f"{level}_the_end"]
+    return [n for n in names if os.path.isdir(os.path.join(mc_dir, n))]
+
+
+class BackupEngine:
+    """Content-addressed, deduplicating world snapshots.
+
+    Files are split into pieces (one per chunk for region files) and stored
+    once under objects/ by SHA-256. A snapshot is a small JSON manifest
+    listing each file's pieces. Files whose size and mtime match the previous
+    snapshot are reused without being read.
+    """
+
+    def __init__(self, mc_dir: str, backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP,
+                 workers: int = BACKUP_WORKERS):
+        self.mc_dir = mc_dir
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, "objects")
+        self.snapshots_dir = os.path.join(backup_dir, "snapshots")
+        self.keep = keep
+        self.workers = workers
+        self.lock = asyncio.Lock()
+        self._schedule_task = None
+
+    def list_snapshots(self) -> list:
+        """Snapshot summaries (everything but the file lists), newest first.
+
+        Read from snapshots/index.json, which is rebuilt from the manifests
+        only when it's missing or doesn't match them.
+        """
+        try:
+            names = sorted((n[:-5] for n in os.listdir(self.snapshots_dir)
+                            if n.endswith(".json") and n != INDEX_FILE), reverse=True)
+        except FileNotFoundError:
+            return []
+        try:
+            with open(os.path.join(self.snapshots_dir, INDEX_FILE)) as f:
+                summaries = json.load(f)
+            if [s["name"] for s in summaries] == names:
+                return summaries
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
+        summaries = [summarize(snap) for snap in map(self.load_snapshot, names) if snap]
+        self._write_index(summaries)
+        return summaries
+
+    def _write_index(self, summaries: list):
+        tmp = os.path.join(self.snapshots_dir, INDEX_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(summaries, f)
+        os.replace(tmp, os.path.join(self.snapshots_dir, INDEX_FILE))
+
+    def load_snapshot(self, name: str):
+        filename = os.path.basename(name) + ".json"
+        if filename == INDEX_FILE:
+            return None
+        path = os.path.join(self.snapshots_dir, filename)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    async def backup(self) -> dict:
+        """Quiesce saving, snapshot the world, then re-enable saving."""
+        from minecraft import server_state, async_rcon, supervisor, READY, STOPPED
+        if server_state() not in (READY, STOPPED):
+            raise RuntimeError(f"Server is {server_state()}, try again once it settles.")
+        async with self.lock:
+            live = server_state() == READY
+            if live:
+                await async_rcon("save-off")
+            try:
+                if live and supervisor.has_console:
+                    flushed = supervisor.expect_line("Saved the game")
+                    try:
+                        response = await async_rcon("save-all flush")
+                        if "Saved the game" not in response:
+                            await asyncio.wait_for(flushed, FLUSH_TIMEOUT)
+                    finally:
+                        flushed.cancel()
+                elif live:
+                    # Adopted JVM: no console to watch, but the flush has run by the time RCON answers
+                    await async_rcon("save-all flush")
+                return await self._snapshot()
+            finally:
+                if live:
+                    await async_rcon("save-on")
+
+    async def _snapshot(self) -> dict:
+        started = time.time()
+        loop = asyncio.get_running_loop()
+        previous = await loop.run_in_executor(None, self.list_snapshots)
+        latest = await loop.run_in_executor(None, self.load_snapshot, previous[0]["name"]) if previous else None
+        prev_files = latest["files"] if latest else {}
+
+        files, todo = await loop.run_in_executor(None, self._scan, prev_files)
+
+        written = 0
+        if todo:
+            os.makedirs(self.objects_dir, exist_ok=True)
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(pool, store_file, path, self.objects_dir)
+                    for _, path in todo
+                ])
+            for (rel, _), (digests, new_bytes) in zip(todo, results):
+                files[rel]["pieces"] = digests
+                written += new_bytes
+
+        name = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        manifest = {
+            "name": name,
+            "created": datetime.utcnow().isoformat(),
+            "files": files,
+            "total_bytes": sum(f["size"] for f in files.values()),
+            "changed_files": len(todo),
+            "new_bytes": written,
+            "seconds": round(time.time() - started, 2),
+        }
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        tmp = os.path.join(self.snapshots_dir, name + ".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(self.snapshots_dir, name + ".json"))
+        await loop.run_in_executor(None, self._write_index, [summarize(manifest)] + previous)
+        log.info(f"Backup {name}: {len(todo)} changed files, {written} new bytes")
+
+        await loop.run_in_executor(None, self.prune)
+        return manifest
+
+    def _scan(self, prev_files: dict) -> tuple:
+        """Walk the world folders; returns (file entries, files that need storing)."""
+        files, todo = {}, []
+        for world in world_dirs(self.mc_dir):
+            for root, _, names in os.walk(os.path.join(self.mc_dir, world)):
+                for name in names:
+                    if name in SKIP_FILES:
+                        continue
+                    path = os.path.join(root, name)
+                    rel = os.path.relpath(path, self.mc_dir)
+                    st = os.stat(path)
+                    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                    old = prev_files.get(rel)
+                    if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                        entry["pieces"] = old["pieces"]
+                    else:
+                        todo.append((rel, path))
+                    files[rel] = entry
+        return files, todo
+
+    def prune(self) -> int:
+        """Drop snapshots past the retention count and unreferenced objects."""
+        snaps = self.list_snapshots()
+        for snap in snaps[self.keep:]:
+            os.remove(os.path.join(self.snapshots_dir, snap["name"] + ".json"))
+        if len(snaps) > self.keep:
+            self._write_index(snaps[:self.keep])
+        live = set()
+        for snap in map(self.load_snapshot, (s["name"] for s in snaps[:self.keep])):
+            for entry in (snap or {}).get("files", {}).values():
+                live.update(entry["pieces"])
+        removed = 0
+        for root, _, names in os.walk(self.objects_dir):
+            for name in names:
+                if name not in live:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+    async def restore(self, name: str) -> tuple:
+        """Restore a snapshot over the world folders. Server must be stopped."""
+        from minecraft import is_server_running
+        if is_server_running():
+            return False, "Stop the server first (`!stop`), then restore."
+        snap = self.load_snapshot(name)
+        if not snap:
+            return False, f"No backup named `{name}`."
+        from minecraft import supervisor, ServerBusy
+        try:
+            # Held for the whole rewrite, so a wake-on-join or !start can't boot a half-restored world
+            with supervisor.maintenance_lock(f"a restore of `{name}`"):
+                async with self.lock:
+                    await asyncio.get_running_loop().run_in_executor(None, self._restore, snap)
+        except ServerBusy as e:
+            return False, str(e)
+        return True, f"Restored `{name}` ({len(snap['files'])} files). Previous world kept as `*.before-restore`."
+
+    def _restore(self, snap: dict):
+        worlds = {rel.split(os.sep, 1)[0] for rel in snap["files"]}
+        for world in worlds:
+            current = os.path.join(self.mc_dir, world)
+            aside = current + ".before-restore"
+            if os.path.exists(aside):
+                shutil.rmtree(aside)
+            if os.path.exists(current):
+                os.rename(current, aside)
+        for rel, entry in snap["files"].items():
+            dest = os.path.join(self.mc_dir, rel)
+            restore_file(dest, entry["pieces"], self.objects_dir)
+            os.utime(dest, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+
+    def start_schedule(self, interval_minutes: float = BACKUP_INTERVAL):
+        """Back up every interval_minutes while the server is up (0 disables)."""
+        if interval_minutes > 0 and self._schedule_task is None:
+            self._schedule_task = asyncio.create_task(self._run_schedule(interval_minutes * 60))
+
+    async def _run_schedule(self, interval: float):
+        from minecraft import is_server_running
+        while True:
+            await asyncio.sleep(interval)
+            if not is_server_running():
+                continue
+            try:
+                await self.backup()
+            except Exception as e:
+                log.error(f"Scheduled backup failed: {e}")
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import codecs
+import signal
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+log = logging.getLogger("afk-andy")
+
+BUILD_WORKERS = int(os.getenv("BUILD_WORKERS", "1"))
+BUILD_TIMEOUT = float(os.getenv("BUILD_TIMEOUT", "300"))
+UPDATE_INTERVAL = 2.0  # seconds between Discord edits while streaming
+KILL_GRACE = 5.0
+PAGE_CHARS = 1800
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed out"
+
+
+@dataclass
+class BuildJob:
+    id: int
+    description: str
+    argv: list
+    cwd: str
+    log_path: str
+    notify: object = None  # async callable(job), called on state changes and new output
+    render: object = None  # callable(line) -> text or None, turns each output line into what's shown
+    state: str = QUEUED
+    returncode: int = None
+    queued_at: float = field(default_factory=time.time)
+    started_at: float = None
+    finished_at: float = None
+    pid: int = None
+    output: str = ""  # tail of the (rendered) output, bounded; the full raw text is in log_path
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED, TIMED_OUT)
+
+    @property
+    def elapsed(self) -> float:
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class BuildQueue:
+    """FIFO queue of CLI build jobs run by a fixed number of workers.
+
+    Each job runs in its own process group so cancel() can take down
+    anything it spawned. Output is streamed as it arrives into the job's
+    tail buffer and its log file under log_dir; notify is called at most
+    every UPDATE_INTERVAL seconds while output is arriving.
+    """
+
+    def __init__(self, log_dir: str, workers: int = BUILD_WORKERS,
+                 timeout: float = BUILD_TIMEOUT):
+        self.log_dir = log_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.jobs = {}
+        self._queue = asyncio.Queue()
+        self._waiting = []  # queued jobs in order, for position reporting
+        self._tasks = []
+        self._cancelled = set()
+        self._procs = {}
+        os.makedirs(log_dir, exist_ok=True)
+        self._next_id = 1 + max(
+            (int(name[:-4]) for name in os.listdir(log_dir)
+             if name.endswith(".log") and name[:-4].isdigit()),
+            default=0,
+        )
+
+    def submit(self, description: str, argv: list, cwd: str, notify=None, render=None) -> BuildJob:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        job = BuildJob(
+            id=self._next_id, description=description, argv=argv, cwd=cwd,
+            log_path=os.path.join(self.log_dir, f"{self._next_id}.log"), notify=notify, render=render,
+        )
+        self._next_id += 1
+        self.jobs[job.id] = job
+        self._waiting.append(job)
+        self._queue.put_nowait(job)
+        return job
+
+    def position(self, job: BuildJob) -> int:
+        """1-based place in the queue, 0 once it has started."""
+        try:
+            return self._waiting.index(job) + 1
+        except ValueError:
+            return 0
+
+    def running(self) -> list:
+        return [j for j in self.jobs.values() if j.state == RUNNING]
+
+    def queued(self) -> list:
+        return list(self._waiting)
+
+    def latest(self) -> BuildJob:
+        return self.jobs[max(self.jobs)] if self.jobs else None
+
+    async def cancel(self, job: BuildJob):
+        if job.finished:
+            return
+        if job.state == QUEUED:
+            self._waiting.remove(job)
+            self._finish(job, CANCELLED)
+            await self._notify(job)
+            return
+        self._cancelled.add(job.id)
+        await self._kill(job)
+
+    async def close(self):
+        for job in self.running():
+            await self.cancel(job)
+        for task in self._tasks:
+            task.cancel()
+
+    def read_page(self, job_id: int, page: int = 1):
+        """(text, page, pages) of a job's saved output, PAGE_CHARS per page."""
+        path = os.path.join(self.log_dir, f"{job_id}.log")
+        with open(path, errors="replace") as f:
+            text = f.read()
+        pages, current = [], ""
+        for line in text.splitlines(keepends=True):
+            while len(line) > PAGE_CHARS:
+                pages.append(current + line[:PAGE_CHARS - len(current)])
+                line, current = line[PAGE_CHARS - len(current):], ""
+            if len(current) + len(line) > PAGE_CHARS:
+                pages.append(current)
+                current = ""
+            current += line
+        if current or not pages:
+            pages.append(current)
+        page = min(max(page, 1), len(pages))
+        return pages[page - 1], page, len(pages)
+
+    # -- internals --
+
+    def _finish(self, job: BuildJob, state: str):
+        job.state = state
+        job.finished_at = time.time()
+
+    async def _notify(self, job: BuildJob):
+        if job.notify:
+            try:
+                await job.notify(job)
+            except Exception as e:
+                log.error(f"Build #{job.id} update failed: {e}")
+
+    async def _kill(self, job: BuildJob):
+        """SIGTERM the job's process group, SIGKILL it if still alive after KILL_GRACE."""
+        proc = self._procs.get(job.id)
+        if proc is None:
+            return
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(proc.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(asyncio.shield(proc.wait()), KILL_GRACE)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.finished:
+                continue
+            self._waiting.remove(job)
+            try:
+                await self._run(job)
+            except Exception as e:
+                log.error(f"Build #{job.id} crashed: {e}")
+                job.output += f"\n[bot] {e}\n"
+                self._finish(job, FAILED)
+            for waiting in self._waiting:
+                await self._notify(waiting)
+            await self._notify(job)
+
+    async def _run(self, job: BuildJob):
+        job.state = RUNNING
+        job.started_at = time.time()
+        await self._notify(job)
+        with open(job.log_path, "w") as logfile:
+            logfile.write(f"$ build #{job.id}: {job.description}\n")
+            proc = await asyncio.create_subprocess_exec(
+                *job.argv, cwd=job.cwd, start_new_session=True,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            )
+            job.pid = proc.pid
+            self._procs[job.id] = proc
+            try:
+                await asyncio.wait_for(self._stream(job, proc, logfile), self.timeout)
+                job.returncode = await proc.wait()
+            except asyncio.TimeoutError:
+                await self._kill(job)
+                job.returncode = await proc.wait()
+                self._finish(job, TIMED_OUT)
+                return
+            finally:
+                self._procs.pop(job.id, None)
+                logfile.write(f"\n[exit {proc.returncode}]\n")
+
+        if job.id in self._cancelled:
+            self._finish(job, CANCELLED)
+        else:
+            self._finish(job, DONE if job.returncode == 0 else FAILED)
+
+    async def _stream(self, job: BuildJob, proc, logfile):
+        last_update = time.monotonic()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")  # a character can span two reads
+        partial = ""
+        while True:
+            chunk = await proc.stdout.read(4096)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                # The log keeps the raw output for debugging; render only shapes what Discord sees
+                logfile.write(text)
+                logfile.flush()
+            if job.render:
+                lines = (partial + text).split("\n")
+                partial = lines.pop() if chunk else ""
+                shown = (job.render(line) for line in lines)
+                text = "".join(t + "\n" for t in shown if t)
+            if text:
+                job.output = (job.output + text)[-4 * PAGE_CHARS:]
+            if not chunk:
+                return
+            if time.monotonic() - last_update >= UPDATE_INTERVAL:
+                last_update = time.monotonic()
+                await self._notify(job)
+
+
+def render_stream_json(line: str):
+    """One line of `claude -p --output-format stream-json --verbose` as readable text (None to skip)."""
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return line.rstrip() or None  # not an event: the CLI's own errors, pass them through
+    if not isinstance(event, dict):
+        return None
+    kind = event.get("type")
+    if kind == "assistant":
+        parts = []
+        for block in event.get("message", {}).get("content", []):
+            if block.get("type") == "text" and block.get("text", "").strip():
+                parts.append(block["text"].strip())
+            elif block.get("type") == "tool_use":
+                args = block.get("input") or {}
+                detail = args.get("command") or args.get("file_path") or args.get("pattern") or ""
+                parts.append(f"> {block.get('name')} {str(detail).splitlines()[0][:200] if detail else ''}".rstrip())
+        return "\n".join(parts) or None
+    if kind == "user":
+        for block in event.get("message", {}).get("content", []):
+            if isinstance(block, dict) and block.get("type") == "tool_result" and block.get("is_error"):
+                content = block.get("content")
+                if isinstance(content, list):
+                    content = " ".join(c.get("text", "") for c in content if isinstance(c, dict))
+                return f"  ! {str(content).strip().splitlines()[0][:200] if content else 'tool error'}"
+        return None
+    if kind == "result":
+        cost = event.get("total_cost_usd")
+        return (f"[{event.get('subtype', 'done')}: {event.get('num_turns', '?')} turns"
+                + (f", ${cost:.2f}" if isinstance(cost, (int, float)) else "") + "]")
+    return None
@@ -0,0 +1,170 @@
+import os
+import re
+import json
+import time
+import logging
+
+log = logging.getLogger("afk-andy")
+
+CHAT_RESPONSES_FILE = os.path.expanduser(os.getenv("CHAT_RESPONSES_FILE", "~/afk-andy/memory/chat-responses.json"))
+RELOAD_CHECK_SECONDS = 2.0
+
+# Casual chat responses for non-command messages
+CHAT_RESPONSES = {
+    "greetings": {
+        "triggers": ["hey andy", "hi andy", "yo andy", "sup andy", "hello andy", "whats up andy", "hey", "yo", "sup", "hello"],
+        "replies": [
+            "Yo! What's up?",
+            "Hey! Need something?",
+            "What's good! Server's running smooth.",
+            "Sup! I'm here. `!status` to check the server.",
+            "Hey hey! What's the move?",
+        ],
+    },
+    "thanks": {
+        "triggers": ["thanks andy", "thank you andy", "thanks", "thank you", "thx", "ty", "good job", "nice work", "nice one", "well done", "great job", "looks good", "perfect", "awesome"],
+        "replies": [
+            "Anytime! That's what I'm here for.",
+            "No problem. Got more for me?",
+            "Glad you like it! What's next?",
+            "Thanks! I try. Want me to keep going?",
+            "Appreciate it! I'm ready for the next one.",
+        ],
+    },
+    "how": {
+        "triggers": ["how are you", "how you doing", "you good", "you alive"],
+        "replies": [
+            "I'm good! Server's warm, blocks are flowing. You?",
+            "Living the dream. Literally. I'm a bot.",
+            "Running smooth. Server's up and ready.",
+            "Online and caffeinated. Well, electrically speaking.",
+        ],
+    },
+    "what": {
+        "triggers": ["what can you do", "what do you do", "help", "commands"],
+        "replies": [
+            "Here's what I got:\n`!start` - Start the MC server\n`!stop` - Stop the server\n`!restart` - Restart the server\n`!status` - Server info + players\n`!players` - Who's online\n`!whitelist add/remove/sync/list` - Manage whitelist (many names at once)\n`!ops add/remove/sync/list` - Manage operators\n`!cmd <command>` - Run any MC command\n`!say <message>` - Chat in-game from Discord\n`!backup` - Back up the world (`!backup list`, `!restore <name>`)\n`!yo` - Just say hi\n\nOr just talk to me, I'm not just a command bot!",
+        ],
+    },
+    "opinion": {
+        "triggers": ["what do you think", "thoughts?", "your opinion", "how does it look", "is it good"],
+        "replies": [
+            "I think it's looking solid. But I'm biased - I built it.",
+            "Honestly? Pretty clean. But you tell me - you're the boss.",
+            "I dig it. Want me to change anything?",
+            "It's getting there! What do you think needs work?",
+        ],
+    },
+    "bored": {
+        "triggers": ["im bored", "i'm bored", "nothing to do", "boring"],
+        "replies": [
+            "Bored? Hop on the server! `!start` if it's not running.",
+            "You're bored but the server's right here? Go mine something.",
+            "Bored? Sounds like you need to go punch some trees.",
+        ],
+    },
+    "funny": {
+        "triggers": ["tell me a joke", "joke", "make me laugh", "lol", "lmao", "haha"],
+        "replies": [
+            "Why do programmers prefer dark mode? Because light attracts bugs.",
+            "I'd tell you a UDP joke, but you might not get it.",
+            "A SQL query walks into a bar, walks up to two tables and asks... 'Can I JOIN you?'",
+            "There are only 10 types of people in the world. Those who understand binary, and those who don't.",
+            "Why was the JavaScript developer sad? Because he didn't Node how to Express himself.",
+        ],
+    },
+}
+
+# Fallback when nothing matches
+FALLBACK_REPLIES = [
+    "Not sure what you mean, but I'm here! Need `!status`?",
+    "I'm better at managing servers than conversations, ngl. Try `!status`.",
+    "Hmm, didn't catch that. `!start` or `!status` if you need the server.",
+    "I hear you. Want me to do something? Try `!start` or `!status`.",
+]
+
+
+class TriggerMatcher:
+    """All chat triggers compiled into one regex.
+
+    Triggers match on word boundaries. When several match, the most specific
+    one wins: more words first, then longer text, then table order. So
+    "thanks andy" beats "hey" no matter where the categories sit.
+    """
+
+    def __init__(self, table: dict):
+        self.table = table
+        self.priority = {}
+        for order, (category, spec) in enumerate(table.items()):
+            for trigger in spec["triggers"]:
+                key = " ".join(trigger.lower().split())
+                rank = (len(key.split()), len(key), -order)
+                if key not in self.priority or rank > self.priority[key][0]:
+                    self.priority[key] = (rank, category)
+        # Longest first so the regex prefers the longer trigger at a given position
+        keys = sorted(self.priority, key=len, reverse=True)
+        alternation = "|".join(r"\s+".join(map(re.escape, k.split())) for k in keys)
+        self.pattern = re.compile(r"(?<!\w)(?:" + alternation + r")(?!\w)") if keys else None
+
+    def match(self, text: str):
+        """Return the winning category name for a message, or None."""
+        if self.pattern is None:
+            return None
+        best = None
+        for m in self.pattern.finditer(text.lower()):
+            entry = self.priority[" ".join(m.group().split())]
+            if best is None or entry[0] > best[0]:
+                best = entry
+        return best[1] if best else None
+
+
+class ChatResponder:
+    """Trigger table plus compiled matcher, reloaded when the config file changes.
+
+    The file (JSON, same shape as CHAT_RESPONSES) is optional; without it
+    the built-in table is used.
+    """
+
+    def __init__(self, path: str = CHAT_RESPONSES_FILE, default: dict = CHAT_RESPONSES):
+        self.path = path
+        self.default = default
+        self.table = default
+        self.matcher = TriggerMatcher(default)
+        self._mtime = None
+        self._checked = 0.0
+        self.maybe_reload(force=True)
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now - self._checked < RELOAD_CHECK_SECONDS:
+            return False
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        table = self.default
+        if mtime is not None:
+            try:
+                with open(self.path) as f:
+                    table = json.load(f)
+                matcher = TriggerMatcher(table)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                log.error(f"Bad chat responses file {self.path}: {e}")
+                return False
+        else:
+            matcher = TriggerMatcher(table)
+        self.table, self.matcher = table, matcher
+        log.info(f"Loaded {len(matcher.priority)} chat triggers")
+        return True
+
+    def reply_for(self, text: str):
+        """(category, replies) for the best matching trigger, or None."""
+        self.maybe_reload()
+        category = self.matcher.match(text)
+        if category is None:
+            return None
+        return category, self.table[category]["replies"]
@@ -1,5 +1,5 @@
 import os
-import subprocess
+import time
 import random
 import discord
 from discord.ext import commands
@@ -7,9 +7,12 @@ from datetime import datetime
 import asyncio
 import logging
 
+from utils import git_sync, GIT_AUTO_SYNC
+
 log = logging.getLogger("afk-andy")
 
 PROJECT_DIR = os.path.expanduser("~/afk-andy")
+MESSAGE_LIMIT = 2000  # Discord's cap on one message
 
 # Personality lines
 START_LINES = [
@@ -43,14 +46,6 @@ ACK_LINES = [
     "Copy. Let me cook.",
 ]
 
-PROGRESS_LINES = [
-    "Thinking about the best approach...",
-    "Running some commands...",
-    "Almost there...",
-    "Figuring it out...",
-    "Working on it...",
-]
-
 DONE_LINES = [
     "Done! Here's what I did:",
     "All wrapped up:",
@@ -59,92 +54,289 @@ DONE_LINES = [
 
 
 def setup_commands(bot: commands.Bot):
+    from metrics import instrument_commands
+    instrument_commands(bot)
+
+    async def resolve(ctx, name: str = None):
+        """Supervisor for an instance name (default instance if None); None after replying if unknown."""
+        sup = bot.instances.get(name)
+        if sup is None:
+            await ctx.send(f"No instance called `{name}`. Have: {', '.join(bot.instances.names)}")
+        return sup
+
+    def label(sup) -> str:
+        return f"`{sup.name}` " if bot.instances.multi else ""
 
     @bot.command(name="start")
-    async def start_cmd(ctx):
-        """Start the Minecraft server."""
-        from minecraft import start_server
+    async def start_cmd(ctx, instance: str = None):
+        """Start the Minecraft server: !start [instance]"""
+        sup = await resolve(ctx, instance)
+        if sup is None:
+            return
         await ctx.send(random.choice(START_LINES))
-        success, msg = start_server()
-        if success:
-            await ctx.send("Server is starting. Give it 30-60 seconds to fully load, then `!status` to check.")
-        else:
+        success, msg = await sup.start()
+        if not success:
             await ctx.send(f"{random.choice(FAIL_LINES)} {msg}")
+            return
+        await ctx.send(f"Server {label(sup)}is starting. I'll shout when it's done loading.")
+        if await sup.wait_ready(300):
+            await ctx.send(f"Server {label(sup)}is up! Loaded in {sup.boot_seconds:.1f}s.")
+        elif sup.exit_code is not None:
+            await ctx.send(f"{random.choice(FAIL_LINES)} server exited during boot (code {sup.exit_code}).")
+        else:
+            await ctx.send("Still loading after 5 minutes... something's slow. Try `!status` in a bit.")
 
     @bot.command(name="stop")
-    async def stop_cmd(ctx):
-        """Stop the Minecraft server."""
-        from minecraft import stop_server
+    async def stop_cmd(ctx, instance: str = None):
+        """Stop the Minecraft server: !stop [instance]"""
+        sup = await resolve(ctx, instance)
+        if sup is None:
+            return
         await ctx.send(random.choice(STOP_LINES))
-        success, msg = stop_server()
+        success, msg = await sup.stop()
         await ctx.send(msg)
 
     @bot.command(name="restart")
-    async def restart_cmd(ctx):
-        """Restart the Minecraft server."""
-        from minecraft import stop_server, start_server, is_server_running
+    async def restart_cmd(ctx, instance: str = None):
+        """Restart the Minecraft server: !restart [instance]"""
+        from minecraft import restart_server
+        sup = await resolve(ctx, instance)
+        if sup is None:
+            return
         await ctx.send(random.choice(RESTART_LINES))
-        if is_server_running():
-            stop_server()
-            await asyncio.sleep(10)
-        success, msg = start_server()
+        success, msg = await restart_server(target=sup)
         if success:
-            await ctx.send("Server is coming back up! Give it 30-60 seconds.")
+            await ctx.send(msg)
         else:
             await ctx.send(f"{random.choice(FAIL_LINES)} {msg}")
 
-    @bot.command(name="status")
-    async def status_cmd(ctx):
-        """Show server status."""
-        from minecraft import is_server_running, async_rcon
-        if not is_server_running():
-            await ctx.send("Server is **offline**. Use `!start` to fire it up.")
+    @bot.command(name="startbench")
+    async def startbench_cmd(ctx, seconds: int = 60):
+        """Boot every JVM profile on this world and compare: !startbench [sample seconds]"""
+        from minecraft import is_server_running, supervisor
+        from jvm import PROFILES, run_startbench, format_startbench
+        if is_server_running():
+            await ctx.send("Stop the server first (`!stop`). The bench boots it once per profile.")
             return
-        try:
-            players = await async_rcon("list")
-            embed = discord.Embed(title="Server Status", color=0x55FF55, timestamp=datetime.utcnow())
-            embed.add_field(name="State", value="Online", inline=True)
-            embed.add_field(name="Players", value=players, inline=False)
+        await ctx.send(f"Benchmarking {', '.join(PROFILES)} — {seconds}s of MSPT sampling each. This takes a while.")
+        results = await run_startbench(supervisor, list(PROFILES), seconds, progress=ctx.send)
+        await ctx.send(f"```\n{format_startbench(results)}\n```\nServer left stopped. Set `MC_JVM_PROFILE` to pick one.")
+
+    @bot.command(name="status")
+    async def status_cmd(ctx, *args):
+        """Show server status: !status [instance] [fresh]. With several instances and no name, shows all."""
+        from minecraft import READY
+        fresh = "fresh" in args
+        names = [a for a in args if a != "fresh"]
+        if not names and bot.instances.multi:
+            snaps = await bot.instances.snapshots(force=fresh)
+            embed = discord.Embed(title="Servers", color=0x55FF55, timestamp=datetime.utcnow())
+            for name, snap in snaps.items():
+                if isinstance(snap, Exception):
+                    value = f"poll failed: `{snap}`"
+                elif snap.state != READY:
+                    value = snap.state.capitalize()
+                elif snap.error:
+                    value = f"Running, RCON not answering: `{snap.error}`"
+                else:
+                    tps = f"{snap.tps[0]:.1f} TPS" if snap.tps else "TPS n/a"
+                    mspt = f"{snap.mspt[0]:.1f} MSPT" if snap.mspt else "MSPT n/a"
+                    players = ", ".join(snap.players) or "nobody"
+                    value = f"Online • {tps} • {mspt}\n{len(snap.players)}/{snap.max_players or '?'}: {players}"
+                embed.add_field(name=name, value=value[:1024], inline=False)
             embed.set_footer(text="AFK Andy MC")
             await ctx.send(embed=embed)
-        except Exception as e:
-            await ctx.send(f"Server is running but RCON isn't responding yet: `{e}`\nMight still be booting -- try again in a bit.")
+            return
+
+        sup = await resolve(ctx, names[0] if names else None)
+        if sup is None:
+            return
+        snap = await bot.instances.poller(sup.name).get(force=fresh)
+        if not snap.online:
+            start_hint = f"!start {sup.name}" if bot.instances.multi else "!start"
+            await ctx.send(f"Server {label(sup)}is **offline**. Use `{start_hint}` to fire it up.")
+            return
+        if snap.state != READY:
+            await ctx.send(f"Server {label(sup)}is **{snap.state}**. Hang tight.")
+            return
+        if snap.error:
+            await ctx.send(f"Server is running but RCON isn't responding yet: `{snap.error}`\nMight still be booting -- try again in a bit.")
+            return
+        title = f"Server Status: {sup.name}" if bot.instances.multi else "Server Status"
+        embed = discord.Embed(title=title, color=0x55FF55, timestamp=datetime.utcfromtimestamp(snap.timestamp))
+        embed.add_field(name="State", value="Online", inline=True)
+        if snap.tps:
+            embed.add_field(name="TPS (1m/5m/15m)", value=" / ".join(f"{t:.1f}" for t in snap.tps), inline=True)
+        if snap.mspt:
+            embed.add_field(name="MSPT (5s/10s/1m)", value=" / ".join(f"{m:.1f}" for m in snap.mspt), inline=True)
+        embed.add_field(name="Players", value=snap.raw_list or "(none)", inline=False)
+        embed.set_footer(text=f"AFK Andy MC • {snap.age:.0f}s old")
+        await ctx.send(embed=embed)
 
     @bot.command(name="players", aliases=["list"])
-    async def players_cmd(ctx):
-        """Show online players."""
-        from minecraft import is_server_running, async_rcon
-        if not is_server_running():
+    async def players_cmd(ctx, mode: str = None):
+        """Show online players. `!players fresh` skips the cache."""
+        snap = await bot.poller.get(force=mode == "fresh")
+        if not snap.online:
             await ctx.send("Server is offline. No one's playing.")
             return
-        try:
-            result = await async_rcon("list")
-            await ctx.send(result)
-        except Exception as e:
-            await ctx.send(f"Couldn't check players: `{e}`")
+        if snap.error:
+            await ctx.send(f"Couldn't check players: `{snap.error}`")
+            return
+        await ctx.send(snap.raw_list or f"Server is {snap.state}, no player list yet.")
 
-    @bot.command(name="whitelist")
-    async def whitelist_cmd(ctx, action: str = None, player: str = None):
-        """Manage the whitelist: !whitelist add/remove/list <player>"""
-        from minecraft import async_rcon
-        if not action:
-            await ctx.send("Usage: `!whitelist add <name>`, `!whitelist remove <name>`, `!whitelist list`")
+    @bot.command(name="governor", aliases=["gov"])
+    async def governor_cmd(ctx, action: str = "status", arg: str = None):
+        """Lag governor: !governor [status|on|off|dryrun on/off|reset]"""
+        from datetime import datetime as dt
+        gov = bot.governor
+        if action == "on":
+            gov.start()
+            await ctx.send("Governor on." + (" Dry run: changes are only reported until `!governor dryrun off`."
+                                             if gov.dry_run else ""))
+        elif action == "off":
+            gov.stop()
+            await ctx.send("Governor off. Active mitigations stay in place until `!governor reset`.")
+        elif action == "dryrun" and arg in ("on", "off"):
+            gov.dry_run = arg == "on"
+            await ctx.send(f"Dry run {'on: changes are only reported' if gov.dry_run else 'off: changes are applied'}.")
+        elif action == "reset":
+            undone = await gov.reset()
+            await ctx.send(f"Undid {undone} mitigation(s)." if undone else "Nothing to undo.")
+        elif action == "status":
+            s = gov.status()
+            ladder = " → ".join(f"**{n}**" if n in s["active"] else n for n in s["ladder"])
+            now = f"{s['mspt']:.1f} MSPT" if s["mspt"] is not None else "no sample yet"
+            if s["entities"] is not None:
+                now += f", {s['entities']} entities"
+            lines = [
+                f"**Governor** {'on' if s['enabled'] else 'off'}{' (dry run)' if s['dry_run'] else ''} — "
+                f"step {s['level']}/{len(s['ladder'])}, budget {s['budget']:.0f}ms, now {now}",
+                f"Ladder: {ladder}",
+            ]
+            lines += [f"`{dt.fromtimestamp(ts).strftime('%H:%M')}` {text}" for ts, text in s["history"][-5:]]
+            await ctx.send("\n".join(lines))
+        else:
+            await ctx.send("Usage: `!governor [status|on|off|dryrun on|off|reset]`")
+
+    @bot.command(name="stats")
+    async def stats_cmd(ctx, player: str = None):
+        """Playtime, sessions and last seen for one player: !stats <player>"""
+        from sessions import format_duration, format_ago
+        if not player:
+            await ctx.send("Usage: `!stats <player>`")
+            return
+        s = bot.sessions.stats(player)
+        if s is None:
+            await ctx.send(f"Never seen **{player}** on the server.")
+            return
+        seen = ("online now, for " + format_duration(time.time() - s["online_since"])) if s["online_since"] \
+            else "last seen " + format_ago(s["last_seen"])
+        await ctx.send(
+            f"**{s['name']}** — {seen}\n"
+            f"Playtime: {format_duration(s['total'])} total, {format_duration(s['week'])} in the last 7 days\n"
+            f"Sessions: {s['sessions']} (longest {format_duration(s['longest'])}), "
+            f"first seen {datetime.fromtimestamp(s['first_seen']).strftime('%Y-%m-%d')}"
+        )
+
+    @bot.command(name="top")
+    async def top_cmd(ctx, what: str = "playtime", window: str = None):
+        """Playtime leaderboard: !top playtime [7d|30d]"""
+        from sessions import format_duration
+        if what != "playtime":
+            await ctx.send("Usage: `!top playtime [7d|30d]`")
+            return
+        days = None
+        if window:
+            if not window.endswith("d") or not window[:-1].isdigit() or int(window[:-1]) < 1:
+                await ctx.send("Window is in days, like `7d` or `30d`.")
+                return
+            days = int(window[:-1])
+        ranked = bot.sessions.top(days)
+        if not ranked:
+            await ctx.send("No playtime recorded yet.")
+            return
+        lines = [f"{i}. **{name}** — {format_duration(seconds)}" for i, (name, seconds) in enumerate(ranked, 1)]
+        await ctx.send(f"**Top playtime ({f'last {days} days' if days else 'all time'})**\n" + "\n".join(lines))
+
+    @bot.command(name="lastseen", aliases=["seen"])
+    async def lastseen_cmd(ctx, player: str = None):
+        """When someone was last on: !lastseen [player] (recent players if no name)"""
+        from sessions import format_ago
+        rows = bot.sessions.last_seen(player)
+        if not rows:
+            await ctx.send(f"Never seen **{player}** on the server." if player else "Nobody's played yet.")
             return
+        await ctx.send("\n".join(
+            f"**{name}** — {'online now' if online else format_ago(ts)}" for name, ts, online in rows))
+
+    @bot.command(name="perf")
+    async def perf_cmd(ctx, window: str = "1h"):
+        """TPS/MSPT summary from recorded samples: !perf [15m|1h|24h|7d]"""
+        from perf import parse_window
+        try:
+            seconds = parse_window(window)
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        s = bot.perf.summary(seconds)
+        if not s["samples"]:
+            await ctx.send(f"No samples in the last {window} yet.")
+            return
+        await ctx.send(
+            f"**Last {window}** ({s['samples']} samples)\n"
+            f"MSPT min/avg/p95/max: {s['mspt_min']:.1f} / {s['mspt_avg']:.1f} / "
+            f"{s['mspt_p95']:.1f} / {s['mspt_max']:.1f} ms\n"
+            f"TPS avg {s['tps_avg']:.1f}, worst {s['tps_min']:.1f} • {s['spikes']} spikes over {bot.perf.budget:.0f}ms"
+        )
+
+    async def manage_list(ctx, kind: str, args: str):
+        from minecraft import supervisor
+        from roster import PlayerList, parse_names, format_result
+        usage = (f"Usage: `!{kind} list`, `!{kind} add <names...>`, `!{kind} remove <names...>`, "
+                 f"`!{kind} sync <names...>` (or attach a file, one name per line)")
+        action, _, rest = (args or "").strip().partition(" ")
         action = action.lower()
+        players = PlayerList(supervisor.mc_dir, kind)
         if action == "list":
-            try:
-                result = await async_rcon("whitelist list")
-                await ctx.send(result)
-            except Exception as e:
-                await ctx.send(f"Failed: `{e}`")
-        elif action in ("add", "remove") and player:
-            try:
-                result = await async_rcon(f"whitelist {action} {player}")
-                await ctx.send(result)
-            except Exception as e:
-                await ctx.send(f"Failed: `{e}`")
+            names = players.names()
+            label = "Whitelist" if kind == "whitelist" else "Operators"
+            await ctx.send(f"**{label}** ({len(names)}): {', '.join(names)}" if names else f"{label} is empty.")
+            return
+        if action not in ("add", "remove", "sync"):
+            await ctx.send(usage)
+            return
+        text = rest
+        for attachment in ctx.message.attachments:
+            text += "\n" + (await attachment.read()).decode("utf-8", errors="replace")
+        names, invalid = parse_names(text)
+        if not names:
+            await ctx.send(usage if not invalid else f"No valid player names in: {', '.join(invalid)}")
+            return
+        if action == "add":
+            to_add, to_remove = players.diff(names)
+        elif action == "remove":
+            to_add, to_remove = [], [n for n in names if players.has(n)]
         else:
-            await ctx.send("Usage: `!whitelist add <name>` or `!whitelist remove <name>`")
+            to_add, to_remove = players.diff(names, prune=True)
+        try:
+            result = await players.apply(to_add, to_remove, supervisor.rcon_batch)
+        except Exception as e:
+            await ctx.send(f"Failed: `{e}`")
+            return
+        if action == "remove":
+            result["unchanged"] += [n for n in names if n not in to_remove]
+        await ctx.send(format_result(kind, result, invalid))
+
+    @bot.command(name="whitelist")
+    async def whitelist_cmd(ctx, *, args: str = None):
+        """Manage the whitelist: !whitelist list, or add/remove/sync <names...> in one go"""
+        await manage_list(ctx, "whitelist", args)
+
+    @bot.command(name="ops")
+    async def ops_cmd(ctx, *, args: str = None):
+        """Manage operators: !ops list, or add/remove/sync <names...> in one go"""
+        await manage_list(ctx, "ops", args)
 
     @bot.command(name="cmd")
     async def cmd_cmd(ctx, *, command: str = None):
@@ -174,116 +366,257 @@ def setup_commands(bot: commands.Bot):
             await ctx.send(f"Couldn't send: `{e}`")
 
     @bot.command(name="backup")
-    async def backup_cmd(ctx):
-        """Save the world."""
-        from minecraft import is_server_running, async_rcon
-        if not is_server_running():
-            await ctx.send("Server is offline, nothing to back up.")
+    async def backup_cmd(ctx, action: str = None):
+        """Snapshot the world: !backup, !backup list"""
+        if action == "list":
+            snaps = await asyncio.get_running_loop().run_in_executor(None, bot.backups.list_snapshots)
+            if not snaps:
+                await ctx.send("No backups yet. `!backup` to make one.")
+                return
+            lines = [
+                f"`{s['name']}` — {s['total_bytes'] / 1e6:.0f} MB world, {s['new_bytes'] / 1e6:.1f} MB new"
+                for s in snaps[:15]
+            ]
+            await ctx.send("**Backups (newest first):**\n" + "\n".join(lines))
+            return
+        await ctx.send("Backing up the world...")
+        try:
+            snap = await bot.backups.backup()
+        except Exception as e:
+            await ctx.send(f"Backup failed: `{e}`")
+            return
+        await ctx.send(
+            f"Backup `{snap['name']}` done in {snap['seconds']:.1f}s: "
+            f"{snap['changed_files']} changed files, {snap['new_bytes'] / 1e6:.1f} MB new data."
+        )
+
+    @bot.command(name="restore")
+    async def restore_cmd(ctx, name: str = None):
+        """Restore a world backup: !restore <name>"""
+        if not name:
+            await ctx.send("Which one? Usage: `!restore <name>` (see `!backup list`)")
+            return
+        await ctx.send(f"Restoring `{name}`...")
+        try:
+            success, msg = await bot.backups.restore(name)
+        except Exception as e:
+            await ctx.send(f"Restore failed: `{e}`")
+            return
+        await ctx.send(msg if success else f"{random.choice(FAIL_LINES)} {msg}")
+
+    @bot.command(name="world")
+    async def world_cmd(ctx, action: str = None, confirm: str = None):
+        """Region file stats: !world, !world prune [confirm]"""
+        import region
+        from minecraft import MC_DIR
+        if action == "prune" and confirm == "confirm":
+            await ctx.send("Pruning unvisited chunks...")
+            try:
+                success, msg = await region.prune(MC_DIR)
+            except Exception as e:
+                await ctx.send(f"Prune failed: `{e}`")
+                return
+            await ctx.send(msg if success else f"{random.choice(FAIL_LINES)} {msg}")
             return
-        await ctx.send("Saving world...")
+        await ctx.send("Scanning region files...")
         try:
-            await async_rcon("save-all")
-            await asyncio.sleep(3)
-            await ctx.send("World saved!")
+            results = await region.analyze(MC_DIR)
         except Exception as e:
-            await ctx.send(f"Save failed: `{e}`")
+            await ctx.send(f"Scan failed: `{e}`")
+            return
+        summary = region.format_summary(region.summarize(results))
+        await ctx.send(f"```\n{summary}\n```")
+        if action == "prune":
+            await ctx.send("That's a dry run. `!stop` the server, then `!world prune confirm` to delete those chunks.")
+
+    @bot.command(name="logs")
+    async def logs_cmd(ctx, *, query: str = None):
+        """Search server logs, archives included: !logs <regex> [--since 2d|2026-01-31] [--player name], !logs page <n>"""
+        import shlex
+        from logsearch import parse_since, format_page
+        usage = "Usage: `!logs <pattern> [--since 2d] [--player name]`, then `!logs page 2` for more."
+        if not query:
+            await ctx.send(usage)
+            return
+        words = query.split()
+        if words[0] == "page" and len(words) == 2 and words[1].isdigit():
+            last = bot.log_results.get(ctx.channel.id)
+            if last is None:
+                await ctx.send("No search to page through yet. " + usage)
+                return
+            await ctx.send(format_page(last[1], int(words[1]), last[0]))
+            return
+        try:
+            tokens = shlex.split(query)
+        except ValueError:
+            tokens = words
+        pattern, since, player = [], None, None
+        try:
+            while tokens:
+                token = tokens.pop(0)
+                if token == "--since":
+                    since = parse_since(tokens.pop(0))
+                elif token == "--player":
+                    player = tokens.pop(0)
+                else:
+                    pattern.append(token)
+        except (IndexError, ValueError) as e:
+            await ctx.send(f"{e or 'Missing value.'} {usage}")
+            return
+        pattern = " ".join(pattern) or "."
+        result = await bot.log_search.search(pattern, player=player, since=since)
+        bot.log_results[ctx.channel.id] = (pattern, result)
+        await ctx.send(format_page(result, 1, pattern))
+
+    @bot.command(name="pregen")
+    async def pregen_cmd(ctx, action: str = None, *args):
+        """Pre-generate chunks around spawn or x z: !pregen <radius> [x z] [dimension], !pregen status|pause|resume|cancel"""
+        job = bot.pregen
+        if action in (None, "status"):
+            await ctx.send(job.status())
+            return
+        if action == "pause":
+            job.pause()
+            await ctx.send(f"Paused. {job.status()}")
+            return
+        if action == "resume":
+            job.resume()
+            await ctx.send(f"Resuming. {job.status()}" if job.pending else job.status())
+            return
+        if action == "cancel":
+            job.cancel()
+            await ctx.send("Pre-generation cancelled, checkpoint deleted.")
+            return
+        try:
+            radius = int(action)
+            x, z = (int(args[0]), int(args[1])) if len(args) >= 2 else (None, None)
+        except (ValueError, IndexError):
+            await ctx.send("Usage: `!pregen <radius in blocks> [x z] [dimension]` (centred on the world spawn without `x z`) or `!pregen status|pause|resume|cancel`")
+            return
+        if job.pending:
+            await ctx.send(f"There's already a job: {job.status()}\n`!pregen cancel` first to start over.")
+            return
+        dimension = args[2] if len(args) >= 3 else "minecraft:overworld"
+        if x is None:
+            from pregen import world_spawn
+            from minecraft import MC_DIR
+            spawn = world_spawn(MC_DIR)
+            if spawn is None:
+                await ctx.send("Couldn't read the world spawn from level.dat. Give the centre: `!pregen <radius> <x> <z>`.")
+                return
+            x, z = spawn
+        job.new(radius, x, z, dimension)
+        job.start()
+        await ctx.send(
+            f"Pre-generating {job.state['total']} chunks around {x}, {z} in {dimension}. "
+            f"Pauses while anyone's online and backs off above {job.budget:.0f} MSPT. `!pregen status` for progress."
+        )
 
     @bot.command(name="build")
     async def build_cmd(ctx, *, description: str = None):
-        """Hand off a complex task to Claude Code CLI."""
+        """Hand off a complex task to Claude Code CLI. Also: !build status|cancel [id]|log <id> [page]"""
+        from builds import RUNNING, QUEUED, DONE, CANCELLED, render_stream_json
         if not description:
             await ctx.send("What do you need? Usage: `!build <describe what you want>`")
             return
 
-        ack = random.choice(ACK_LINES)
-        await ctx.send(f"**{description}**\n{ack}")
-
-        async def send_progress(stop_event):
-            available = list(PROGRESS_LINES)
-            random.shuffle(available)
-            try:
-                await asyncio.wait_for(stop_event.wait(), timeout=15)
+        builds = bot.builds
+        words = description.split()
+        action = words[0].lower()
+        if action == "status" and len(words) == 1:
+            running, queued = builds.running(), builds.queued()
+            if not running and not queued:
+                await ctx.send("No builds running.")
                 return
-            except asyncio.TimeoutError:
-                pass
-            while not stop_event.is_set() and available:
-                await ctx.send(f"*{available.pop()}*")
-                try:
-                    await asyncio.wait_for(stop_event.wait(), timeout=25)
-                    return
-                except asyncio.TimeoutError:
-                    pass
-
-        stop_event = asyncio.Event()
-        progress_task = asyncio.create_task(send_progress(stop_event))
-
-        try:
-            rcon_script = os.path.join(PROJECT_DIR, "scripts", "rcon.py")
-            python_bin = os.path.join(PROJECT_DIR, "venv", "bin", "python")
-            prompt = (
-                f"You are managing a Minecraft server. "
-                f"To send commands to the server, run: {python_bin} {rcon_script} <command>\n"
-                f"Examples:\n"
-                f"  {python_bin} {rcon_script} time set day\n"
-                f"  {python_bin} {rcon_script} gamemode creative Steve\n"
-                f"  {python_bin} {rcon_script} gamerule doDaylightCycle false\n"
-                f"  {python_bin} {rcon_script} whitelist add Steve\n"
-                f"  {python_bin} {rcon_script} give Steve diamond 64\n\n"
-                f"Server config is at /home/eugene/minecraft-server/server.properties\n"
-                f"TASK: {description}\n"
-                f"Do what's needed. If it requires multiple commands, run them all."
-            )
-
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                lambda: subprocess.run(
-                    [
-                        "claude", "-p", "--output-format", "text",
-                        "--allowedTools", "Bash Read Edit Write Glob Grep",
-                        "--max-budget-usd", "1.00",
-                        prompt,
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=300,
-                    cwd=PROJECT_DIR,
-                )
-            )
-
-            stop_event.set()
-            await progress_task
-
-            if result.returncode != 0:
-                error_msg = result.stderr[:500] if result.stderr else "No details"
-                await ctx.send(f"{random.choice(FAIL_LINES)}\n```{error_msg}```")
+            lines = [f"▶️ #{j.id} ({j.elapsed:.0f}s): {j.description[:80]}" for j in running]
+            lines += [f"{i}. #{j.id}: {j.description[:80]}" for i, j in enumerate(queued, 1)]
+            await ctx.send("\n".join(lines))
+            return
+        if action == "cancel" and len(words) <= 2:
+            job = builds.jobs.get(int(words[1])) if len(words) == 2 and words[1].isdigit() else None
+            if job is None and len(words) == 1:
+                active = builds.running() or builds.queued()
+                job = active[0] if active else None
+            if job is None or job.finished:
+                await ctx.send("Nothing to cancel.")
+                return
+            await ctx.send(f"Cancelling build #{job.id}...")
+            await builds.cancel(job)
+            return
+        if action == "log" and 2 <= len(words) <= 3 and all(w.isdigit() for w in words[1:]):
+            try:
+                text, page, pages = builds.read_page(int(words[1]), int(words[2]) if len(words) == 3 else 1)
+            except FileNotFoundError:
+                await ctx.send(f"No log for build #{words[1]}.")
                 return
+            await ctx.send(f"**Build #{words[1]}** (page {page}/{pages})\n```\n{text.replace('```', '`‵`')}\n```")
+            return
 
-            response_text = result.stdout.strip()
-            done = random.choice(DONE_LINES)
+        rcon_script = os.path.join(PROJECT_DIR, "scripts", "rcon.py")
+        python_bin = os.path.join(PROJECT_DIR, "venv", "bin", "python")
+        prompt = (
+            f"You are managing a Minecraft server. "
+            f"To send commands to the server, run: {python_bin} {rcon_script} <command>\n"
+            f"Examples:\n"
+            f"  {python_bin} {rcon_script} time set day\n"
+            f"  {python_bin} {rcon_script} gamemode creative Steve\n"
+            f"  {python_bin} {rcon_script} gamerule doDaylightCycle false\n"
+            f"  {python_bin} {rcon_script} whitelist add Steve\n"
+            f"  {python_bin} {rcon_script} give Steve diamond 64\n"
+            f"For several commands, send them in one session (one per line) instead of one run each:\n"
+            f"  printf 'time set day\\nweather clear\\n' | {python_bin} {rcon_script} --json -\n\n"
+            f"Server config is at /home/eugene/minecraft-server/server.properties\n"
+            f"TASK: {description}\n"
+            f"Do what's needed. If it requires multiple commands, run them all."
+        )
+        argv = [
+            "claude", "-p", "--output-format", "stream-json", "--verbose",
+            "--allowedTools", "Bash Read Edit Write Glob Grep",
+            "--max-budget-usd", "1.00",
+            prompt,
+        ]
 
-            embed = discord.Embed(
-                title=done,
-                description=description,
-                color=0x00FF41,
-                timestamp=datetime.utcnow(),
-            )
+        message = None
+        synced = False
+        lock = asyncio.Lock()
+        ack = random.choice(ACK_LINES)
 
-            if response_text:
-                preview = response_text[:800] + ("..." if len(response_text) > 800 else "")
-                embed.add_field(name="Andy's Notes", value=f"```\n{preview}\n```", inline=False)
+        def render(job) -> str:
+            title = description if len(description) <= 200 else description[:199] + "…"
+            header = f"**{title}**\n"
+            if job.state == QUEUED:
+                return header + f"{ack} Queued at position {builds.position(job)}."
+            if job.state == RUNNING:
+                status, footer = f"Build #{job.id} running ({job.elapsed:.0f}s)...", ""
+            else:
+                if job.state == DONE:
+                    status = random.choice(DONE_LINES)
+                elif job.state == CANCELLED:
+                    status = f"Build #{job.id} cancelled."
+                else:
+                    status = f"{random.choice(FAIL_LINES)} build {job.state} (exit {job.returncode})"
+                footer = f"\nFull output: `!build log {job.id}` • {job.elapsed:.0f}s"
+            # Whatever room is left under Discord's limit goes to the output tail
+            room = MESSAGE_LIMIT - len(header) - len(status) - len(footer) - len("\n```\n\n```")
+            tail = job.output[-room:].strip().replace("```", "`‵`") if room > 0 else ""
+            body = f"\n```\n{tail}\n```" if tail else ""
+            return header + status + body + footer
 
-            embed.set_footer(text="Powered by Claude")
-            await ctx.send(embed=embed)
+        async def update(job):
+            nonlocal message, synced
+            if job.state == DONE and not synced and GIT_AUTO_SYNC:
+                # Commit whatever the build changed; bursts of builds share one commit
+                synced = True
+                git_sync(f"!build #{job.id}: {description}")
+            async with lock:
+                if message is None:
+                    message = await ctx.send(render(job))
+                else:
+                    await message.edit(content=render(job))
 
-        except subprocess.TimeoutExpired:
-            stop_event.set()
-            await progress_task
-            await ctx.send("That one took too long. Timed out after 5 minutes.")
-        except Exception as e:
-            stop_event.set()
-            await progress_task
-            await ctx.send(f"{random.choice(FAIL_LINES)} `{e}`")
+        job = builds.submit(description, argv, PROJECT_DIR, notify=update, render=render_stream_json)
+        if message is None:
+            await update(job)
 
     @bot.command(name="yo")
     async def yo_cmd(ctx):
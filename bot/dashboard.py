@@ -0,0 +1,201 @@
+import os
+import json
+import gzip
+import hashlib
+import asyncio
+import logging
+import mimetypes
+
+log = logging.getLogger("afk-andy")
+
+DASHBOARD_HOST = os.getenv("DASHBOARD_HOST", "127.0.0.1")
+DASHBOARD_PORT = int(os.getenv("DASHBOARD_PORT", "8080"))
+DASHBOARD_INTERVAL = float(os.getenv("DASHBOARD_INTERVAL", "2"))
+WEBSITE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "website")
+SPARK_POINTS = 120
+KEEPALIVE = 15
+GZIP_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+GZIP_MIN_BYTES = 512
+
+
+class StaticFiles:
+    """website/ from memory, with strong ETags and a pre-gzipped copy of text assets.
+
+    Files are re-read only when their mtime or size changes, so a warm load
+    is a dict lookup and, with If-None-Match, an empty 304.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        self._files = {}
+
+    def _load(self, rel: str):
+        path = os.path.realpath(os.path.join(self.root, rel))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        st = os.stat(path)
+        cached = self._files.get(path)
+        if cached and cached["stamp"] == (st.st_mtime_ns, st.st_size):
+            return cached
+        with open(path, "rb") as f:
+            body = f.read()
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        entry = {
+            "stamp": (st.st_mtime_ns, st.st_size),
+            "body": body,
+            "gzip": gzip.compress(body, 9, mtime=0)
+            if ctype.startswith(GZIP_TYPES) and len(body) >= GZIP_MIN_BYTES else None,
+            "etag": '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"',
+            "type": ctype,
+        }
+        self._files[path] = entry
+        return entry
+
+    async def handle(self, request):
+        from aiohttp import web
+        rel = request.match_info.get("path") or "index.html"
+        if rel.endswith("/"):
+            rel += "index.html"
+        entry = self._load(rel)
+        if entry is None:
+            raise web.HTTPNotFound()
+        headers = {"ETag": entry["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if entry["etag"] in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        body = entry["body"]
+        if entry["gzip"] and "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = entry["gzip"]
+            headers["Content-Encoding"] = "gzip"
+        return web.Response(body=body, headers=headers, content_type=entry["type"])
+
+
+class Dashboard:
+    """Web status page pushed to browsers over Server-Sent Events.
+
+    Nothing here talks to RCON. Every DASHBOARD_INTERVAL seconds it reads the
+    poller's cached snapshot and the perf ring buffer, serialises one JSON
+    payload, and wakes every connected /events stream if it changed. Any
+    number of open tabs costs one serialisation per change and zero extra
+    queries to the Minecraft server.
+    """
+
+    def __init__(self, poller, perf=None, host: str = DASHBOARD_HOST, port: int = DASHBOARD_PORT,
+                 interval: float = DASHBOARD_INTERVAL, static_dir: str = WEBSITE_DIR):
+        self.poller = poller
+        self.perf = perf
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.static = StaticFiles(static_dir)
+        self.payload = b"{}"
+        self.etag = '""'
+        self.clients = 0
+        self._changed = asyncio.Event()
+        self._runner = None
+        self._task = None
+
+    def build(self) -> dict:
+        from minecraft import supervisor, READY, STOPPED
+        snap = self.poller.snapshot
+        state = supervisor.state
+        ready = state == READY and snap.state == READY
+        spark = {"mspt": [], "tps": []}
+        if self.perf is not None:
+            ring = self.perf.raw
+            for i in reversed(list(ring.latest(SPARK_POINTS))):
+                spark["mspt"].append(round(ring.cols["mspt"][i], 1))
+                spark["tps"].append(round(ring.cols["tps"][i], 2))
+        return {
+            "state": state,
+            "players": snap.players if ready else [],
+            "max_players": snap.max_players,
+            "tps": snap.tps[0] if ready and snap.tps else None,
+            "mspt": snap.mspt[0] if ready and snap.mspt else None,
+            "started_at": supervisor.started_at if state != STOPPED else None,
+            "error": snap.error if ready else None,
+            "checked_at": snap.timestamp or None,
+            "spark": spark,
+        }
+
+    def update(self) -> bool:
+        """Rebuild the payload; wake subscribers only if it changed."""
+        payload = json.dumps(self.build(), separators=(",", ":")).encode()
+        if payload == self.payload:
+            return False
+        self.payload = payload
+        self.etag = '"' + hashlib.blake2b(payload, digest_size=12).hexdigest() + '"'
+        # Swap the event so waiters wake once and new waiters block until the next change
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                self.update()
+            except Exception as e:
+                log.error(f"Dashboard update failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def status(self, request):
+        from aiohttp import web
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=self.payload, headers=headers, content_type="application/json")
+
+    async def events(self, request):
+        from aiohttp import web
+        resp = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # don't let a reverse proxy sit on the stream
+        })
+        await resp.prepare(request)
+        self.clients += 1
+        try:
+            await resp.write(b"retry: 5000\ndata: " + self.payload + b"\n\n")
+            while True:
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await resp.write(b": keepalive\n\n")
+                    continue
+                await resp.write(b"data: " + self.payload + b"\n\n")
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+        return resp
+
+    async def start(self):
+        """Serve / (website), /status.json and /events. Port 0 disables it."""
+        if not self.port:
+            return
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/status.json", self.status)
+        app.router.add_get("/events", self.events)
+        app.router.add_get("/", self.static.handle)
+        app.router.add_get("/{path:.+}", self.static.handle)
+        self._runner = web.AppRunner(app, access_log=None, shutdown_timeout=1)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            log.warning(f"Dashboard couldn't bind {self.host}:{self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        self.update()
+        self._task = asyncio.create_task(self._run())
+        log.info(f"Dashboard on http://{self.host}:{self.port}/status.html")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
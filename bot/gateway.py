@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import asyncio
+import logging
+
+log = logging.getLogger("afk-andy")
+
+RCON_GATEWAY_SOCKET = os.path.expanduser(
+    os.getenv("RCON_GATEWAY_SOCKET", "~/afk-andy/memory/rcon.sock"))
+
+
+class RconGateway:
+    """Unix socket that lets local tools send RCON commands through the bot.
+
+    The protocol is JSON lines. A client sends {"id": ..., "command": "..."}
+    and gets {"id": ..., "ok": true, "response": "...", "ms": ...} back, or
+    "ok": false with an "error". Each client gets an RCON connection of its
+    own, with the pool's address and password, and its requests run one at
+    a time in the order sent. A command's timeout runs from when it reaches
+    RCON, so a long batch doesn't time out the commands queued behind it,
+    and a timeout only closes that client's connection (the next request
+    opens a new one), never the bot's pool. The socket is created mode 0600.
+    """
+
+    def __init__(self, path: str = RCON_GATEWAY_SOCKET):
+        self.path = path
+        self._server = None
+
+    async def start(self):
+        if not self.path:
+            return
+        if os.path.exists(self.path):
+            os.remove(self.path)  # stale socket from a previous run
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        finally:
+            os.umask(old_umask)
+        log.info(f"RCON gateway on {self.path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def _handle(self, reader, writer):
+        from minecraft import supervisor
+        from rcon import RconConnection, RconError
+        pool = supervisor.pool()
+        conn = None
+
+        async def reply(message: dict):
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    request_id, command = request.get("id"), request["command"]
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    await reply({"id": None, "ok": False, "error": "expected {\"id\": ..., \"command\": ...}"})
+                    continue
+                started = time.perf_counter()
+                try:
+                    if conn is None or conn.closed:
+                        try:
+                            conn = await RconConnection.open(pool.host, pool.port, pool.password, pool.timeout)
+                        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                            raise RconError(f"Can't reach RCON at {pool.host}:{pool.port}: {e}") from e
+                    response = await conn.command(command, pool.timeout)
+                except Exception as e:
+                    await reply({"id": request_id, "ok": False, "error": str(e) or type(e).__name__})
+                    continue
+                ms = round((time.perf_counter() - started) * 1000, 2)
+                await reply({"id": request_id, "ok": True, "response": response, "ms": ms})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if conn:
+                conn.close()
+            writer.close()
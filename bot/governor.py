@@ -0,0 +1,383 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+
+log = logging.getLogger("afk-andy")
+
+# Off by default; once enabled it only reports until GOVERNOR_DRY_RUN=0, since culls can't be undone
+GOVERNOR_ENABLED = os.getenv("GOVERNOR_ENABLED", "0") == "1"
+GOVERNOR_DRY_RUN = os.getenv("GOVERNOR_DRY_RUN", "1") == "1"
+GOVERNOR_INTERVAL = float(os.getenv("GOVERNOR_INTERVAL", "15"))
+GOVERNOR_MSPT_BUDGET = float(os.getenv("GOVERNOR_MSPT_BUDGET", os.getenv("PERF_MSPT_BUDGET", "50")))
+GOVERNOR_MAX_ENTITIES = int(os.getenv("GOVERNOR_MAX_ENTITIES", "4000"))
+GOVERNOR_SUSTAIN = float(os.getenv("GOVERNOR_SUSTAIN_SECONDS", "60"))
+GOVERNOR_RECOVER = float(os.getenv("GOVERNOR_RECOVER_SECONDS", "300"))
+GOVERNOR_COOLDOWN = float(os.getenv("GOVERNOR_COOLDOWN", "600"))
+GOVERNOR_RANDOM_TICK = int(os.getenv("GOVERNOR_RANDOM_TICK", "1"))
+GOVERNOR_HOT_RADIUS = int(os.getenv("GOVERNOR_HOT_RADIUS", "48"))
+GOVERNOR_HOT_ENTITIES = int(os.getenv("GOVERNOR_HOT_ENTITIES", "250"))
+GOVERNOR_CULL_ITEMS = os.getenv("GOVERNOR_CULL_ITEMS", "0") == "1"
+# Item Age in ticks (despawn is at 6000): younger drops, like a fresh death pile or farm output, are kept
+GOVERNOR_ITEM_MIN_AGE = int(os.getenv("GOVERNOR_ITEM_MIN_AGE", "3600"))
+GOVERNOR_CULL_MOBS = [m for m in os.getenv(
+    "GOVERNOR_CULL_MOBS",
+    "zombie,husk,drowned,skeleton,stray,creeper,spider,cave_spider,witch,slime,enderman,zombified_piglin,phantom",
+).split(",") if m]
+# Paper has no console command for view/simulation distance; set this if a plugin provides one,
+# e.g. "viewdistance set {view} {simulation}". Empty leaves the distance rule out of the ladder.
+GOVERNOR_DISTANCE_CMD = os.getenv("GOVERNOR_DISTANCE_CMD", "")
+GOVERNOR_VIEW_DISTANCE = int(os.getenv("GOVERNOR_VIEW_DISTANCE", "6"))
+GOVERNOR_SIMULATION_DISTANCE = int(os.getenv("GOVERNOR_SIMULATION_DISTANCE", "4"))
+RECOVER_RATIO = 0.7
+VOID_ACTION = "tp {target} ~ -512 ~"  # below any world's min_y - 64, where entities die
+AGE_OBJECTIVE = "afk_andy_age"
+
+PLAYER_RE = re.compile(r"^[A-Za-z0-9_]{1,16}$")
+COUNT_RE = re.compile(r"count:\s*(\d+)")
+KILLED_RE = re.compile(r"(?:Killed|Teleported) (\d+) entities|(?:Killed|Teleported) (.+)$")
+GAMERULE_RE = re.compile(r"set to:\s*(-?\d+)")
+
+
+def killed(response: str) -> int:
+    """Entity count from a `kill` or `tp` reply ("Killed 12 entities", "Teleported Zombie to ...", "No entity was found")."""
+    match = KILLED_RE.search(response or "")
+    if not match:
+        return 0
+    return int(match.group(1)) if match.group(1) else 1
+
+
+class Rule:
+    """One rung of the mitigation ladder.
+
+    apply() returns a description of what it did and whatever it needs to
+    undo it later; restore() gets that back. One-shot rules (culls) have
+    nothing to undo, and may fire again while the ladder is topped out.
+    """
+
+    name = ""
+    reversible = True
+
+    def __init__(self, cooldown: float = GOVERNOR_COOLDOWN):
+        self.cooldown = cooldown
+
+    async def apply(self, gov) -> tuple:
+        raise NotImplementedError
+
+    async def restore(self, gov, saved) -> str:
+        return ""
+
+
+class RandomTickRule(Rule):
+    name = "randomtick"
+
+    def __init__(self, value: int = GOVERNOR_RANDOM_TICK, **kwargs):
+        super().__init__(**kwargs)
+        self.value = value
+
+    async def apply(self, gov) -> tuple:
+        match = GAMERULE_RE.search(await gov.query("gamerule randomTickSpeed"))
+        current = int(match.group(1)) if match else 3
+        if current <= self.value:
+            return f"randomTickSpeed already {current}", current
+        await gov.send(f"gamerule randomTickSpeed {self.value}")
+        return f"randomTickSpeed {current} → {self.value}", current
+
+    async def restore(self, gov, saved) -> str:
+        await gov.send(f"gamerule randomTickSpeed {saved}")
+        return f"randomTickSpeed back to {saved}"
+
+
+class CullRule(Rule):
+    """Remove entities matching a selector within radius of every player standing in a crowd.
+
+    `action` is the command run on the selected entities, `{target}` being
+    the selector. Mobs are sent below the world rather than killed: `kill`
+    makes them drop loot and XP right after the item clear, while anything
+    dying down there drops into the void and is gone.
+    """
+
+    reversible = False
+    setup = ()  # commands sent once before the culls
+
+    def __init__(self, name: str, selectors: list, action: str = "kill {target}", **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.selectors = selectors
+        self.action = action
+
+    def commands(self, player: str, radius: int) -> list:
+        return [f"execute at {player} run " + self.action.format(target=f"@e[{sel},distance=..{radius}]")
+                for sel in self.selectors]
+
+    async def apply(self, gov) -> tuple:
+        hot = await gov.hot_players()
+        if not hot:
+            return f"{self.name}: no crowded areas", None
+        total = 0
+        # In order: a rule's commands for one player can depend on each other
+        for command in [*self.setup, *(c for player in hot for c in self.commands(player, gov.hot_radius))]:
+            try:
+                total += killed(await gov.send(command))
+            except Exception as e:
+                log.warning(f"Governor {self.name}: {command!r} failed: {e}")
+        what = "would cull" if gov.dry_run else f"culled {total}"
+        return f"{self.name}: {what} near {', '.join(hot)}", None
+
+
+class ItemCullRule(CullRule):
+    """Clear dropped items that have been lying around for at least `min_age` ticks.
+
+    Selectors can't compare NBT, so each item's Age is copied into a
+    scoreboard first and the kill filters on that score.
+    """
+
+    setup = (f"scoreboard objectives add {AGE_OBJECTIVE} dummy",)
+
+    def __init__(self, min_age: int = GOVERNOR_ITEM_MIN_AGE, **kwargs):
+        super().__init__("items", ["type=item"], **kwargs)
+        self.min_age = min_age
+
+    def commands(self, player: str, radius: int) -> list:
+        items = f"@e[type=item,distance=..{radius}]"
+        return [
+            f"execute at {player} as {items} store result score @s {AGE_OBJECTIVE} run data get entity @s Age",
+            f"execute at {player} run kill @e[type=item,distance=..{radius},scores={{{AGE_OBJECTIVE}={self.min_age}..}}]",
+        ]
+
+
+class DistanceRule(Rule):
+    name = "distance"
+
+    def __init__(self, template: str, view: int, simulation: int, **kwargs):
+        super().__init__(**kwargs)
+        self.template = template
+        self.view = view
+        self.simulation = simulation
+
+    async def apply(self, gov) -> tuple:
+        from jvm import read_properties
+        props = read_properties(gov.supervisor.mc_dir)
+        saved = [int(props.get("view-distance", 10)), int(props.get("simulation-distance", 10))]
+        await gov.send(self.template.format(view=self.view, simulation=self.simulation))
+        return f"view/simulation distance {saved[0]}/{saved[1]} → {self.view}/{self.simulation}", saved
+
+    async def restore(self, gov, saved) -> str:
+        await gov.send(self.template.format(view=saved[0], simulation=saved[1]))
+        return f"view/simulation distance back to {saved[0]}/{saved[1]}"
+
+
+def default_rules() -> list:
+    mobs = [f"type={m},nbt=!{{PersistenceRequired:1b}}" for m in GOVERNOR_CULL_MOBS]
+    rules = [RandomTickRule()]
+    if GOVERNOR_CULL_ITEMS:
+        rules.append(ItemCullRule())
+    rules.append(CullRule("mobs", mobs, action=VOID_ACTION))
+    if GOVERNOR_DISTANCE_CMD:
+        rules.append(DistanceRule(GOVERNOR_DISTANCE_CMD, GOVERNOR_VIEW_DISTANCE, GOVERNOR_SIMULATION_DISTANCE))
+    return rules
+
+
+class Governor:
+    """Steps through mitigations while MSPT (or the entity count) stays over budget.
+
+    Over budget for `sustain` seconds climbs one rung; under RECOVER_RATIO of
+    the budget for `recover` seconds steps back down one rung, undoing it.
+    A rule can't be applied again within its cooldown of the last time it
+    was applied or undone, so the ladder doesn't flap around the threshold.
+    The ladder position and saved settings are checkpointed, so settings
+    lowered before a bot restart still get restored afterwards. In dry-run
+    mode read-only queries still run, but changes are only reported.
+    """
+
+    def __init__(self, state_path: str, poller, supervisor, notify=None, rules: list = None,
+                 budget: float = GOVERNOR_MSPT_BUDGET, max_entities: int = GOVERNOR_MAX_ENTITIES,
+                 interval: float = GOVERNOR_INTERVAL, sustain: float = GOVERNOR_SUSTAIN,
+                 recover: float = GOVERNOR_RECOVER, dry_run: bool = GOVERNOR_DRY_RUN,
+                 hot_radius: int = GOVERNOR_HOT_RADIUS, hot_entities: int = GOVERNOR_HOT_ENTITIES):
+        self.state_path = state_path
+        self.poller = poller
+        self.supervisor = supervisor
+        self.notify = notify  # async callable(text)
+        self.rules = rules if rules is not None else default_rules()
+        self.budget = budget
+        self.max_entities = max_entities
+        self.interval = interval
+        self.sustain_samples = max(1, round(sustain / interval))
+        self.recover_samples = max(1, round(recover / interval))
+        self.dry_run = dry_run
+        self.hot_radius = hot_radius
+        self.hot_entities = hot_entities
+        self.active = []      # [(rule name, saved)] in the order applied
+        self.last_change = {}  # rule name -> time it was last applied or undone
+        self.history = deque(maxlen=10)
+        self.mspt = None
+        self.entities = None
+        self._over = 0
+        self._under = 0
+        self._players = []
+        self._task = None
+        self._load()
+
+    # -- state --
+
+    def _load(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        names = {r.name for r in self.rules}
+        self.active = [(n, saved) for n, saved in state.get("active", []) if n in names]
+        self.last_change = state.get("last_change", {})
+
+    def _save(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"active": self.active, "last_change": self.last_change}, f)
+        os.replace(tmp, self.state_path)
+
+    def rule(self, name: str) -> Rule:
+        return next(r for r in self.rules if r.name == name)
+
+    @property
+    def level(self) -> int:
+        return len(self.active)
+
+    # -- RCON helpers for rules --
+
+    async def query(self, command: str) -> str:
+        return await self.supervisor.rcon(command)
+
+    async def send(self, command: str) -> str:
+        """Run a command that changes the world; in dry-run mode only record it."""
+        if self.dry_run:
+            log.info(f"Governor (dry run) would send: {command}")
+            return ""
+        return await self.supervisor.rcon(command)
+
+    async def hot_players(self) -> list:
+        """Online players with more than hot_entities entities around them."""
+        players = [p for p in self._players if PLAYER_RE.match(p)]
+        replies = await asyncio.gather(
+            *(self.query(f"execute at {p} if entity @e[distance=..{self.hot_radius}]") for p in players),
+            return_exceptions=True,
+        )
+        hot = []
+        for player, reply in zip(players, replies):
+            match = COUNT_RE.search(reply) if isinstance(reply, str) else None
+            if match and int(match.group(1)) > self.hot_entities:
+                hot.append(player)
+        return hot
+
+    # -- loop --
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        from minecraft import READY
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                snap = await self.poller.get(max_age=self.interval * 0.9)
+                if snap.state != READY or snap.error or not snap.mspt:
+                    self._over = self._under = 0
+                    continue
+                self._players = snap.players
+                reply = await self.query("execute if entity @e")
+                match = COUNT_RE.search(reply)
+                self.entities = int(match.group(1)) if match else None
+                await self.observe(snap.mspt[0], self.entities)
+            except Exception as e:
+                log.error(f"Governor tick failed: {e}")
+
+    async def observe(self, mspt: float, entities: int = None):
+        self.mspt = mspt
+        crowded = bool(self.max_entities and entities is not None and entities > self.max_entities)
+        calm = not self.max_entities or entities is None or entities < self.max_entities * RECOVER_RATIO
+        if mspt > self.budget or crowded:
+            self._over, self._under = self._over + 1, 0
+            if self._over >= self.sustain_samples:
+                self._over = 0
+                reason = f"MSPT {mspt:.1f}" if mspt > self.budget else f"{entities} entities"
+                await self.escalate(reason)
+        elif mspt < self.budget * RECOVER_RATIO and calm:
+            self._over, self._under = 0, self._under + 1
+            if self._under >= self.recover_samples and self.active:
+                self._under = 0
+                await self.relax()
+        else:
+            self._over = self._under = 0
+
+    def _cooling(self, rule: Rule, now: float) -> bool:
+        return now - self.last_change.get(rule.name, -rule.cooldown) < rule.cooldown
+
+    async def escalate(self, reason: str):
+        now = time.time()
+        if self.level < len(self.rules):
+            rule = self.rules[self.level]
+            if self._cooling(rule, now):
+                return
+        else:
+            # Top of the ladder: culls can run again once their cooldown is up
+            again = [self.rule(n) for n, _ in self.active]
+            rule = next((r for r in again if not r.reversible and not self._cooling(r, now)), None)
+            if rule is None:
+                return
+        desc, saved = await rule.apply(self)
+        if all(n != rule.name for n, _ in self.active):
+            self.active.append((rule.name, saved))
+        self.last_change[rule.name] = now
+        self._save()
+        await self._report(f"⚙️ Governor step {self.level} ({reason}): {desc}")
+
+    async def relax(self, reason: str = None):
+        name, saved = self.active[-1]
+        rule = self.rule(name)
+        desc = await rule.restore(self, saved) if rule.reversible else f"{name} stood down"
+        self.active.pop()
+        self.last_change[name] = time.time()
+        self._save()
+        reason = reason or f"MSPT {self.mspt:.1f}"
+        await self._report(f"✅ Governor back to step {self.level} ({reason}): {desc}")
+
+    async def reset(self) -> int:
+        """Undo every active rule now, regardless of MSPT."""
+        undone = 0
+        while self.active:
+            await self.relax("manual reset")
+            undone += 1
+        return undone
+
+    async def _report(self, text: str):
+        from utils import log_task
+        if self.dry_run:
+            text = "(dry run) " + text
+        self.history.append((time.time(), text))
+        log.info(text)
+        log_task(text, "governor", {"level": self.level, "dry_run": self.dry_run})
+        if self.notify:
+            await self.notify(text)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "dry_run": self.dry_run,
+            "level": self.level,
+            "ladder": [r.name for r in self.rules],
+            "active": [n for n, _ in self.active],
+            "mspt": self.mspt,
+            "entities": self.entities,
+            "budget": self.budget,
+            "history": list(self.history),
+        }
@@ -0,0 +1,361 @@
+"""Idle auto-shutdown and a wake-on-join stand-in for the stopped server.
+
+While the JVM is down, SleepingServer binds the game port and speaks just
+enough of the Minecraft protocol (handshake, status, login start) to show a
+"sleeping" MOTD in the server list and to start the server when a
+whitelisted player tries to join. The port is released right before the
+JVM is spawned, and taken again when it exits.
+
+Poke it by hand, from the repo root:
+
+    python bot/idle.py ping [--host 127.0.0.1] [--port 25565]
+    python bot/idle.py join Steve [--host 127.0.0.1] [--port 25565]
+"""
+import os
+import sys
+import json
+import time
+import struct
+import asyncio
+import logging
+import argparse
+
+log = logging.getLogger("afk-andy")
+
+IDLE_SHUTDOWN_MINUTES = float(os.getenv("IDLE_SHUTDOWN_MINUTES", "15"))
+WAKE_ON_JOIN = os.getenv("WAKE_ON_JOIN", "1") == "1"
+SLEEPING_MOTD = os.getenv("SLEEPING_MOTD", "AFK Andy is asleep. Join to wake the server up!")
+CHECK_INTERVAL = 60
+READ_TIMEOUT = 10
+MAX_PACKET = 32 * 1024
+
+HANDSHAKE_STATUS = 1
+HANDSHAKE_LOGIN = 2
+
+
+class ProtocolError(Exception):
+    """Raised on a malformed or oversized packet from a client."""
+
+
+# -- wire format --
+
+def pack_varint(value: int) -> bytes:
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def unpack_varint(data: bytes, pos: int = 0) -> tuple:
+    """(value, new_pos) for a VarInt starting at data[pos]."""
+    result = 0
+    for shift in range(0, 35, 7):
+        if pos >= len(data):
+            raise ProtocolError("Truncated VarInt")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            if result & 0x80000000:
+                result -= 1 << 32
+            return result, pos
+    raise ProtocolError("VarInt too long")
+
+
+def pack_string(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    return pack_varint(len(raw)) + raw
+
+
+def unpack_string(data: bytes, pos: int) -> tuple:
+    length, pos = unpack_varint(data, pos)
+    if length < 0 or pos + length > len(data):
+        raise ProtocolError("Bad string length")
+    return data[pos:pos + length].decode("utf-8", errors="replace"), pos + length
+
+
+def pack_packet(packet_id: int, payload: bytes = b"") -> bytes:
+    body = pack_varint(packet_id) + payload
+    return pack_varint(len(body)) + body
+
+
+async def read_varint(reader: asyncio.StreamReader) -> int:
+    result = 0
+    for shift in range(0, 35, 7):
+        (byte,) = await reader.readexactly(1)
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result
+    raise ProtocolError("VarInt too long")
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple:
+    """(packet_id, payload) of the next length-prefixed packet."""
+    length = await read_varint(reader)
+    if length < 1 or length > MAX_PACKET:
+        raise ProtocolError(f"Bad packet length {length}")
+    body = await reader.readexactly(length)
+    packet_id, pos = unpack_varint(body)
+    return packet_id, body[pos:]
+
+
+# -- the stand-in server --
+
+def read_whitelist(mc_dir: str) -> set:
+    """Lowercased names from whitelist.json (re-read only when the file changes)."""
+    from roster import PlayerList
+    return {name.lower() for name in PlayerList(mc_dir).names()}
+
+
+class SleepingServer:
+    """Answers server-list pings and join attempts while the JVM is down.
+
+    on_wake(name) is awaited when an allowed player tries to log in; the
+    player is told to reconnect in a minute.
+    """
+
+    def __init__(self, mc_dir: str, on_wake, motd: str = SLEEPING_MOTD):
+        from jvm import read_properties
+        props = read_properties(mc_dir)
+        self.mc_dir = mc_dir
+        self.on_wake = on_wake
+        self.motd = motd
+        self.host = props.get("server-ip") or None
+        self.port = int(props.get("server-port", 25565))
+        self.max_players = int(props.get("max-players", 20))
+        self.whitelist_on = props.get("white-list", "false").lower() == "true"
+        self._server = None
+        self._waking = False
+
+    @property
+    def listening(self) -> bool:
+        return self._server is not None
+
+    def allowed(self, name: str) -> bool:
+        if not self.whitelist_on:
+            return True
+        return name.lower() in read_whitelist(self.mc_dir)
+
+    async def start(self):
+        if self._server:
+            return
+        self._waking = False
+        try:
+            self._server = await asyncio.start_server(
+                self._handle, self.host, self.port, reuse_address=True)
+        except OSError as e:
+            log.warning(f"Wake-on-join listener couldn't bind port {self.port}: {e}")
+            return
+        log.info(f"Wake-on-join listening on port {self.port}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            log.info("Wake-on-join listener closed")
+
+    def status_json(self, protocol: int) -> dict:
+        return {
+            "version": {"name": "Sleeping", "protocol": protocol},
+            "players": {"max": self.max_players, "online": 0, "sample": []},
+            "description": {"text": self.motd},
+        }
+
+    async def _handle(self, reader, writer):
+        try:
+            await asyncio.wait_for(self._session(reader, writer), READ_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ProtocolError,
+                ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _session(self, reader, writer):
+        packet_id, data = await read_packet(reader)
+        if packet_id != 0x00:
+            return
+        protocol, pos = unpack_varint(data)
+        _, pos = unpack_string(data, pos)  # address the client dialled
+        pos += 2                           # port
+        next_state, _ = unpack_varint(data, pos)
+
+        if next_state == HANDSHAKE_STATUS:
+            packet_id, _ = await read_packet(reader)
+            if packet_id != 0x00:
+                return
+            writer.write(pack_packet(0x00, pack_string(json.dumps(self.status_json(protocol)))))
+            await writer.drain()
+            packet_id, payload = await read_packet(reader)
+            if packet_id == 0x01:
+                writer.write(pack_packet(0x01, payload))  # pong echoes the client's number
+                await writer.drain()
+            return
+
+        if next_state == HANDSHAKE_LOGIN:
+            packet_id, data = await read_packet(reader)
+            if packet_id != 0x00:
+                return
+            name, _ = unpack_string(data, 0)
+            if not self.allowed(name):
+                log.info(f"Wake-on-join: ignored {name} (not whitelisted)")
+                await self._disconnect(writer, "You're not whitelisted on this server.")
+                return
+            await self._disconnect(writer, "Waking the server up! Reconnect in about a minute.")
+            if not self._waking:
+                self._waking = True
+                log.info(f"Wake-on-join: {name} is knocking, starting the server")
+                asyncio.create_task(self.on_wake(name))
+
+    @staticmethod
+    async def _disconnect(writer, text: str):
+        writer.write(pack_packet(0x00, pack_string(json.dumps({"text": text}))))
+        await writer.drain()
+
+
+class IdleManager:
+    """Stops an empty server after idle_minutes, and runs SleepingServer while it's down."""
+
+    def __init__(self, poller, supervisor, notify=None, idle_minutes: float = IDLE_SHUTDOWN_MINUTES,
+                 wake_on_join: bool = WAKE_ON_JOIN):
+        self.poller = poller
+        self.supervisor = supervisor
+        self.notify = notify  # async callable(text)
+        self.idle_seconds = idle_minutes * 60
+        self.sleeper = SleepingServer(supervisor.mc_dir, self._wake) if wake_on_join else None
+        self.empty_since = None
+        self._task = None
+        self._sleeper_task = None
+
+    def start(self):
+        if self._task:
+            return
+        if self.sleeper:
+            self.supervisor.before_start.append(self._release_port)
+            self.supervisor.on_stopped.append(self._on_stopped)
+            self._take_port()
+        if self.idle_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _on_stopped(self):
+        self.empty_since = None
+        self._take_port()
+
+    def _take_port(self):
+        self._sleeper_task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        from minecraft import STOPPED
+        # A start() may have claimed the port between scheduling and now
+        if self.supervisor.state == STOPPED:
+            await self.sleeper.start()
+
+    async def _release_port(self):
+        """before_start hook: finish any pending listen first, so stop() can't run ahead of the bind."""
+        task, self._sleeper_task = self._sleeper_task, None
+        if task:
+            await task
+        await self.sleeper.stop()
+
+    async def _wake(self, name: str):
+        from minecraft import start_server
+        success, msg = await start_server()
+        if self.notify:
+            await self.notify(f"⏰ {name} tried to join, so I'm starting the server." if success
+                              else f"⏰ {name} tried to join but the server wouldn't start: {msg}")
+
+    async def _run(self):
+        from minecraft import READY, stop_server
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            try:
+                snap = await self.poller.get(max_age=CHECK_INTERVAL / 2)
+            except Exception as e:
+                log.error(f"Idle check failed: {e}")
+                continue
+            if snap.state != READY or snap.error or snap.players:
+                self.empty_since = None
+                continue
+            if self.empty_since is None:
+                self.empty_since = snap.timestamp
+            idle = snap.timestamp - self.empty_since
+            if idle < self.idle_seconds:
+                continue
+            log.info(f"No players for {idle / 60:.0f} min, stopping the server")
+            self.empty_since = None
+            if self.notify:
+                await self.notify(f"💤 Nobody's been on for {idle / 60:.0f} minutes, stopping the server. "
+                                  f"{'Join to wake it back up.' if self.sleeper else 'Use `!start` to bring it back.'}")
+            await stop_server()
+
+
+# -- fake client --
+
+def _handshake(host: str, port: int, next_state: int, protocol: int = 767) -> bytes:
+    payload = pack_varint(protocol) + pack_string(host) + struct.pack(">H", port) + pack_varint(next_state)
+    return pack_packet(0x00, payload)
+
+
+async def ping(host: str, port: int) -> tuple:
+    """(status dict, round trip ms) from a server-list ping."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_handshake(host, port, HANDSHAKE_STATUS) + pack_packet(0x00))
+        await writer.drain()
+        _, data = await read_packet(reader)
+        status = json.loads(unpack_string(data, 0)[0])
+        started = time.perf_counter()
+        writer.write(pack_packet(0x01, struct.pack(">q", 42)))
+        await writer.drain()
+        await read_packet(reader)
+        return status, (time.perf_counter() - started) * 1000
+    finally:
+        writer.close()
+
+
+async def join(host: str, port: int, name: str) -> str:
+    """Try to log in as name; returns the disconnect message."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_handshake(host, port, HANDSHAKE_LOGIN) + pack_packet(0x00, pack_string(name) + bytes(16)))
+        await writer.drain()
+        packet_id, data = await read_packet(reader)
+        if packet_id != 0x00:
+            return f"(login continued with packet 0x{packet_id:02x}; the real server is up)"
+        return json.loads(unpack_string(data, 0)[0]).get("text", "")
+    finally:
+        writer.close()
+
+
+async def _cli(args) -> int:
+    try:
+        if args.action == "ping":
+            status, ms = await ping(args.host, args.port)
+            print(f"{status['version']['name']} • {status['players']['online']}/{status['players']['max']} • "
+                  f"{status['description'].get('text', status['description'])} ({ms:.1f} ms)")
+        else:
+            print(await join(args.host, args.port, args.name))
+    except (OSError, ProtocolError, asyncio.IncompleteReadError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal Minecraft client for poking the wake-on-join listener.")
+    parser.add_argument("action", choices=["ping", "join"])
+    parser.add_argument("name", nargs="?", default="Steve", help="player name for join")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=25565)
+    sys.exit(asyncio.run(_cli(parser.parse_args())))
@@ -0,0 +1,106 @@
+import os
+import json
+import asyncio
+import logging
+
+log = logging.getLogger("afk-andy")
+
+INSTANCES_FILE = os.path.expanduser(os.getenv("INSTANCES_FILE", "~/afk-andy/memory/instances.json"))
+
+
+class InstanceRegistry:
+    """Named server instances, each with its own supervisor, RCON pool and poller.
+
+    The default instance is the one configured through .env (MC_SERVER_DIR,
+    RCON_PORT, ...), so a single-server setup needs no file. Extra servers
+    come from INSTANCES_FILE, a JSON object keyed by instance name:
+
+        {"creative": {"dir": "~/mc/creative", "ram": "3G", "cpus": "4-5",
+                      "memory_max": "4G", "rcon_port": 25576}}
+
+    Per-instance keys: dir (required), jar, ram, profile, cpus, memory_max,
+    rcon_host, rcon_port, rcon_password. RCON port and password default to
+    rcon.port / rcon.password in that instance's server.properties.
+    """
+
+    def __init__(self, default_poller, path: str = INSTANCES_FILE):
+        from minecraft import supervisor
+        self.default = supervisor.name
+        self.supervisors = {supervisor.name: supervisor}
+        self.pollers = {supervisor.name: default_poller}
+        for name, spec in self._read(path).items():
+            if name in self.supervisors:
+                log.warning(f"Instance {name!r} in {path} clashes with the default instance, skipped")
+                continue
+            try:
+                self._add(name, spec)
+            except (KeyError, ValueError) as e:
+                log.error(f"Bad instance {name!r} in {path}: {e}")
+        # Auto-sized heaps without their own memory_max split the host instead of each taking 75% of it
+        shared = [s for s in self.supervisors.values() if s.ram.lower() == "auto" and not s.memory_max]
+        for sup in shared:
+            sup.host_share = 1 / len(shared)
+
+    @staticmethod
+    def _read(path: str) -> dict:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            log.error(f"Can't parse {path}: {e}")
+            return {}
+
+    def _add(self, name: str, spec: dict):
+        from minecraft import ServerSupervisor, MC_RAM, RCON_POOL_SIZE, RCON_TIMEOUT
+        from jvm import read_properties, JVM_PROFILE
+        from rcon import RconPool
+        from poller import ServerPoller
+        mc_dir = os.path.expanduser(spec["dir"])
+        props = read_properties(mc_dir)
+        pool = RconPool(
+            spec.get("rcon_host", "localhost"),
+            int(spec.get("rcon_port") or props.get("rcon.port", 25575)),
+            spec.get("rcon_password") or props.get("rcon.password", ""),
+            size=RCON_POOL_SIZE, timeout=RCON_TIMEOUT,
+        )
+        sup = ServerSupervisor(
+            mc_dir, spec.get("jar", "paper.jar"), spec.get("ram", MC_RAM),
+            profile=spec.get("profile", JVM_PROFILE), name=name, rcon_pool=pool,
+            cpus=spec.get("cpus"), memory_max=spec.get("memory_max"),
+        )
+        self.supervisors[name] = sup
+        self.pollers[name] = ServerPoller(supervisor=sup)
+
+    @property
+    def names(self) -> list:
+        return list(self.supervisors)
+
+    @property
+    def multi(self) -> bool:
+        return len(self.supervisors) > 1
+
+    def get(self, name: str = None):
+        """Supervisor for an instance (the default one when name is None), or None."""
+        return self.supervisors.get(name or self.default)
+
+    def poller(self, name: str = None):
+        return self.pollers.get(name or self.default)
+
+    def adopt(self):
+        for name, sup in self.supervisors.items():
+            if name != self.default:
+                sup.adopt()
+
+    async def snapshots(self, force: bool = False) -> dict:
+        """Fresh-enough snapshot of every instance, polled concurrently."""
+        names = self.names
+        results = await asyncio.gather(
+            *(self.pollers[n].get(force=force) for n in names), return_exceptions=True)
+        return dict(zip(names, results))
+
+    async def close(self):
+        for name, sup in self.supervisors.items():
+            if sup.rcon_pool is not None:
+                await sup.rcon_pool.close()
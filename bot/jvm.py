@@ -0,0 +1,200 @@
+import os
+import re
+import time
+import asyncio
+import logging
+
+log = logging.getLogger("afk-andy")
+
+JVM_PROFILE = os.getenv("MC_JVM_PROFILE", "baseline")
+JVM_CDS = os.getenv("MC_JVM_CDS", "0") == "1"
+JVM_EXTRA = os.getenv("MC_JVM_EXTRA", "").split()
+
+# Aikar's G1 flags (https://docs.papermc.io/paper/aikars-flags). Heaps over
+# 12G get the larger-region variant.
+AIKAR_FLAGS = [
+    "-XX:+UseG1GC", "-XX:+ParallelRefProcEnabled", "-XX:MaxGCPauseMillis=200",
+    "-XX:+UnlockExperimentalVMOptions", "-XX:+DisableExplicitGC", "-XX:+AlwaysPreTouch",
+    "-XX:G1HeapWastePercent=5", "-XX:G1MixedGCCountTarget=4",
+    "-XX:InitiatingHeapOccupancyPercent=15", "-XX:G1MixedGCLiveThresholdPercent=90",
+    "-XX:G1RSetUpdatingPauseTimePercent=5", "-XX:SurvivorRatio=32",
+    "-XX:+PerfDisableSharedMem", "-XX:MaxTenuringThreshold=1",
+    "-Dusing.aikars.flags=https://mcflags.emc.gs", "-Daikars.new.flags=true",
+]
+AIKAR_SMALL = ["-XX:G1NewSizePercent=30", "-XX:G1MaxNewSizePercent=40",
+               "-XX:G1HeapRegionSize=8M", "-XX:G1ReservePercent=20"]
+AIKAR_LARGE = ["-XX:G1NewSizePercent=40", "-XX:G1MaxNewSizePercent=50",
+               "-XX:G1HeapRegionSize=16M", "-XX:G1ReservePercent=15"]
+ZGC_FLAGS = ["-XX:+UseZGC", "-XX:+ZGenerational", "-XX:+AlwaysPreTouch",
+             "-XX:+DisableExplicitGC", "-XX:+PerfDisableSharedMem"]
+
+PROFILES = {
+    "baseline": lambda heap_mb: [],
+    "aikar": lambda heap_mb: AIKAR_FLAGS + (AIKAR_LARGE if heap_mb > 12 * 1024 else AIKAR_SMALL),
+    "zgc": lambda heap_mb: ZGC_FLAGS,
+}
+
+SIZE_RE = re.compile(r"^(\d+)([KMG]?)$", re.I)
+SIZE_MB = {"": 1 / (1024 * 1024), "K": 1 / 1024, "M": 1, "G": 1024}
+SAFEPOINT_RE = re.compile(r"Total: (\d+) ns")
+
+
+def host_memory_mb() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+
+
+def read_properties(mc_dir: str) -> dict:
+    props = {}
+    try:
+        with open(os.path.join(mc_dir, "server.properties")) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#") and "=" in line:
+                    key, value = line.split("=", 1)
+                    props[key.strip()] = value.strip()
+    except FileNotFoundError:
+        pass
+    return props
+
+
+def auto_heap_mb(mc_dir: str, host_mb: int = None, memory_max_mb: int = None, host_share: float = 1.0) -> int:
+    """Size the heap from player count and view distance, capped by the memory it may use.
+
+    Roughly 1.5G of base server plus ~0.25MB per chunk each player keeps
+    loaded, never more than 75% of this instance's share of the host minus
+    1G for the OS, nor 75% of its memory_max (the rest is for metaspace,
+    threads and direct buffers, below memory.high at 90%).
+    """
+    props = read_properties(mc_dir)
+    players = int(props.get("max-players", 20))
+    view = int(props.get("view-distance", 10))
+    wanted = 1536 + players * (2 * view + 1) ** 2 // 4
+    host_mb = host_mb or host_memory_mb()
+    cap = max(1024, int(host_mb * 0.75 * host_share) - 1024)
+    heap = max(1024, min(wanted, cap))
+    if memory_max_mb:
+        heap = min(heap, int(memory_max_mb * 0.75))
+    return max(256, heap - heap % 256)
+
+
+def heap_mb(ram: str, mc_dir: str, memory_max: int = None, host_share: float = 1.0) -> int:
+    """MC_RAM ("4G", "3072M" or "auto") in megabytes, checked against memory_max (bytes) if set."""
+    limit_mb = memory_max // (1024 * 1024) if memory_max else None
+    if ram.lower() == "auto":
+        return auto_heap_mb(mc_dir, memory_max_mb=limit_mb, host_share=host_share)
+    match = SIZE_RE.match(ram.strip())
+    if not match:
+        raise ValueError(f"Bad MC_RAM value {ram!r}")
+    heap = int(int(match.group(1)) * SIZE_MB[match.group(2).upper()])
+    if limit_mb and heap > limit_mb * 0.9:
+        raise ValueError(f"A {heap}M heap doesn't fit in memory_max {limit_mb}M (throttled from 90%, "
+                         f"and the JVM needs room beyond the heap); lower the heap or raise the limit")
+    return heap
+
+
+def build_command(profile: str, mc_dir: str, jar: str, ram: str, gc_log: str = None,
+                  memory_max: int = None, host_share: float = 1.0) -> list:
+    """java command line for a launch profile."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown JVM profile {profile!r} (have: {', '.join(PROFILES)})")
+    heap = heap_mb(ram, mc_dir, memory_max, host_share)
+    cmd = ["java", f"-Xms{heap}M", f"-Xmx{heap}M"] + PROFILES[profile](heap)
+    if JVM_CDS:
+        # JDK 19+: dump a class-data archive on first exit, map it on later boots
+        archive = os.path.join(mc_dir, f"{os.path.splitext(jar)[0]}-{profile}.jsa")
+        cmd += ["-XX:+AutoCreateSharedArchive", f"-XX:SharedArchiveFile={archive}"]
+    if gc_log:
+        cmd.append(f"-Xlog:safepoint:file={gc_log}:uptime")
+    return cmd + JVM_EXTRA + ["-jar", jar, "nogui"]
+
+
+def read_pauses(gc_log: str) -> list:
+    """Safepoint pause times (ms) from an -Xlog:safepoint file."""
+    try:
+        with open(gc_log) as f:
+            return [int(m.group(1)) / 1e6 for m in SAFEPOINT_RE.finditer(f.read())]
+    except FileNotFoundError:
+        return []
+
+
+async def run_startbench(supervisor, profiles: list, sample_seconds: float = 60,
+                         progress=None) -> list:
+    """Boot each profile on the same world and measure it.
+
+    Records time to the "Done" line, MSPT samples for sample_seconds after
+    boot, and safepoint pauses. The server is left stopped.
+    """
+    from minecraft import async_rcon
+    from poller import parse_mspt
+
+    results = []
+    for profile in profiles:
+        if progress:
+            await progress(f"Booting `{profile}`...")
+        gc_log = os.path.join(supervisor.mc_dir, "logs", f"startbench-{profile}.log")
+        os.makedirs(os.path.dirname(gc_log), exist_ok=True)
+        if os.path.exists(gc_log):
+            os.remove(gc_log)
+
+        started = time.monotonic()
+        ok, msg = await supervisor.start(profile=profile, gc_log=gc_log)
+        if not ok:
+            results.append({"profile": profile, "error": msg})
+            continue
+        if not await supervisor.wait_ready(600):
+            await supervisor.stop()
+            results.append({"profile": profile, "error": "never finished loading"})
+            continue
+        wall = time.monotonic() - started
+        done = supervisor.boot_seconds
+
+        mspt = []
+        deadline = time.monotonic() + sample_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(5)
+            try:
+                parsed = parse_mspt(await async_rcon("mspt"))
+            except Exception:
+                continue
+            if parsed:
+                mspt.append(parsed[0])
+
+        await supervisor.stop()
+        pauses = read_pauses(gc_log)
+        results.append({
+            "profile": profile,
+            "done_seconds": done,
+            "wall_seconds": wall,
+            "mspt_avg": sum(mspt) / len(mspt) if mspt else None,
+            "pause_max_ms": max(pauses) if pauses else None,
+            "pause_total_ms": sum(pauses) if pauses else None,
+        })
+    return results
+
+
+def _fmt(value, spec: str, unit: str = "") -> str:
+    return "n/a" if value is None else format(value, spec) + unit
+
+
+def format_startbench(results: list) -> str:
+    ok = sorted((r for r in results if "error" not in r), key=lambda r: r["wall_seconds"])
+    lines = []
+    for r in ok:
+        lines.append(
+            f"{r['profile']:<9} boot {r['wall_seconds']:.1f}s (Done {_fmt(r['done_seconds'], '.1f', 's')}), "
+            f"MSPT {_fmt(r['mspt_avg'], '.1f')}, max pause {_fmt(r['pause_max_ms'], '.1f', 'ms')}, "
+            f"total pauses {_fmt(r['pause_total_ms'], '.0f', 'ms')}"
+        )
+    for r in results:
+        if "error" in r:
+            lines.append(f"{r['profile']:<9} failed: {r['error']}")
+    if ok:
+        lines.append(f"Fastest boot: {ok[0]['profile']}")
+    return "\n".join(lines)
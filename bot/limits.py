@@ -0,0 +1,102 @@
+import os
+import re
+import shutil
+import logging
+
+log = logging.getLogger("afk-andy")
+
+CGROUP_PARENT = os.getenv("MC_CGROUP_PARENT", "")
+BYTES_RE = re.compile(r"^(\d+)([KMGT]?)$", re.I)
+BYTE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_cpus(spec: str) -> set:
+    """'0-3,6' -> {0, 1, 2, 3, 6}. Empty or None means no pinning."""
+    cpus = set()
+    for part in (spec or "").replace(" ", "").split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def parse_bytes(spec: str) -> int:
+    """'8G' / '512M' / '1073741824' -> bytes. Empty or None means no cap."""
+    if not spec:
+        return None
+    match = BYTES_RE.match(str(spec).strip())
+    if not match:
+        raise ValueError(f"Bad memory size {spec!r}")
+    return int(match.group(1)) * BYTE_UNITS[match.group(2).upper()]
+
+
+def prepare_cgroup(name: str, memory_max: int, parent: str = CGROUP_PARENT) -> str:
+    """Create (or reuse) a cgroup-v2 child of MC_CGROUP_PARENT with memory.max set.
+
+    The parent has to be delegated to the bot's user (e.g. a systemd slice
+    with Delegate=yes). Returns the directory, or None when there's no
+    usable parent.
+    """
+    if not parent or not os.path.exists(os.path.join(parent, "cgroup.subtree_control")):
+        return None
+    path = os.path.join(parent, f"afk-andy-{name}")
+    try:
+        with open(os.path.join(parent, "cgroup.subtree_control")) as f:
+            if "memory" not in f.read().split():
+                with open(os.path.join(parent, "cgroup.subtree_control"), "w") as w:
+                    w.write("+memory")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "memory.max"), "w") as f:
+            f.write(str(memory_max))
+        # Reclaim pressure a bit below the hard cap, so the JVM slows before the OOM killer fires
+        with open(os.path.join(path, "memory.high"), "w") as f:
+            f.write(str(memory_max * 9 // 10))
+    except OSError as e:
+        log.warning(f"cgroup for {name} unavailable ({e})")
+        return None
+    return path
+
+
+# Runs as the spawned process: join the cgroup, then exec the rest of argv in place (same pid).
+# A failed write stops here, so the JVM never runs outside the cap it was sized for.
+JOIN_CGROUP = 'echo $$ > "$0/cgroup.procs" && exec "$@"'
+
+
+def command_prefix(cpus: set = None, cgroup: str = None) -> list:
+    """argv to put in front of the java command, so every JVM thread starts pinned and capped.
+
+    Done with exec wrappers rather than a preexec_fn: the bot has threads
+    running by now, and code between fork and exec can deadlock the child.
+    """
+    prefix = []
+    if cgroup:
+        prefix += ["sh", "-c", JOIN_CGROUP, cgroup]
+    if cpus:
+        prefix += ["taskset", "-c", ",".join(map(str, sorted(cpus)))]
+    return prefix
+
+
+def limits_for(name: str, cpus: set, memory_max: int):
+    """(argv prefix, description) for spawning an instance's JVM."""
+    notes = []
+    cgroup = None
+    if cpus:
+        available = os.sched_getaffinity(0)
+        if not cpus <= available:
+            log.warning(f"{name}: CPUs {sorted(cpus - available)} aren't available, ignoring them")
+            cpus = (cpus & available) or None
+        if cpus and not shutil.which("taskset"):
+            log.warning(f"{name}: taskset not found (util-linux), not pinning CPUs")
+            cpus = None
+        if cpus:
+            notes.append(f"CPUs {','.join(map(str, sorted(cpus)))}")
+    if memory_max:
+        cgroup = prepare_cgroup(name, memory_max)
+        if cgroup:
+            notes.append(f"memory.max {memory_max // 1024 ** 2}M")
+        else:
+            # An address-space rlimit would also count metaspace, code cache and
+            # thread stacks, and kill a JVM whose heap was sized to fit under it
+            log.warning(f"{name}: no delegated cgroup, memory_max only sizes the heap")
+    return command_prefix(cpus, cgroup), ", ".join(notes)
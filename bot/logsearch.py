@@ -0,0 +1,307 @@
+import os
+import re
+import gzip
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from logwatch import parse_line, LINE_RE, ERROR, WARN
+
+log = logging.getLogger("afk-andy")
+
+LOG_SEARCH_WORKERS = int(os.getenv("LOG_SEARCH_WORKERS", "0")) or None
+MAX_MATCHES_PER_FILE = 2000
+CACHE_ENTRIES = 256
+PAGE_LINES = 10
+PAGE_LINE_CHARS = 110  # 10 of these plus the header stay under Discord's 2000
+
+ARCHIVE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})-\d+\.log\.gz$")
+INDEX_VERSION = 1
+
+
+def open_log(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def file_date(path: str) -> datetime:
+    """Day a log file starts on: from the archive name, or worked back from the mtime for latest.log."""
+    match = ARCHIVE_RE.match(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y-%m-%d")
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    if key not in _start_days:
+        if len(_start_days) > 16:
+            _start_days.clear()
+        _start_days[key] = _start_day(path, st.st_mtime)
+    return _start_days[key]
+
+
+_start_days = {}
+
+
+def _start_day(path: str, mtime: float) -> datetime:
+    # The last line was written at about mtime, so it gets mtime's day (or the day before, if its time
+    # is later than mtime's); each midnight rollover between the first and last line moves the start back
+    last, rollovers = None, 0
+    with open_log(path) as f:
+        for line in f:
+            match = LINE_RE.match(line.rstrip("\n"))
+            if not match:
+                continue
+            h, m, s = (int(x) for x in match.group("time").split(":"))
+            seconds = h * 3600 + m * 60 + s
+            if last is not None and seconds < last - 3600:  # same rule as LogClock
+                rollovers += 1
+            last = seconds
+    end = datetime.fromtimestamp(mtime)
+    day = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    if last is not None and day + timedelta(seconds=last) > end + timedelta(minutes=5):
+        day -= timedelta(days=1)
+    return day - timedelta(days=rollovers)
+
+
+class LogClock:
+    """Turns [HH:MM:SS] into full timestamps, rolling the day over at midnight."""
+
+    def __init__(self, day: datetime):
+        self.day = day
+        self.last = None
+
+    def stamp(self, hms: str) -> float:
+        h, m, s = (int(x) for x in hms.split(":"))
+        seconds = h * 3600 + m * 60 + s
+        if self.last is not None and seconds < self.last - 3600:
+            self.day += timedelta(days=1)
+        self.last = seconds
+        return (self.day + timedelta(seconds=seconds)).timestamp()
+
+
+def build_index(path: str) -> dict:
+    """Sidecar summary of one log file: time range, players seen, warn/error counts."""
+    clock = LogClock(file_date(path))
+    start = end = None
+    players, errors, warns, lines = set(), 0, 0, 0
+    with open_log(path) as f:
+        for line in f:
+            lines += 1
+            event = parse_line(line.rstrip("\n"))
+            if event is None:
+                continue
+            ts = clock.stamp(event.time)
+            start = ts if start is None else start
+            end = ts
+            if event.player:
+                players.add(event.player.lower())
+            elif event.kind == ERROR:
+                errors += 1
+            elif event.kind == WARN:
+                warns += 1
+    st = os.stat(path)
+    return {
+        "version": INDEX_VERSION, "size": st.st_size, "mtime": st.st_mtime,
+        "start": start, "end": end, "players": sorted(players),
+        "errors": errors, "warns": warns, "lines": lines,
+    }
+
+
+def scan_file(path: str, pattern: str, player: str, since: float) -> tuple:
+    """Stream one file and return (matches, total) where matches is [(ts, line)]."""
+    regex = compile_pattern(pattern)
+    player = player.lower() if player else None
+    clock = LogClock(file_date(path))
+    matches, total = [], 0
+    with open_log(path) as f:
+        for line in f:
+            m = LINE_RE.match(line)
+            ts = clock.stamp(m.group("time")) if m else None
+            if not regex.search(line):
+                continue
+            if player and player not in line.lower():
+                continue
+            if since and (ts is None or ts < since):
+                continue
+            total += 1
+            if len(matches) < MAX_MATCHES_PER_FILE:
+                matches.append((ts or 0.0, line.rstrip("\n")))
+    return matches, total
+
+
+def compile_pattern(pattern: str):
+    """Case-insensitive regex; falls back to a literal match if it doesn't compile."""
+    try:
+        return re.compile(pattern, re.I)
+    except re.error:
+        return re.compile(re.escape(pattern), re.I)
+
+
+class LogSearch:
+    """Search over latest.log and the gzipped archives next to it.
+
+    Every rotated archive gets a JSON sidecar under index_dir the first time
+    it's seen. Queries use the sidecars to skip whole files by time range or
+    player. The remaining files are scanned in a process pool, streaming
+    lines out of gzip. Archives never change, so per-archive results are
+    cached by (file, query), and repeating a query only rescans latest.log.
+    """
+
+    def __init__(self, logs_dir: str, index_dir: str, workers: int = LOG_SEARCH_WORKERS):
+        self.logs_dir = logs_dir
+        self.index_dir = index_dir
+        self.workers = workers
+        self.indexes = {}
+        self._pool = None
+        self._cache = OrderedDict()
+        self._lock = asyncio.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def archives(self) -> list:
+        try:
+            names = os.listdir(self.logs_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(self.logs_dir, n) for n in names if ARCHIVE_RE.match(n))
+
+    def _sidecar(self, archive: str) -> str:
+        return os.path.join(self.index_dir, os.path.basename(archive) + ".json")
+
+    async def refresh_index(self) -> int:
+        """Index archives that are new or changed since last time. Returns how many were built."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            todo = []
+            for path in self.archives():
+                idx = self.indexes.get(path) or self._load_sidecar(path)
+                st = os.stat(path)
+                if idx and idx.get("version") == INDEX_VERSION and idx["size"] == st.st_size \
+                        and idx["mtime"] == st.st_mtime:
+                    self.indexes[path] = idx
+                else:
+                    todo.append(path)
+            if not todo:
+                return 0
+            built = await asyncio.gather(
+                *(loop.run_in_executor(self._executor(), build_index, p) for p in todo),
+                return_exceptions=True,
+            )
+            for path, idx in zip(todo, built):
+                if isinstance(idx, Exception):
+                    log.warning(f"Couldn't index {path}: {idx}")
+                    continue
+                self.indexes[path] = idx
+                with open(self._sidecar(path), "w") as f:
+                    json.dump(idx, f)
+            live = set(self.archives())
+            self.indexes = {p: i for p, i in self.indexes.items() if p in live}
+            return len(todo)
+
+    def _load_sidecar(self, path: str):
+        try:
+            with open(self._sidecar(path)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def candidates(self, player: str = None, since: float = None) -> list:
+        """Archives the sidecar indexes can't rule out, plus latest.log."""
+        player = player.lower() if player else None
+        paths = []
+        for path, idx in sorted(self.indexes.items()):
+            if idx["start"] is None:
+                continue
+            if since and idx["end"] < since:
+                continue
+            if player and player not in idx["players"]:
+                continue
+            paths.append(path)
+        latest = os.path.join(self.logs_dir, "latest.log")
+        if os.path.exists(latest):
+            paths.append(latest)
+        return paths
+
+    async def search(self, pattern: str, player: str = None, since: float = None) -> dict:
+        await self.refresh_index()
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        paths = self.candidates(player, since)
+        results, pending = {}, []
+        for path in paths:
+            # Archives entirely after the cutoff don't need it, which keeps relative
+            # --since values from defeating the cache
+            idx = self.indexes.get(path)
+            cutoff = None if idx and since and idx["start"] >= since else since
+            key = (path, pattern, player, cutoff)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                results[path] = self._cache[key]
+            else:
+                pending.append(key)
+        scanned = await asyncio.gather(
+            *(loop.run_in_executor(self._executor(), scan_file, *key) for key in pending),
+            return_exceptions=True,
+        )
+        for key, result in zip(pending, scanned):
+            path = key[0]
+            if isinstance(result, Exception):
+                log.warning(f"Couldn't scan {path}: {result}")
+                continue
+            results[path] = result
+            if path.endswith(".gz"):
+                self._cache[key] = result
+                if len(self._cache) > CACHE_ENTRIES:
+                    self._cache.popitem(last=False)
+
+        matches = [m for found, _ in results.values() for m in found]
+        matches.sort(key=lambda m: m[0], reverse=True)
+        return {
+            "matches": matches,
+            "total": sum(total for _, total in results.values()),
+            "files": len(paths),
+            "skipped": len(self.indexes) - sum(1 for p in paths if p.endswith(".gz")),
+            "scanned": len(pending),
+            "seconds": time.perf_counter() - started,
+        }
+
+
+def parse_since(text: str) -> float:
+    """'2d' / '12h' (ago) or '2026-01-31' -> epoch seconds."""
+    from perf import parse_window
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").timestamp()
+    except ValueError:
+        return time.time() - parse_window(text)
+
+
+def format_page(result: dict, page: int, query: str) -> str:
+    matches = result["matches"]
+    pages = max(1, -(-len(matches) // PAGE_LINES))
+    page = min(max(page, 1), pages)
+    chunk = matches[(page - 1) * PAGE_LINES:page * PAGE_LINES]
+    lines = []
+    for ts, line in chunk:
+        day = datetime.fromtimestamp(ts).strftime("%m-%d") if ts else "?"
+        lines.append(f"{day} {line[:PAGE_LINE_CHARS]}")
+    body = "\n".join(lines).replace("```", "`‵`") or "(no matches)"
+    more = f" • `!logs page {page + 1}` for more" if page < pages else ""
+    capped = f" (showing {len(matches)})" if len(matches) < result["total"] else ""
+    return (
+        f"**{result['total']} matches for `{query[:80]}`**{capped} — page {page}/{pages}, "
+        f"{result['files']} files searched, {result['skipped']} skipped by index, "
+        f"{result['seconds']:.2f}s{more}\n```\n{body}\n```"
+    )
@@ -0,0 +1,230 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from dataclasses import dataclass
+
+log = logging.getLogger("afk-andy")
+
+LOG_POLL_INTERVAL = float(os.getenv("LOG_POLL_INTERVAL", "0.5"))
+RELAY_WINDOW = float(os.getenv("LOG_RELAY_WINDOW", "3"))
+RELAY_KINDS = set(os.getenv("LOG_RELAY_KINDS", "chat,join,leave,advancement,death").split(","))
+
+# Event kinds
+CHAT = "chat"
+JOIN = "join"
+LEAVE = "leave"
+ADVANCEMENT = "advancement"
+DEATH = "death"
+WARN = "warn"
+ERROR = "error"
+
+NAME = r"(?P<player>[A-Za-z0-9_]{1,16})"
+LINE_RE = re.compile(r"^\[(?P<time>[\d:]{8})\] \[(?P<thread>[^\]]*?)/(?P<level>[A-Z]+)\]: (?P<msg>.*)$")
+CHAT_RE = re.compile(r"^(?:\[Not Secure\] )?<" + NAME + r"> (?P<text>.*)$")
+JOIN_RE = re.compile(r"^" + NAME + r" joined the game$")
+LEAVE_RE = re.compile(r"^" + NAME + r" left the game$")
+ADVANCEMENT_RE = re.compile(
+    r"^" + NAME + r" has (?:made the advancement|completed the challenge|reached the goal) \[(?P<text>.+)\]$"
+)
+DEATH_RE = re.compile(
+    r"^" + NAME + r" (?P<text>(?:was |fell |drowned|blew up|burned|hit the ground|tried to swim|"
+    r"starved|suffocated|withered|died|walked into|experienced kinetic|froze|went up in flames|"
+    r"went off with a bang|discovered the floor|didn't want to live|left the confines).*)$"
+)
+
+
+@dataclass
+class LogEvent:
+    kind: str
+    time: str
+    player: str = None
+    text: str = ""
+    raw: str = ""
+
+    def format(self) -> str:
+        """Discord line for the event. Player-typed text is escaped so it can't ping or format."""
+        from discord.utils import escape_markdown, escape_mentions
+        player = escape_markdown(self.player or "")
+        text = escape_mentions(escape_markdown(self.text or ""))
+        if self.kind == CHAT:
+            return f"**<{player}>** {text}"
+        if self.kind == JOIN:
+            return f"➡️ **{player}** joined"
+        if self.kind == LEAVE:
+            return f"⬅️ **{player}** left"
+        if self.kind == ADVANCEMENT:
+            return f"\U0001f3c6 **{player}** got [{text}]"
+        if self.kind == DEATH:
+            return f"\U0001f480 **{player}** {text}"
+        return f"`[{self.kind.upper()}]` {text}"
+
+
+def parse_line(line: str):
+    """Turn one latest.log line into a LogEvent, or None if it's not interesting."""
+    match = LINE_RE.match(line)
+    if not match:
+        return None
+    when, level, msg = match.group("time"), match.group("level"), match.group("msg")
+    if level == "WARN":
+        return LogEvent(WARN, when, text=msg, raw=line)
+    if level == "ERROR":
+        return LogEvent(ERROR, when, text=msg, raw=line)
+    if level != "INFO":
+        return None
+    for kind, pattern in ((CHAT, CHAT_RE), (JOIN, JOIN_RE), (LEAVE, LEAVE_RE),
+                          (ADVANCEMENT, ADVANCEMENT_RE), (DEATH, DEATH_RE)):
+        m = pattern.match(msg)
+        if m:
+            groups = m.groupdict()
+            return LogEvent(kind, when, player=groups["player"], text=groups.get("text") or "", raw=line)
+    return None
+
+
+class LogFollower:
+    """Reads only newly appended lines of a log file.
+
+    Keeps the byte offset and inode between reads. A new inode means the file
+    was rotated, a size smaller than the offset means it was truncated; both
+    restart from the top of the new file. With a state_path the offset
+    survives bot restarts.
+    """
+
+    def __init__(self, path: str, state_path: str = None):
+        self.path = path
+        self.state_path = state_path
+        self.inode = None
+        self.offset = None
+        self._partial = b""
+        self._load_state()
+
+    def _load_state(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self.inode, self.offset = state["inode"], state["offset"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def save_state(self):
+        if not self.state_path or self.inode is None:
+            return
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            # Don't count a half-written trailing line as consumed
+            json.dump({"inode": self.inode, "offset": self.offset - len(self._partial)}, f)
+        os.replace(tmp, self.state_path)
+
+    def read_new(self) -> list:
+        """Return complete lines appended since the last call."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if self.offset is None:
+            # First run with no saved state: don't replay old history
+            self.inode, self.offset = st.st_ino, st.st_size
+            return []
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.inode, self.offset, self._partial = st.st_ino, 0, b""
+        if st.st_size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+        self.offset += len(data)
+
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        return [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+
+
+class LogWatcher:
+    """Polls latest.log and hands parsed events to subscribers."""
+
+    def __init__(self, path: str, state_path: str = None, interval: float = LOG_POLL_INTERVAL):
+        self.follower = LogFollower(path, state_path)
+        self.interval = interval
+        self._subscribers = []
+        self._task = None
+
+    def subscribe(self, callback):
+        """callback(event) is called for every parsed event."""
+        self._subscribers.append(callback)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.follower.save_state()
+
+    def poll(self) -> list:
+        events = []
+        for line in self.follower.read_new():
+            event = parse_line(line)
+            if event:
+                events.append(event)
+        for event in events:
+            for callback in self._subscribers:
+                try:
+                    callback(event)
+                except Exception as e:
+                    log.error(f"Log subscriber failed on {event.kind}: {e}")
+        return events
+
+    async def _run(self):
+        saved_offset = self.follower.offset
+        while True:
+            try:
+                self.poll()
+                if self.follower.offset != saved_offset:
+                    self.follower.save_state()
+                    saved_offset = self.follower.offset
+            except OSError as e:
+                log.error(f"Reading server log failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+class DiscordRelay:
+    """Batches log events into one Discord message per window."""
+
+    def __init__(self, get_channel, window: float = RELAY_WINDOW, kinds: set = RELAY_KINDS):
+        self.get_channel = get_channel
+        self.window = window
+        self.kinds = kinds
+        self._lines = []
+        self._flush_task = None
+
+    def __call__(self, event: LogEvent):
+        if event.kind not in self.kinds:
+            return
+        self._lines.append(event.format())
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        from discord import AllowedMentions
+        await asyncio.sleep(self.window)
+        lines, self._lines = self._lines, []
+        self._flush_task = None
+        channel = self.get_channel()
+        if not channel or not lines:
+            return
+        chunk = ""
+        for line in lines:
+            line = line[:1800]
+            if len(chunk) + len(line) + 1 > 1900:
+                await channel.send(chunk, allowed_mentions=AllowedMentions.none())
+                chunk = ""
+            chunk += line + "\n"
+        if chunk:
+            await channel.send(chunk, allowed_mentions=AllowedMentions.none())
@@ -7,101 +7,28 @@ import logging
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(os.path.expanduser("~/afk-andy/memory/errors.log")),
-        logging.StreamHandler(),
-    ],
-)
+from chat import ChatResponder, FALLBACK_REPLIES  # noqa: E402 — reads env at import
+
 log = logging.getLogger("afk-andy")
 
+
+def _env_id(name: str):
+    """Discord snowflake from .env, or None if unset. Checked at startup, not import."""
+    value = os.getenv(name, "").strip()
+    return int(value) if value.isdigit() else None
+
+
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-CHANNEL_ID = int(os.getenv("DISCORD_CHANNEL_ID"))
-ALLOWED_USERS = {
-    int(os.getenv("LEO_DISCORD_ID")),
-    int(os.getenv("EUGENE_DISCORD_ID")),
-}
+CHANNEL_ID = _env_id("DISCORD_CHANNEL_ID")
+ALLOWED_USERS = {uid for uid in (_env_id("LEO_DISCORD_ID"), _env_id("EUGENE_DISCORD_ID")) if uid}
 
 intents = discord.Intents.default()
 intents.message_content = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
 
-# Casual chat responses for non-command messages
-CHAT_RESPONSES = {
-    "greetings": {
-        "triggers": ["hey andy", "hi andy", "yo andy", "sup andy", "hello andy", "whats up andy", "hey", "yo", "sup", "hello"],
-        "replies": [
-            "Yo! What's up?",
-            "Hey! Need something?",
-            "What's good! Server's running smooth.",
-            "Sup! I'm here. `!status` to check the server.",
-            "Hey hey! What's the move?",
-        ],
-    },
-    "thanks": {
-        "triggers": ["thanks andy", "thank you andy", "thanks", "thank you", "thx", "ty", "good job", "nice work", "nice one", "well done", "great job", "looks good", "perfect", "awesome"],
-        "replies": [
-            "Anytime! That's what I'm here for.",
-            "No problem. Got more for me?",
-            "Glad you like it! What's next?",
-            "Thanks! I try. Want me to keep going?",
-            "Appreciate it! I'm ready for the next one.",
-        ],
-    },
-    "how": {
-        "triggers": ["how are you", "how you doing", "you good", "you alive"],
-        "replies": [
-            "I'm good! Server's warm, blocks are flowing. You?",
-            "Living the dream. Literally. I'm a bot.",
-            "Running smooth. Server's up and ready.",
-            "Online and caffeinated. Well, electrically speaking.",
-        ],
-    },
-    "what": {
-        "triggers": ["what can you do", "what do you do", "help", "commands"],
-        "replies": [
-            "Here's what I got:\n`!start` - Start the MC server\n`!stop` - Stop the server\n`!restart` - Restart the server\n`!status` - Server info + players\n`!players` - Who's online\n`!whitelist add/remove/list` - Manage whitelist\n`!cmd <command>` - Run any MC command\n`!say <message>` - Chat in-game from Discord\n`!backup` - Save the world\n`!yo` - Just say hi\n\nOr just talk to me, I'm not just a command bot!",
-        ],
-    },
-    "opinion": {
-        "triggers": ["what do you think", "thoughts?", "your opinion", "how does it look", "is it good"],
-        "replies": [
-            "I think it's looking solid. But I'm biased - I built it.",
-            "Honestly? Pretty clean. But you tell me - you're the boss.",
-            "I dig it. Want me to change anything?",
-            "It's getting there! What do you think needs work?",
-        ],
-    },
-    "bored": {
-        "triggers": ["im bored", "i'm bored", "nothing to do", "boring"],
-        "replies": [
-            "Bored? Hop on the server! `!start` if it's not running.",
-            "You're bored but the server's right here? Go mine something.",
-            "Bored? Sounds like you need to go punch some trees.",
-        ],
-    },
-    "funny": {
-        "triggers": ["tell me a joke", "joke", "make me laugh", "lol", "lmao", "haha"],
-        "replies": [
-            "Why do programmers prefer dark mode? Because light attracts bugs.",
-            "I'd tell you a UDP joke, but you might not get it.",
-            "A SQL query walks into a bar, walks up to two tables and asks... 'Can I JOIN you?'",
-            "There are only 10 types of people in the world. Those who understand binary, and those who don't.",
-            "Why was the JavaScript developer sad? Because he didn't Node how to Express himself.",
-        ],
-    },
-}
-
-# Fallback when nothing matches
-FALLBACK_REPLIES = [
-    "Not sure what you mean, but I'm here! Need `!status`?",
-    "I'm better at managing servers than conversations, ngl. Try `!status`.",
-    "Hmm, didn't catch that. `!start` or `!status` if you need the server.",
-    "I hear you. Want me to do something? Try `!start` or `!status`.",
-]
+# Casual chat responses for non-command messages (see chat.py)
+chat = ChatResponder()
 
 
 @bot.event
@@ -135,15 +62,12 @@ async def on_message(message):
         await bot.process_commands(message)
         return
 
-    # Casual chat — check triggers
-    content_lower = content.lower().strip("?.!,")
-    for category in CHAT_RESPONSES.values():
-        for trigger in category["triggers"]:
-            if trigger in content_lower:
-                await message.add_reaction("\U0001f4ac")  # speech bubble
-                reply = random.choice(category["replies"])
-                await message.reply(reply, mention_author=False)
-                return
+    # Casual chat — one pass of the compiled trigger matcher
+    matched = chat.reply_for(content)
+    if matched:
+        await message.add_reaction("\U0001f4ac")  # speech bubble
+        await message.reply(random.choice(matched[1]), mention_author=False)
+        return
 
     # If nothing matched and message is short (likely directed at Andy), use fallback
     # Skip fallback for long messages (probably people talking to each other)
@@ -156,13 +80,99 @@ async def on_message(message):
 
 async def setup_hook():
     from commands import setup_commands
+    from minecraft import supervisor
+    from poller import ServerPoller
     setup_commands(bot)
+    supervisor.adopt()
+    bot.poller = ServerPoller()
+    bot.poller.start()
+
+    from instances import InstanceRegistry
+    bot.instances = InstanceRegistry(bot.poller)
+    bot.instances.adopt()
+
+    from logwatch import LogWatcher, DiscordRelay
+    from minecraft import MC_DIR
+    from utils import MEMORY_DIR
+    bot.log_watcher = LogWatcher(
+        os.path.join(MC_DIR, "logs", "latest.log"),
+        state_path=os.path.join(MEMORY_DIR, "logwatch-offset.json"),
+    )
+    bot.log_watcher.subscribe(DiscordRelay(lambda: bot.get_channel(CHANNEL_ID)))
+
+    from sessions import SessionStore, SessionTracker
+    bot.sessions = SessionStore(os.path.join(MEMORY_DIR, "sessions.db"))
+    bot.session_tracker = SessionTracker(bot.sessions, bot.poller)
+    bot.session_tracker.backfill(os.path.join(MC_DIR, "logs"), bot.log_watcher.follower)
+    bot.log_watcher.subscribe(bot.session_tracker)
+    supervisor.on_stopped.append(bot.session_tracker.on_stopped)
+    bot.session_tracker.start()
+    bot.log_watcher.start()
+
+    from logsearch import LogSearch
+    bot.log_search = LogSearch(os.path.join(MC_DIR, "logs"), os.path.join(MEMORY_DIR, "log-index"))
+    bot.log_results = {}
+    bot.loop.create_task(bot.log_search.refresh_index())  # index existing archives in the background
+
+    from backup import BackupEngine
+    bot.backups = BackupEngine(MC_DIR)
+    bot.backups.start_schedule()
+
+    from perf import PerfRecorder
+
+    async def announce(text):
+        channel = bot.get_channel(CHANNEL_ID)
+        if channel:
+            await channel.send(text)
+
+    bot.perf = PerfRecorder(bot.poller, announce)
+    bot.perf.start()
+
+    from idle import IdleManager
+    bot.idle = IdleManager(bot.poller, supervisor, notify=announce)
+    bot.idle.start()
+
+    from governor import Governor, GOVERNOR_ENABLED
+    bot.governor = Governor(os.path.join(MEMORY_DIR, "governor-state.json"), bot.poller, supervisor,
+                            notify=announce)
+    if GOVERNOR_ENABLED:
+        bot.governor.start()
+
+    from pregen import PregenJob
+    bot.pregen = PregenJob(os.path.join(MEMORY_DIR, "pregen-state.json"), bot.poller, notify=announce)
+    bot.log_watcher.subscribe(bot.pregen.on_log_event)
+    bot.pregen.start()  # resumes an unfinished job from its checkpoint
+
+    from builds import BuildQueue
+    bot.builds = BuildQueue(os.path.join(MEMORY_DIR, "builds"))
+
+    from gateway import RconGateway
+    bot.rcon_gateway = RconGateway()
+    await bot.rcon_gateway.start()
+
+    from dashboard import Dashboard
+    bot.dashboard = Dashboard(bot.poller, bot.perf)
+    await bot.dashboard.start()
+
+    from metrics import start_exporter
+    await start_exporter(bot.poller)
 
 
 bot.setup_hook = setup_hook
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(os.path.expanduser("~/afk-andy/memory/errors.log")),
+            logging.StreamHandler(),
+        ],
+    )
     if not TOKEN:
         log.error("DISCORD_BOT_TOKEN not set in .env")
         exit(1)
+    if CHANNEL_ID is None or not ALLOWED_USERS:
+        log.error("DISCORD_CHANNEL_ID and LEO_DISCORD_ID / EUGENE_DISCORD_ID must be set in .env")
+        exit(1)
     bot.run(TOKEN)
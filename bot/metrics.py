@@ -0,0 +1,294 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+
+log = logging.getLogger("afk-andy")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+SERVER_GAUGE_INTERVAL = float(os.getenv("METRICS_SERVER_INTERVAL", "30"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_num(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def clear(self):
+        self._values.clear()
+
+    def render(self) -> list:
+        if self.fn is not None:
+            try:
+                value = self.fn()
+            except Exception:
+                value = None
+            self._values = {} if value is None else {(): value}
+        return super().render()
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; observe() is a bisect and two adds."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._values.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = f'le="{_num(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.register(Histogram(
+    "afk_command_seconds", "Time spent in each Discord command handler.", ("command",)))
+COMMAND_TOTAL = REGISTRY.register(Counter(
+    "afk_commands_total", "Discord commands handled.", ("command", "result")))
+RCON_SECONDS = REGISTRY.register(Histogram(
+    "afk_rcon_seconds", "RCON round trip time.", ("command",)))
+RCON_TOTAL = REGISTRY.register(Counter(
+    "afk_rcon_requests_total", "RCON requests by result and server state.", ("result", "state")))
+LOOP_LAG = REGISTRY.register(Gauge(
+    "afk_event_loop_lag_seconds", "How late the last event loop heartbeat fired."))
+SERVER_GAUGES = {
+    name: REGISTRY.register(Gauge(f"afk_mc_{name}", help))
+    for name, help in (
+        ("tps", "Server TPS over the last minute."),
+        ("mspt", "Average milliseconds per tick over the last 5 seconds."),
+        ("players", "Players online."),
+        ("loaded_chunks", "Loaded chunks across all worlds (paper chunkinfo)."),
+        ("entities", "Loaded entities across all worlds."),
+        ("jvm_heap_used_bytes", "JVM heap in use (jcmd GC.heap_info)."),
+        ("jvm_rss_bytes", "Resident memory of the server process."),
+    )
+}
+
+
+def rcon_label(command: str) -> str:
+    """First word of an RCON command, so label cardinality stays small."""
+    return command.split(" ", 1)[0][:32] or "empty"
+
+
+def _executor_queue_depth():
+    loop = asyncio.get_event_loop()
+    executor = getattr(loop, "_default_executor", None)
+    queue = getattr(executor, "_work_queue", None)
+    return queue.qsize() if queue is not None else 0
+
+
+REGISTRY.register(Gauge(
+    "afk_default_executor_queue_depth", "Jobs waiting for a default executor thread.",
+    fn=_executor_queue_depth))
+
+
+def instrument_commands(bot):
+    """Time every command with the bot's before/after invoke hooks."""
+
+    @bot.before_invoke
+    async def _start_timer(ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    @bot.after_invoke
+    async def _stop_timer(ctx):
+        started = getattr(ctx, "metrics_started", None)
+        if started is None or ctx.command is None:
+            return
+        name = ctx.command.qualified_name
+        COMMAND_SECONDS.observe(time.perf_counter() - started, command=name)
+        COMMAND_TOTAL.inc(command=name, result="error" if ctx.command_failed else "ok")
+
+
+CHUNKS_RE = re.compile(r"Total:\s*(\d+)")
+COUNT_RE = re.compile(r"count:\s*(\d+)")
+HEAP_RE = re.compile(r"used (\d+)([KMG])")
+UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+async def _heap_used(pid: int):
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "jcmd", str(pid), "GC.heap_info",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await asyncio.wait_for(proc.communicate(), 10)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    match = HEAP_RE.search(out.decode(errors="replace"))
+    return int(match.group(1)) * UNITS[match.group(2)] if match else None
+
+
+def _rss(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def collect_server_gauges(snapshot):
+    """Refresh the server gauges from a poller snapshot plus a few extra queries."""
+    from minecraft import async_rcon, supervisor, READY
+    g = SERVER_GAUGES
+    for gauge in g.values():
+        gauge.clear()
+    if snapshot.state != READY:
+        return
+    if snapshot.tps:
+        g["tps"].set(snapshot.tps[0])
+    if snapshot.mspt:
+        g["mspt"].set(snapshot.mspt[0])
+    g["players"].set(len(snapshot.players))
+
+    chunks, entities = await asyncio.gather(
+        async_rcon("paper chunkinfo *"), async_rcon("execute if entity @e"),
+        return_exceptions=True,
+    )
+    if isinstance(chunks, str):
+        totals = CHUNKS_RE.findall(chunks)
+        if totals:
+            # With several worlds the last "Total" is the all-worlds sum
+            g["loaded_chunks"].set(int(totals[-1]))
+    if isinstance(entities, str):
+        match = COUNT_RE.search(entities)
+        if match:
+            g["entities"].set(int(match.group(1)))
+    if supervisor.pid:
+        heap = await _heap_used(supervisor.pid)
+        if heap is not None:
+            g["jvm_heap_used_bytes"].set(heap)
+        rss = _rss(supervisor.pid)
+        if rss is not None:
+            g["jvm_rss_bytes"].set(rss)
+
+
+async def _collect_loop(poller, interval: float):
+    while True:
+        try:
+            await collect_server_gauges(await poller.get(max_age=interval))
+        except Exception as e:
+            log.error(f"Collecting server metrics failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def _lag_loop(interval: float = 1.0):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.set(max(0.0, loop.time() - expected))
+
+
+async def start_exporter(poller, host: str = METRICS_HOST, port: int = METRICS_PORT,
+                         interval: float = SERVER_GAUGE_INTERVAL):
+    """Serve /metrics in Prometheus text format. Port 0 disables it."""
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        log.warning(f"Metrics exporter couldn't bind {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    asyncio.create_task(_collect_loop(poller, interval))
+    asyncio.create_task(_lag_loop())
+    log.info(f"Metrics on http://{host}:{port}/metrics")
+    return runner
@@ -1,10 +1,18 @@
 import os
-import subprocess
+import re
+import time
 import asyncio
 import logging
+import contextlib
+from collections import deque
 
 from mcrcon import MCRcon
 
+from rcon import RconPool, RconError
+from metrics import RCON_SECONDS, RCON_TOTAL, rcon_label
+from jvm import JVM_PROFILE, build_command
+from limits import parse_cpus, parse_bytes, limits_for
+
 log = logging.getLogger("afk-andy")
 
 MC_DIR = os.getenv("MC_SERVER_DIR", os.path.expanduser("~/afk-andy/minecraft"))
@@ -13,49 +21,383 @@ MC_RAM = os.getenv("MC_RAM", "4G")
 RCON_HOST = os.getenv("RCON_HOST", "localhost")
 RCON_PORT = int(os.getenv("RCON_PORT", "25575"))
 RCON_PASSWORD = os.getenv("RCON_PASSWORD", "changeme")
-SCREEN_NAME = "minecraft-afkandy"
+RCON_POOL_SIZE = int(os.getenv("RCON_POOL_SIZE", "2"))
+RCON_TIMEOUT = float(os.getenv("RCON_TIMEOUT", "5"))
+STOP_TIMEOUT = float(os.getenv("MC_STOP_TIMEOUT", "90"))
+INSTANCE_NAME = os.getenv("MC_INSTANCE_NAME", "main")
+MC_CPUS = os.getenv("MC_CPUS", "")
+MC_MEMORY_MAX = os.getenv("MC_MEMORY_MAX", "")
+PID_FILE = ".afk-andy.pid"
+CONSOLE_LINE_LIMIT = 1024 * 1024  # asyncio's default 64 KiB is less than some stack traces and NBT dumps
 
+# Server states
+STOPPED = "stopped"
+STARTING = "starting"
+READY = "ready"
+STOPPING = "stopping"
 
-def is_server_running() -> bool:
-    """Check if the MC screen session exists."""
-    result = subprocess.run(["screen", "-list"], capture_output=True, text=True)
-    return SCREEN_NAME in result.stdout
+DONE_RE = re.compile(r'Done \((\d+(?:\.\d+)?)s\)!')
 
+_rcon_pool = None
 
-def start_server() -> tuple:
-    """Start the Paper server in a detached screen session."""
-    if is_server_running():
-        return False, "Server is already running."
 
-    jar_path = os.path.join(MC_DIR, MC_JAR)
-    if not os.path.exists(jar_path):
-        return False, f"Server JAR not found at {jar_path}"
+class ServerBusy(Exception):
+    """The world can't be worked on right now: the server is up or other maintenance holds it."""
 
-    cmd = [
-        "screen", "-dmS", SCREEN_NAME,
-        "java", f"-Xms{MC_RAM}", f"-Xmx{MC_RAM}",
-        "-jar", MC_JAR, "nogui",
-    ]
+
+def _is_java(pid: int) -> bool:
     try:
-        subprocess.run(cmd, cwd=MC_DIR, check=True)
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"java" in f.read()
+    except FileNotFoundError:
+        return False
+    except OSError:
+        # No procfs (e.g. macOS) — trust the pid file
+        return True
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ServerSupervisor:
+    """Owns the Paper JVM as an asyncio subprocess.
+
+    State changes come from the process itself: the "Done (x.xxxs)!" line
+    marks it ready and the real process exit marks it stopped, so callers
+    can wait on those events instead of sleeping.
+    """
+
+    def __init__(self, mc_dir: str, jar: str, ram: str, profile: str = JVM_PROFILE,
+                 name: str = INSTANCE_NAME, rcon_pool: RconPool = None,
+                 cpus: str = None, memory_max: str = None):
+        self.mc_dir = mc_dir
+        self.jar = jar
+        self.ram = ram
+        self.profile = profile
+        self.name = name
+        self.rcon_pool = rcon_pool  # None means the shared default pool
+        self.cpus = parse_cpus(cpus)
+        self.memory_max = parse_bytes(memory_max)
+        self.host_share = 1.0  # fraction of host RAM an auto-sized heap may plan for
+        self.state = STOPPED
+        self.pid = None
+        self.exit_code = None
+        self.started_at = None
+        self.boot_seconds = None
+        self.recent_lines = deque(maxlen=200)
+        self._proc = None
+        self._ready = asyncio.Event()
+        self._exited = asyncio.Event()
+        self._exited.set()
+        self._waiters = []
+        self._watch_task = None
+        self.maintenance = None  # what's rewriting the world while it's down (a restore, a prune)
+        self.before_start = []  # async callables, awaited before the JVM is spawned
+        self.on_stopped = []    # callables, run after the process exits
+
+    @property
+    def has_console(self) -> bool:
+        """False for an adopted JVM, whose stdout went to the previous bot process."""
+        return self._proc is not None
+
+    @property
+    def pid_path(self) -> str:
+        return os.path.join(self.mc_dir, PID_FILE)
+
+    @contextlib.contextmanager
+    def maintenance_lock(self, what: str):
+        """Keep the server down while `what` rewrites the world; start() refuses until the block exits.
+
+        Raises ServerBusy if the server is up or other maintenance holds it.
+        """
+        if self.maintenance:
+            raise ServerBusy(f"Can't start {what}: {self.maintenance} is in progress.")
+        if self.state != STOPPED:
+            raise ServerBusy(f"Can't start {what}: server is {self.state}.")
+        self.maintenance = what
+        try:
+            yield
+        finally:
+            self.maintenance = None
+
+    def java_cmd(self, profile: str = None, gc_log: str = None) -> list:
+        return build_command(profile or self.profile, self.mc_dir, self.jar, self.ram, gc_log,
+                             self.memory_max, self.host_share)
+
+    def pool(self) -> RconPool:
+        return self.rcon_pool or get_rcon_pool()
+
+    async def rcon(self, command: str) -> str:
+        """Send a command over this instance's RCON pool."""
+        started = time.perf_counter()
+        try:
+            response = await self.pool().command(command)
+        except RconError:
+            RCON_TOTAL.inc(result="error", state=self.state)
+            raise
+        RCON_SECONDS.observe(time.perf_counter() - started, command=rcon_label(command))
+        RCON_TOTAL.inc(result="ok", state=self.state)
+        return response
+
+    async def rcon_batch(self, commands: list) -> list:
+        """Send several commands in order over one dedicated connection; a response or RconError each."""
+        started = time.perf_counter()
+        try:
+            results = await self.pool().batch(commands)
+        except RconError:
+            RCON_TOTAL.inc(result="error", state=self.state)
+            raise
+        for result in results:
+            RCON_TOTAL.inc(result="error" if isinstance(result, BaseException) else "ok", state=self.state)
+        RCON_SECONDS.observe(time.perf_counter() - started, command="batch")
+        return results
+
+    def adopt(self):
+        """Pick up a JVM left running by a previous bot process."""
+        try:
+            with open(self.pid_path) as f:
+                pid = int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return
+        if self.state != STOPPED or not _pid_alive(pid) or not _is_java(pid):
+            return
+        log.info(f"Adopting running server (pid {pid})")
+        self.pid = pid
+        self.state = READY
+        self.started_at = time.time()
+        self._ready.set()
+        self._exited.clear()
+        self._watch_task = asyncio.create_task(self._watch_adopted(pid))
+
+    async def start(self, profile: str = None, gc_log: str = None) -> tuple:
+        if self.state != STOPPED:
+            return False, f"Server is already {self.state}."
+        if self.maintenance:
+            return False, f"Can't start while {self.maintenance} is in progress."
+
+        jar_path = os.path.join(self.mc_dir, self.jar)
+        if not os.path.exists(jar_path):
+            return False, f"Server JAR not found at {jar_path}"
+
+        try:
+            cmd = self.java_cmd(profile, gc_log)
+        except ValueError as e:
+            return False, str(e)
+        self.state = STARTING  # claimed before the hooks run, so a second start() bails
+        try:
+            for hook in self.before_start:
+                await hook()
+        except Exception as e:
+            log.error(f"before_start hook failed for {self.name}: {e}")
+            self.state = STOPPED
+            for hook in self.on_stopped:
+                hook()
+            return False, f"Failed to start: {e}"
+        prefix, limits = limits_for(self.name, self.cpus, self.memory_max)
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *prefix, *cmd,
+                cwd=self.mc_dir,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True,
+                limit=CONSOLE_LINE_LIMIT,
+            )
+        except OSError as e:
+            self.state = STOPPED
+            for hook in self.on_stopped:
+                hook()
+            return False, f"Failed to start: {e}"
+
+        self.pid = self._proc.pid
+        self.exit_code = None
+        self.started_at = time.time()
+        self.boot_seconds = None
+        self._ready.clear()
+        self._exited.clear()
+        with open(self.pid_path, "w") as f:
+            f.write(str(self.pid))
+        self._watch_task = asyncio.create_task(self._watch(self._proc))
+        log.info(f"Server {self.name} started (pid {self.pid}{', ' + limits if limits else ''})")
         return True, "Server starting up..."
-    except subprocess.CalledProcessError as e:
-        return False, f"Failed to start: {e}"
 
+    async def stop(self, timeout: float = STOP_TIMEOUT) -> tuple:
+        if self.state == STOPPED:
+            return False, "Server is not running."
+        if self.state != STOPPING:
+            self.state = STOPPING
+            try:
+                await self.rcon("stop")
+                how = "via RCON"
+            except RconError:
+                await self.send_console("stop")
+                how = "via console"
+        else:
+            how = "already in progress"
 
-def stop_server() -> tuple:
-    """Stop the server gracefully via RCON, fall back to screen."""
-    if not is_server_running():
-        return False, "Server is not running."
+        if await self.wait_stopped(timeout):
+            return True, f"Server stopped ({how}, exit code {self.exit_code})."
 
-    try:
-        response = rcon_command("stop")
-        return True, "Server shutting down... " + response
-    except Exception:
-        subprocess.run([
-            "screen", "-S", SCREEN_NAME, "-p", "0", "-X", "stuff", "stop\n",
-        ])
-        return True, "Sent stop command via console."
+        log.warning(f"Server didn't exit within {timeout}s, terminating")
+        self._signal(15)
+        if not await self.wait_stopped(15):
+            self._signal(9)
+            await self.wait_stopped(5)
+        return True, "Server didn't shut down cleanly and was killed."
+
+    async def send_console(self, line: str) -> bool:
+        """Write a line to the server console (stdin). False if not attached."""
+        if not self._proc or self._proc.stdin is None or self._proc.stdin.is_closing():
+            return False
+        self._proc.stdin.write((line + "\n").encode())
+        await self._proc.stdin.drain()
+        return True
+
+    async def wait_ready(self, timeout: float = None) -> bool:
+        """Wait for the "Done" line. Returns False on timeout or if the JVM exits first."""
+        if self.state == STOPPED:
+            return False
+        waits = [asyncio.ensure_future(self._ready.wait()), asyncio.ensure_future(self._exited.wait())]
+        try:
+            await asyncio.wait(waits, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waits:
+                w.cancel()
+        return self._ready.is_set()
+
+    async def wait_stopped(self, timeout: float = None) -> bool:
+        return await self._wait_event(self._exited, timeout)
+
+    def expect_line(self, pattern) -> asyncio.Future:
+        """Register interest in a console line now, before triggering it.
+
+        The returned future resolves to the regex match.
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern)
+        future = asyncio.get_running_loop().create_future()
+        waiter = (pattern, future)
+        self._waiters.append(waiter)
+        future.add_done_callback(lambda _: self._waiters.remove(waiter))
+        return future
+
+    async def wait_for_line(self, pattern, timeout: float = None):
+        """Wait for a console line matching pattern; returns the match or None."""
+        try:
+            return await asyncio.wait_for(self.expect_line(pattern), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    @staticmethod
+    async def _wait_event(event: asyncio.Event, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _signal(self, sig: int):
+        if self.pid and _pid_alive(self.pid):
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _on_line(self, line: str):
+        self.recent_lines.append(line)
+        if self.state == STARTING:
+            match = DONE_RE.search(line)
+            if match:
+                self.boot_seconds = float(match.group(1))
+                self.state = READY
+                self._ready.set()
+                self.pool().reset_backoff()
+                log.info(f"Server {self.name} ready in {self.boot_seconds:.1f}s")
+        for pattern, future in list(self._waiters):
+            if not future.done():
+                match = pattern.search(line)
+                if match:
+                    future.set_result(match)
+
+    async def _watch(self, proc):
+        # Keep draining stdout whatever happens to one line, or the JVM blocks writing to the pipe
+        while True:
+            try:
+                raw = await proc.stdout.readline()
+            except ValueError:  # longer than the limit; readline has already dropped it
+                log.warning(f"Server {self.name}: skipped a console line over {CONSOLE_LINE_LIMIT} bytes")
+                continue
+            if not raw:
+                break
+            try:
+                self._on_line(raw.decode("utf-8", errors="replace").rstrip())
+            except Exception as e:
+                log.error(f"Server {self.name}: console line handler failed: {e}")
+        self.exit_code = await proc.wait()
+        self._proc = None
+        self._mark_stopped()
+
+    async def _watch_adopted(self, pid: int):
+        # No pipe to an adopted JVM, so fall back to a cheap liveness check
+        while _pid_alive(pid):
+            await asyncio.sleep(1)
+        self._mark_stopped()
+
+    def _mark_stopped(self):
+        log.info(f"Server {self.name} exited (code {self.exit_code})")
+        self.state = STOPPED
+        self.pid = None
+        self._ready.clear()
+        self._exited.set()
+        try:
+            os.remove(self.pid_path)
+        except FileNotFoundError:
+            pass
+        for hook in self.on_stopped:
+            hook()
+
+
+supervisor = ServerSupervisor(MC_DIR, MC_JAR, MC_RAM, cpus=MC_CPUS, memory_max=MC_MEMORY_MAX)
+
+
+def is_server_running() -> bool:
+    """Whether the server process is up (in any state but stopped)."""
+    return supervisor.state != STOPPED
+
+
+def server_state() -> str:
+    return supervisor.state
+
+
+async def start_server() -> tuple:
+    """Start the Paper server as a supervised subprocess."""
+    return await supervisor.start()
+
+
+async def stop_server() -> tuple:
+    """Stop the server gracefully and wait for the process to exit."""
+    return await supervisor.stop()
+
+
+async def restart_server(ready_timeout: float = 300, target: ServerSupervisor = None) -> tuple:
+    """Stop, wait for the real exit, start again and wait for "Done"."""
+    target = target or supervisor
+    if target.state != STOPPED:
+        await target.stop()
+    success, msg = await target.start()
+    if not success:
+        return False, msg
+    if not await target.wait_ready(ready_timeout):
+        return False, f"Server didn't finish loading within {ready_timeout:.0f}s."
+    return True, f"Server is back up (loaded in {target.boot_seconds:.1f}s)."
 
 
 def rcon_command(command: str) -> str:
@@ -65,7 +407,17 @@ def rcon_command(command: str) -> str:
     return response
 
 
+def get_rcon_pool() -> RconPool:
+    """Shared pool of persistent RCON connections, created on first use."""
+    global _rcon_pool
+    if _rcon_pool is None:
+        _rcon_pool = RconPool(
+            RCON_HOST, RCON_PORT, RCON_PASSWORD,
+            size=RCON_POOL_SIZE, timeout=RCON_TIMEOUT,
+        )
+    return _rcon_pool
+
+
 async def async_rcon(command: str) -> str:
-    """Async wrapper around RCON for use in discord.py commands."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, rcon_command, command)
+    """Send a command over the pooled RCON connection, for discord.py commands."""
+    return await supervisor.rcon(command)
@@ -0,0 +1,214 @@
+import os
+import re
+import math
+import time
+import asyncio
+import logging
+from array import array
+
+log = logging.getLogger("afk-andy")
+
+SAMPLE_INTERVAL = float(os.getenv("PERF_SAMPLE_INTERVAL", "5"))
+MSPT_BUDGET = float(os.getenv("PERF_MSPT_BUDGET", "50"))
+SUSTAIN_SECONDS = float(os.getenv("PERF_SUSTAIN_SECONDS", "30"))
+ALERT_COOLDOWN = float(os.getenv("PERF_ALERT_COOLDOWN", "600"))
+DROP_SIGMA = 3.0
+DROP_WINDOW = 60  # samples used for the rolling TPS baseline
+
+WINDOW_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class Ring:
+    """Fixed-size column store backed by array('d'); oldest rows are overwritten."""
+
+    def __init__(self, capacity: int, fields: tuple):
+        self.capacity = capacity
+        self.fields = fields
+        self.cols = {f: array("d", bytes(8 * capacity)) for f in fields}
+        self.head = 0
+        self.size = 0
+
+    def append(self, **values):
+        for f in self.fields:
+            self.cols[f][self.head] = values.get(f, math.nan)
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def latest(self, n: int):
+        """Indexes of the newest n rows, newest first."""
+        for i in range(min(n, self.size)):
+            yield (self.head - 1 - i) % self.capacity
+
+    def since(self, cutoff: float, field: str) -> list:
+        """Values of `field` for rows with ts >= cutoff (needs a "ts" column)."""
+        ts, col, out = self.cols["ts"], self.cols[field], []
+        for i in self.latest(self.size):
+            if ts[i] < cutoff:
+                break
+            out.append(col[i])
+        return out
+
+
+class Rollup:
+    """Downsamples raw samples into fixed-width buckets (min/avg/max)."""
+
+    FIELDS = ("ts", "mspt_avg", "mspt_max", "tps_avg", "tps_min", "spikes")
+
+    def __init__(self, bucket_seconds: float, capacity: int):
+        self.bucket_seconds = bucket_seconds
+        self.ring = Ring(capacity, self.FIELDS)
+        self._start = None
+        self._reset()
+
+    def _reset(self):
+        self._n = 0
+        self._mspt_sum = self._tps_sum = 0.0
+        self._mspt_max = -math.inf
+        self._tps_min = math.inf
+        self._spikes = 0
+
+    def add(self, ts: float, tps: float, mspt: float, spike: bool):
+        start = ts - ts % self.bucket_seconds
+        if self._start is not None and start != self._start:
+            self.flush()
+        self._start = start
+        self._n += 1
+        self._mspt_sum += mspt
+        self._tps_sum += tps
+        self._mspt_max = max(self._mspt_max, mspt)
+        self._tps_min = min(self._tps_min, tps)
+        self._spikes += spike
+
+    def flush(self):
+        if self._n:
+            self.ring.append(
+                ts=self._start, mspt_avg=self._mspt_sum / self._n, mspt_max=self._mspt_max,
+                tps_avg=self._tps_sum / self._n, tps_min=self._tps_min, spikes=self._spikes,
+            )
+        self._reset()
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def parse_window(text: str) -> float:
+    """'15m', '2h', '7d' -> seconds. Raises ValueError on anything else."""
+    match = WINDOW_RE.match((text or "1h").strip().lower())
+    if not match:
+        raise ValueError(f"Bad window `{text}`, use e.g. 15m, 2h, 7d.")
+    return float(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+class PerfRecorder:
+    """Samples TPS/MSPT on a fixed cadence and watches for lag.
+
+    Raw samples cover the last hour; one-minute and ten-minute rollups cover
+    24h and 7d. Alerts fire once per lag episode: MSPT over budget for
+    SUSTAIN_SECONDS, or TPS falling DROP_SIGMA deviations under its rolling
+    mean. A recovery note is posted when the episode ends.
+    """
+
+    RAW_FIELDS = ("ts", "tps", "mspt")
+
+    def __init__(self, poller, alert, interval: float = SAMPLE_INTERVAL,
+                 budget: float = MSPT_BUDGET, sustain: float = SUSTAIN_SECONDS,
+                 cooldown: float = ALERT_COOLDOWN):
+        self.poller = poller
+        self.alert = alert  # async callable(text)
+        self.interval = interval
+        self.budget = budget
+        self.sustain_samples = max(1, round(sustain / interval))
+        self.cooldown = cooldown
+        self.raw = Ring(int(3600 / interval) + 1, self.RAW_FIELDS)
+        self.minutes = Rollup(60, 24 * 60)
+        self.tens = Rollup(600, 7 * 24 * 6)
+        self._over = 0
+        self._in_episode = False
+        self._alerted = False
+        self._last_alert = -math.inf
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        from minecraft import READY
+        while True:
+            try:
+                snap = await self.poller.get(max_age=self.interval * 0.9)
+                if snap.state == READY and snap.tps and snap.mspt:
+                    await self.record(snap.timestamp, snap.tps[0], snap.mspt[0])
+            except Exception as e:
+                log.error(f"Perf sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def record(self, ts: float, tps: float, mspt: float):
+        baseline = [self.raw.cols["tps"][i] for i in self.raw.latest(DROP_WINDOW)]
+        spike = mspt > self.budget
+        self.raw.append(ts=ts, tps=tps, mspt=mspt)
+        self.minutes.add(ts, tps, mspt, spike)
+        self.tens.add(ts, tps, mspt, spike)
+        await self._detect(ts, tps, mspt, spike, baseline)
+
+    async def _detect(self, ts, tps, mspt, spike, baseline):
+        self._over = self._over + 1 if spike else 0
+        reason = None
+        if self._over >= self.sustain_samples:
+            reason = f"MSPT has been over {self.budget:.0f}ms for {self._over * self.interval:.0f}s (now {mspt:.1f}ms)"
+        elif len(baseline) >= DROP_WINDOW // 2:
+            mean = sum(baseline) / len(baseline)
+            std = math.sqrt(sum((v - mean) ** 2 for v in baseline) / len(baseline))
+            if tps < 19 and tps < mean - DROP_SIGMA * max(std, 0.1):
+                reason = f"TPS dropped to {tps:.1f} (rolling avg {mean:.1f})"
+
+        if reason and not self._in_episode:
+            self._in_episode = True
+            self._alerted = ts - self._last_alert >= self.cooldown
+            if self._alerted:
+                self._last_alert = ts
+                await self.alert(f"⚠️ **Lag spike:** {reason}.")
+        elif not reason and not spike and self._in_episode:
+            self._in_episode = False
+            if self._alerted:
+                await self.alert(f"✅ Server recovered: {tps:.1f} TPS, {mspt:.1f} MSPT.")
+
+    def summary(self, seconds: float) -> dict:
+        """min/avg/p95/max MSPT, TPS avg/min and spike count over a window."""
+        cutoff = time.time() - seconds
+        if seconds <= 3600:
+            mspt = self.raw.since(cutoff, "mspt")
+            tps = self.raw.since(cutoff, "tps")
+            maxes, mins, spikes = mspt, tps, sum(m > self.budget for m in mspt)
+        else:
+            # Completed buckets only; p95 is taken over bucket averages
+            rollup = self.minutes if seconds <= 86400 else self.tens
+            mspt = rollup.ring.since(cutoff, "mspt_avg")
+            maxes = rollup.ring.since(cutoff, "mspt_max")
+            tps = rollup.ring.since(cutoff, "tps_avg")
+            mins = rollup.ring.since(cutoff, "tps_min")
+            spikes = int(sum(rollup.ring.since(cutoff, "spikes")))
+        if not mspt:
+            return {"samples": 0}
+        return {
+            "samples": len(mspt),
+            "mspt_min": min(mspt),
+            "mspt_avg": sum(mspt) / len(mspt),
+            "mspt_p95": percentile(mspt, 0.95),
+            "mspt_max": max(maxes),
+            "tps_avg": sum(tps) / len(tps),
+            "tps_min": min(mins),
+            "spikes": spikes,
+        }
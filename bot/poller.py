@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+log = logging.getLogger("afk-andy")
+
+POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", "15"))
+
+COLOR_RE = re.compile(r"§.")
+LIST_RE = re.compile(r"There are (\d+) of a max(?: of)? (\d+) players online:?\s*(.*)", re.S)
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+@dataclass
+class ServerSnapshot:
+    state: str
+    timestamp: float = field(default_factory=time.time)
+    players: list = field(default_factory=list)
+    max_players: int = None
+    tps: tuple = None    # 1m, 5m, 15m
+    mspt: tuple = None   # average over 5s, 10s, 1m
+    raw_list: str = ""
+    error: str = None
+
+    @property
+    def online(self) -> bool:
+        return self.state != "stopped"
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+
+def strip_colors(text: str) -> str:
+    return COLOR_RE.sub("", text)
+
+
+def parse_list(text: str) -> tuple:
+    """Parse `list` output into (players, max_players)."""
+    match = LIST_RE.search(strip_colors(text))
+    if not match:
+        return [], None
+    names = [n.strip() for n in match.group(3).split(",") if n.strip()]
+    return names, int(match.group(2))
+
+
+def parse_tps(text: str) -> tuple:
+    """Parse Paper's `tps` output ("TPS from last 1m, 5m, 15m: 20.0, 20.0, 20.0")."""
+    text = strip_colors(text)
+    _, _, values = text.partition(":")
+    numbers = [float(n) for n in NUMBER_RE.findall(values)]
+    return tuple(numbers[:3]) if len(numbers) >= 3 else None
+
+
+def parse_mspt(text: str) -> tuple:
+    """Parse Paper's `mspt` output into the average for the 5s, 10s and 1m windows.
+
+    Each window is reported as avg/min/max, so every third number is an average.
+    """
+    text = strip_colors(text)
+    _, _, values = text.partition(":")
+    numbers = [float(n) for n in NUMBER_RE.findall(values)]
+    return tuple(numbers[0:9:3]) if len(numbers) >= 9 else None
+
+
+class ServerPoller:
+    """Keeps a recent snapshot of players, TPS and MSPT.
+
+    A background loop refreshes it every `interval` seconds. Callers that
+    need fresher data share a single in-flight refresh instead of each
+    sending their own RCON queries.
+    """
+
+    def __init__(self, interval: float = POLL_INTERVAL, supervisor=None):
+        self.interval = interval
+        self.supervisor = supervisor  # None means the default instance
+        self.snapshot = ServerSnapshot(state="stopped", timestamp=0)
+        self._inflight = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def get(self, max_age: float = None, force: bool = False) -> ServerSnapshot:
+        """Latest snapshot, refreshed first if forced or older than max_age."""
+        max_age = self.interval * 2 if max_age is None else max_age
+        stale = self.snapshot.age > max_age or self.snapshot.state != self._supervisor().state
+        if force or stale:
+            return await self.refresh()
+        return self.snapshot
+
+    async def refresh(self) -> ServerSnapshot:
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._poll())
+            self._inflight.add_done_callback(self._clear_inflight)
+        return await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, _):
+        self._inflight = None
+
+    def _supervisor(self):
+        if self.supervisor is None:
+            from minecraft import supervisor
+            return supervisor
+        return self.supervisor
+
+    async def _poll(self) -> ServerSnapshot:
+        from minecraft import READY
+        sup = self._supervisor()
+        state = sup.state
+        if state != READY:
+            self.snapshot = ServerSnapshot(state=state)
+            return self.snapshot
+
+        results = await asyncio.gather(
+            sup.rcon("list"), sup.rcon("tps"), sup.rcon("mspt"),
+            return_exceptions=True,
+        )
+        listing, tps, mspt = results
+        snap = ServerSnapshot(state=state)
+        if isinstance(listing, Exception):
+            snap.error = str(listing)
+        else:
+            snap.raw_list = listing
+            snap.players, snap.max_players = parse_list(listing)
+        if not isinstance(tps, Exception):
+            snap.tps = parse_tps(tps)
+        if not isinstance(mspt, Exception):
+            snap.mspt = parse_mspt(mspt)
+        self.snapshot = snap
+        return snap
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.error(f"Status poll failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,261 @@
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+
+log = logging.getLogger("afk-andy")
+
+PREGEN_MSPT_BUDGET = float(os.getenv("PREGEN_MSPT_BUDGET", "40"))
+PREGEN_MAX_BATCH = int(os.getenv("PREGEN_MAX_BATCH", "32"))
+PREGEN_PAUSE_ON_PLAYERS = os.getenv("PREGEN_PAUSE_ON_PLAYERS", "1") == "1"
+STEP_TIMEOUT = 30
+MAX_TRIES = 3  # steps a chunk gets to report loaded before it's skipped
+IDLE_POLL = 10
+
+
+def world_spawn(mc_dir: str) -> tuple:
+    """(x, z) of the world spawn from level.dat, or None if it can't be read."""
+    import gzip
+    from jvm import read_properties
+    from region import NbtReader
+    path = os.path.join(mc_dir, read_properties(mc_dir).get("level-name", "world"), "level.dat")
+    try:
+        with gzip.open(path) as f:
+            fields = NbtReader(f.read()).read_fields({"SpawnX", "SpawnZ"})
+    except (OSError, EOFError, ValueError, IndexError) as e:
+        log.warning(f"Can't read the world spawn from {path}: {e}")
+        return None
+    if "SpawnX" not in fields or "SpawnZ" not in fields:
+        return None
+    return fields["SpawnX"], fields["SpawnZ"]
+
+
+def spiral_at(i: int) -> tuple:
+    """Chunk offset at position i of a spiral out from (0, 0), without walking the i before it.
+
+    Ring k (k >= 1) holds positions (2k-1)^2 .. (2k+1)^2 - 1: up the +x edge,
+    then along +z, down -x and back along -z, 2k chunks per side.
+    """
+    if i == 0:
+        return 0, 0
+    k = (math.isqrt(i) + 1) // 2
+    side, t = divmod(i - (2 * k - 1) ** 2, 2 * k)
+    if side == 0:
+        return k, t - k + 1
+    if side == 1:
+        return k - 1 - t, k
+    if side == 2:
+        return -k, k - 1 - t
+    return t - k + 1, -k
+
+
+def chunk_count(radius_chunks: int) -> int:
+    return (2 * radius_chunks + 1) ** 2
+
+
+class PregenJob:
+    """Spiral chunk pre-generation through RCON forceload.
+
+    Each step force-loads a batch of chunks, waits until they report loaded
+    (which means generated), then releases them. The batch size follows
+    MSPT: grow by one while under budget, halve when over. Progress is
+    checkpointed after every step so a bot or server restart resumes at the
+    same spiral index.
+    """
+
+    def __init__(self, state_path: str, poller, budget: float = PREGEN_MSPT_BUDGET,
+                 max_batch: int = PREGEN_MAX_BATCH, notify=None):
+        self.state_path = state_path
+        self.poller = poller
+        self.budget = budget
+        self.max_batch = max_batch
+        self.notify = notify  # async callable(text) for status updates
+        self.state = None
+        self.batch = 1
+        self.rate = 0.0
+        self.paused_reason = None
+        self._players_online = False
+        self._manual_pause = False
+        self._task = None
+        self._load()
+
+    # -- state --
+
+    def _load(self):
+        try:
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.state = None
+
+    def _save(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.state) and (self.state["index"] < self.state["total"] or bool(self.state.get("retry")))
+
+    def new(self, radius_blocks: int, center_x: int, center_z: int,
+            dimension: str = "minecraft:overworld"):
+        """A fresh job around a block position; see world_spawn() for the usual centre."""
+        radius = max(0, radius_blocks // 16)
+        self.state = {
+            "center": [center_x // 16, center_z // 16],
+            "radius": radius,
+            "dimension": dimension,
+            "index": 0,
+            "total": chunk_count(radius),
+            "started": time.time(),
+        }
+        self._save()
+
+    def cancel(self):
+        self.stop()
+        self.state = None
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+
+    # -- control --
+
+    def start(self):
+        if self.pending and not self.running:
+            self._manual_pause = False
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def pause(self):
+        self._manual_pause = True
+
+    def resume(self):
+        self._manual_pause = False
+        self.start()
+
+    def on_log_event(self, event):
+        """LogWatcher subscriber: pause the moment someone joins."""
+        if event.kind == "join":
+            self._players_online = True
+
+    def status(self) -> str:
+        if not self.state:
+            return "No pre-generation job."
+        s = self.state
+        done, total = s["index"] - len(s.get("retry", [])), s["total"]
+        line = f"{done}/{total} chunks ({done / total:.0%}) in {s['dimension']}, radius {s['radius'] * 16} blocks"
+        if s.get("skipped"):
+            line += f" • {s['skipped']} chunks skipped"
+        if not self.pending:
+            return line + " — complete."
+        if self.rate > 0:
+            eta = (total - done) / self.rate
+            line += f" • {self.rate:.1f} chunks/s, ETA {eta / 60:.0f} min, batch {self.batch}"
+        if self._manual_pause:
+            line += " • paused"
+        elif self.paused_reason:
+            line += f" • waiting: {self.paused_reason}"
+        elif not self.running:
+            line += " • stopped"
+        return line
+
+    # -- work loop --
+
+    async def _wait_for_turn(self) -> bool:
+        """True when it's OK to run a step (server up, no players, not paused)."""
+        from minecraft import server_state, READY
+        if self._manual_pause:
+            self.paused_reason = "paused"
+            return False
+        if server_state() != READY:
+            self.paused_reason = "server not ready"
+            return False
+        if PREGEN_PAUSE_ON_PLAYERS:
+            snap = await self.poller.get(max_age=IDLE_POLL if self._players_online else 60)
+            self._players_online = bool(snap.players)
+            if self._players_online:
+                self.paused_reason = "players online"
+                return False
+        self.paused_reason = None
+        return True
+
+    async def _run(self):
+        from minecraft import async_rcon
+        from poller import parse_mspt
+        s = self.state
+        cx, cz = s["center"]
+        dim = s["dimension"]
+        while self.pending:
+            if not await self._wait_for_turn():
+                await asyncio.sleep(IDLE_POLL)
+                continue
+            started = time.monotonic()
+            # Chunks that didn't confirm last time go first, then the next stretch of the spiral
+            tries = {(x, z): n for x, z, n in s.get("retry", [])}
+            fresh = range(s["index"], min(s["index"] + max(0, self.batch - len(tries)), s["total"]))
+            batch = list(tries) + [(cx + dx, cz + dz) for dx, dz in map(spiral_at, fresh)]
+            try:
+                unfinished = await self._generate(batch, dim)
+                mspt = parse_mspt(await async_rcon("mspt"))
+            except Exception as e:
+                log.error(f"Pregen step failed: {e}")
+                await asyncio.sleep(IDLE_POLL)
+                continue
+
+            s["index"] = fresh.stop
+            s["retry"] = []
+            for x, z in unfinished:
+                n = tries.get((x, z), 0) + 1
+                if n < MAX_TRIES:
+                    s["retry"].append([x, z, n])
+                else:
+                    log.warning(f"Pregen: chunk {x}, {z} didn't load after {n} tries, skipping it")
+                    s["skipped"] = s.get("skipped", 0) + 1
+            self._save()
+            elapsed = max(time.monotonic() - started, 1e-3)
+            step_rate = (len(batch) - len(unfinished)) / elapsed
+            self.rate = step_rate if self.rate == 0 else 0.8 * self.rate + 0.2 * step_rate
+
+            current = mspt[0] if mspt else self.budget
+            if current > self.budget:
+                self.batch = max(1, self.batch // 2)
+                await asyncio.sleep(min(10, current / self.budget * 2))
+            elif current < self.budget * 0.8:
+                self.batch = min(self.max_batch, self.batch + 1)
+
+        log.info("Pre-generation complete")
+        if self.notify:
+            await self.notify(f"Pre-generation done: {self.status()}")
+
+    async def _generate(self, batch: list, dim: str) -> list:
+        """Force-load a batch and wait for it; returns the chunks that hadn't loaded by STEP_TIMEOUT."""
+        from minecraft import async_rcon
+        prefix = f"execute in {dim} run "
+        try:
+            for x, z in batch:
+                await async_rcon(f"{prefix}forceload add {x * 16} {z * 16}")
+            deadline = time.monotonic() + STEP_TIMEOUT
+            waiting = list(batch)
+            while waiting and time.monotonic() < deadline:
+                x, z = waiting[-1]
+                result = await async_rcon(f"{prefix}execute if loaded {x * 16 + 8} 0 {z * 16 + 8}")
+                if "passed" in result.lower():
+                    waiting.pop()
+                else:
+                    await asyncio.sleep(0.25)
+            return waiting
+        finally:
+            for x, z in batch:
+                await async_rcon(f"{prefix}forceload remove {x * 16} {z * 16}")
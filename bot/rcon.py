@@ -0,0 +1,267 @@
+import asyncio
+import itertools
+import logging
+import struct
+import time
+
+log = logging.getLogger("afk-andy")
+
+# RCON packet types (Source RCON protocol, as implemented by Minecraft)
+TYPE_RESPONSE = 0
+TYPE_COMMAND = 2
+TYPE_LOGIN = 3
+# Unknown type — the server answers it with "Unknown request c8" after it has
+# finished sending every fragment of the previous response. Used as an
+# end-of-response marker for multi-packet replies.
+TYPE_SENTINEL = 200
+
+MAX_PACKET = 4096 + 14
+
+
+class RconError(Exception):
+    """Raised when the RCON server can't be reached or answers badly."""
+
+
+class RconAuthError(RconError):
+    """Raised when the RCON password is rejected."""
+
+
+def encode_packet(request_id: int, ptype: int, payload: str) -> bytes:
+    body = struct.pack("<ii", request_id, ptype) + payload.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(body)) + body
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple:
+    """Read one packet, returning (request_id, type, payload)."""
+    header = await reader.readexactly(4)
+    (length,) = struct.unpack("<i", header)
+    if length < 10 or length > MAX_PACKET:
+        raise RconError(f"Bad RCON packet length {length}")
+    body = await reader.readexactly(length)
+    request_id, ptype = struct.unpack("<ii", body[:8])
+    payload = body[8:-2].decode("utf-8", errors="replace")
+    return request_id, ptype, payload
+
+
+class RconConnection:
+    """One authenticated RCON socket with pipelined requests.
+
+    Every command is followed by a sentinel packet. Responses arrive in
+    request order, so all fragments seen before the sentinel's reply belong
+    to the command.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self._ids = itertools.count(1)
+        self._pending = {}    # command id -> [future, chunks]
+        self._sentinels = {}  # sentinel id -> command id
+        self._reader_task = None
+
+    @classmethod
+    async def open(cls, host: str, port: int, password: str, timeout: float):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
+        )
+        conn = cls(reader, writer)
+        try:
+            await asyncio.wait_for(conn._login(password), timeout)
+        except BaseException:
+            conn._close_transport()
+            raise
+        conn._reader_task = asyncio.create_task(conn._read_loop())
+        return conn
+
+    async def _login(self, password: str):
+        request_id = next(self._ids)
+        self.writer.write(encode_packet(request_id, TYPE_LOGIN, password))
+        await self.writer.drain()
+        while True:
+            rid, ptype, _ = await read_packet(self.reader)
+            if rid == -1:
+                raise RconAuthError("RCON login failed, check RCON_PASSWORD.")
+            # Some servers send an empty RESPONSE_VALUE before the auth reply
+            if rid == request_id and ptype == TYPE_COMMAND:
+                return
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def command(self, command: str, timeout: float) -> str:
+        if self.closed:
+            raise RconError("RCON connection is closed.")
+        request_id = next(self._ids)
+        sentinel_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = [future, []]
+        self._sentinels[sentinel_id] = request_id
+        self.writer.write(
+            encode_packet(request_id, TYPE_COMMAND, command)
+            + encode_packet(sentinel_id, TYPE_SENTINEL, "")
+        )
+        try:
+            await self.writer.drain()
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            # A stuck server isn't worth reusing; drop the socket
+            future.cancel()
+            self.close(RconError(f"RCON command timed out after {timeout}s"))
+            raise RconError(f"RCON command timed out after {timeout}s")
+        except (ConnectionError, OSError) as e:
+            self.close(RconError(f"RCON connection lost: {e}"))
+            raise RconError(f"RCON connection lost: {e}") from e
+        finally:
+            self._pending.pop(request_id, None)
+            self._sentinels.pop(sentinel_id, None)
+            if future.done() and not future.cancelled():
+                future.exception()  # failed by close() while we were in drain(); don't log it as unretrieved
+
+    async def _read_loop(self):
+        try:
+            while True:
+                rid, _, payload = await read_packet(self.reader)
+                if rid in self._sentinels:
+                    entry = self._pending.get(self._sentinels.pop(rid))
+                    if entry and not entry[0].done():
+                        entry[0].set_result("".join(entry[1]))
+                elif rid in self._pending:
+                    self._pending[rid][1].append(payload)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            self.close(RconError(f"RCON connection lost: {e}"))
+        except RconError as e:
+            self.close(e)
+        except asyncio.CancelledError:
+            self.close(RconError("RCON connection closed."))
+
+    def close(self, exc: Exception = None):
+        if self.closed:
+            return
+        self.closed = True
+        exc = exc or RconError("RCON connection closed.")
+        for future, _ in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        if self._reader_task and self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+        self._close_transport()
+
+    def _close_transport(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class RconPool:
+    """Small pool of persistent RCON connections.
+
+    Connections are opened lazily and reused. When the server goes away the
+    broken connections are dropped, and reconnect attempts back off
+    exponentially so a booting server isn't hammered with logins.
+    """
+
+    def __init__(self, host: str, port: int, password: str, size: int = 2,
+                 timeout: float = 5.0, backoff_min: float = 0.5, backoff_max: float = 30.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self._conns = []
+        self._connecting = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    def _live(self) -> list:
+        self._conns = [c for c in self._conns if not c.closed]
+        return self._conns
+
+    async def _connect(self) -> RconConnection:
+        # Only one login in flight at a time; concurrent callers share it
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open())
+        try:
+            return await asyncio.shield(self._connecting)
+        finally:
+            if self._connecting is not None and self._connecting.done():
+                self._connecting = None
+
+    async def _open(self) -> RconConnection:
+        wait = self._retry_at - time.monotonic()
+        if wait > 0:
+            raise RconError(f"RCON unavailable, retrying in {wait:.1f}s")
+        try:
+            conn = await RconConnection.open(self.host, self.port, self.password, self.timeout)
+        except RconAuthError:
+            self._fail()
+            raise
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            self._fail()
+            raise RconError(f"Can't reach RCON at {self.host}:{self.port}: {e}") from e
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._conns.append(conn)
+        return conn
+
+    def _fail(self):
+        self._backoff = min(self.backoff_max, max(self.backoff_min, self._backoff * 2))
+        self._retry_at = time.monotonic() + self._backoff
+
+    async def _acquire(self) -> RconConnection:
+        conns = self._live()
+        idle = [c for c in conns if c.in_flight == 0]
+        if idle:
+            return idle[0]
+        if len(conns) < self.size:
+            try:
+                return await self._connect()
+            except RconError:
+                if not conns:
+                    raise
+        return min(conns, key=lambda c: c.in_flight)
+
+    async def command(self, command: str) -> str:
+        conn = await self._acquire()
+        return await conn.command(command, self.timeout)
+
+    async def batch(self, commands: list) -> list:
+        """Run commands in order on a connection of their own.
+
+        Each command gets the usual timeout, counted from when it's sent, so
+        a long batch (whitelist adds that each wait on a Mojang lookup) can't
+        run out the clock on the ones queued behind it. A timeout or drop
+        closes only this connection; the commands after it are reported as
+        not sent. Returns a response or RconError per command.
+        """
+        try:
+            conn = await RconConnection.open(self.host, self.port, self.password, self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            raise RconError(f"Can't reach RCON at {self.host}:{self.port}: {e}") from e
+        results = []
+        try:
+            for command in commands:
+                if conn.closed:
+                    results.append(RconError("not sent: the connection was lost earlier in the batch"))
+                    continue
+                try:
+                    results.append(await conn.command(command, self.timeout))
+                except RconError as e:
+                    results.append(e)
+        finally:
+            conn.close()
+        return results
+
+    def reset_backoff(self):
+        """Allow an immediate reconnect, e.g. once the server reports it's ready."""
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    async def close(self):
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
@@ -0,0 +1,327 @@
+"""Anvil (.mca) region file analyzer and unused-chunk pruner.
+
+Run from the bot with `!world`, or standalone:
+
+    python region.py analyze
+    python region.py prune [--max-inhabited TICKS] [--apply]
+"""
+import os
+import io
+import sys
+import mmap
+import gzip
+import zlib
+import struct
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+log = logging.getLogger("afk-andy")
+
+SECTOR = 4096
+PRUNE_MAX_INHABITED = int(os.getenv("PRUNE_MAX_INHABITED", "200"))  # ticks (20 = 1 second)
+WANTED = {"InhabitedTime", "LastUpdate", "Status"}
+# Generation finished ("postprocessed" before 1.14). Anything else is a proto-chunk at the edge of the world.
+FULL_STATUSES = {"minecraft:full", "full", "postprocessed"}
+
+# NBT tag ids
+END, BYTE, SHORT, INT, LONG, FLOAT, DOUBLE = 0, 1, 2, 3, 4, 5, 6
+BYTE_ARRAY, STRING, LIST, COMPOUND, INT_ARRAY, LONG_ARRAY = 7, 8, 9, 10, 11, 12
+FIXED = {BYTE: 1, SHORT: 2, INT: 4, LONG: 8, FLOAT: 4, DOUBLE: 8}
+ARRAY = {BYTE_ARRAY: 1, INT_ARRAY: 4, LONG_ARRAY: 8}
+
+
+class NbtReader:
+    """Pulls a few named fields out of chunk NBT, skipping everything else."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def _take(self, n: int) -> bytes:
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return chunk
+
+    def _u16(self) -> int:
+        return struct.unpack(">H", self._take(2))[0]
+
+    def _i32(self) -> int:
+        return struct.unpack(">i", self._take(4))[0]
+
+    def _string(self) -> str:
+        return self._take(self._u16()).decode("utf-8", errors="replace")
+
+    def _skip(self, tag: int):
+        if tag in FIXED:
+            self.pos += FIXED[tag]
+        elif tag in ARRAY:
+            count = self._i32()
+            self.pos += count * ARRAY[tag]
+        elif tag == STRING:
+            length = self._u16()
+            self.pos += length
+        elif tag == LIST:
+            item, count = self._take(1)[0], self._i32()
+            if item in FIXED:
+                self.pos += FIXED[item] * count
+            else:
+                for _ in range(count):
+                    self._skip(item)
+        elif tag == COMPOUND:
+            while True:
+                inner = self._take(1)[0]
+                if inner == END:
+                    return
+                length = self._u16()
+                self.pos += length
+                self._skip(inner)
+        else:
+            raise ValueError(f"Unknown NBT tag {tag}")
+
+    def read_fields(self, wanted: set) -> dict:
+        """Read the root compound, returning only `wanted` fields.
+
+        Pre-1.18 chunks keep these under a "Level" compound, and level.dat
+        under "Data"; both are searched as well.
+        """
+        if self._take(1)[0] != COMPOUND:
+            return {}
+        length = self._u16()
+        self.pos += length
+        return self._compound(wanted, depth=0)
+
+    def _compound(self, wanted: set, depth: int) -> dict:
+        found = {}
+        while True:
+            tag = self._take(1)[0]
+            if tag == END:
+                return found
+            name = self._string()
+            if name in wanted and tag == LONG:
+                found[name] = struct.unpack(">q", self._take(8))[0]
+            elif name in wanted and tag == INT:
+                found[name] = self._i32()
+            elif name in wanted and tag == STRING:
+                found[name] = self._string()
+            elif name in ("Level", "Data") and tag == COMPOUND and depth == 0:
+                found.update(self._compound(wanted, depth=1))
+            else:
+                self._skip(tag)
+
+
+def decompress(kind: int, payload: bytes) -> bytes:
+    if kind == 1:
+        return gzip.decompress(payload)
+    if kind == 2:
+        return zlib.decompress(payload)
+    if kind == 3:
+        return payload
+    raise ValueError(f"Unsupported chunk compression {kind}")
+
+
+def dimension_of(path: str) -> str:
+    parts = path.split(os.sep)
+    if "DIM-1" in parts or any(p.endswith("_nether") for p in parts):
+        return "nether"
+    if "DIM1" in parts or any(p.endswith("_the_end") for p in parts):
+        return "end"
+    return "overworld"
+
+
+def read_locations(mm) -> list:
+    """(index, offset_sectors, sector_count) for every present chunk."""
+    out = []
+    for index, (loc,) in enumerate(struct.iter_unpack(">I", mm[:SECTOR])):
+        if loc:
+            out.append((index, loc >> 8, loc & 0xFF))
+    return out
+
+
+def analyze_region(path: str, max_inhabited: int = PRUNE_MAX_INHABITED) -> dict:
+    """Header stats plus per-chunk InhabitedTime for one region file.
+
+    Runs in a worker process. The file is mmapped so only the header and
+    the chunks actually decoded are paged in.
+    """
+    size = os.path.getsize(path)
+    stats = {
+        "path": path, "dimension": dimension_of(path), "bytes": size,
+        "chunks": 0, "used_sectors": 0, "total_sectors": size // SECTOR,
+        "unused": [], "proto": 0, "errors": 0, "last_update": 0,
+    }
+    if size < 2 * SECTOR:
+        return stats
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for index, offset, count in read_locations(mm):
+            stats["chunks"] += 1
+            stats["used_sectors"] += count
+            start = offset * SECTOR
+            try:
+                length, kind = struct.unpack(">iB", mm[start:start + 5])
+                if kind & 0x80:
+                    # Oversized chunk stored in an external .mcc file; leave it alone
+                    continue
+                fields = NbtReader(decompress(kind, mm[start + 5:start + 4 + length])).read_fields(WANTED)
+            except (ValueError, IndexError, RecursionError, struct.error, zlib.error, EOFError, OSError):
+                stats["errors"] += 1
+                continue
+            stats["last_update"] = max(stats["last_update"], fields.get("LastUpdate", 0))
+            if fields.get("Status", "minecraft:full") not in FULL_STATUSES:
+                # Never played in and regenerated on demand, so always prunable
+                stats["proto"] += 1
+                stats["unused"].append(index)
+            elif fields.get("InhabitedTime", 0) <= max_inhabited:
+                stats["unused"].append(index)
+    return stats
+
+
+def region_files(mc_dir: str) -> list:
+    paths = []
+    for root, dirs, names in os.walk(mc_dir):
+        if os.path.basename(root) == "region":
+            paths.extend(os.path.join(root, n) for n in names if n.endswith(".mca"))
+    return sorted(paths)
+
+
+def analyze_world(mc_dir: str, max_inhabited: int = PRUNE_MAX_INHABITED, workers: int = None) -> list:
+    paths = region_files(mc_dir)
+    if not paths:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze_region, paths, [max_inhabited] * len(paths), chunksize=4))
+
+
+def summarize(results: list) -> dict:
+    """Totals per dimension: regions, chunks, bytes, fragmentation, prunable chunks."""
+    dims = {}
+    for r in results:
+        d = dims.setdefault(r["dimension"], {
+            "regions": 0, "chunks": 0, "bytes": 0, "used_sectors": 0,
+            "total_sectors": 0, "unused": 0, "proto": 0, "errors": 0,
+        })
+        d["regions"] += 1
+        d["chunks"] += r["chunks"]
+        d["bytes"] += r["bytes"]
+        if r["total_sectors"]:
+            d["used_sectors"] += r["used_sectors"] + 2  # plus the header
+        d["total_sectors"] += r["total_sectors"]
+        d["unused"] += len(r["unused"])
+        d["proto"] += r["proto"]
+        d["errors"] += r["errors"]
+    for d in dims.values():
+        d["fragmentation"] = 1 - d["used_sectors"] / d["total_sectors"] if d["total_sectors"] else 0.0
+    return dims
+
+
+def format_summary(dims: dict, max_inhabited: int = PRUNE_MAX_INHABITED) -> str:
+    if not dims:
+        return "No region files found."
+    lines = []
+    for name, d in sorted(dims.items()):
+        lines.append(
+            f"{name}: {d['regions']} regions, {d['chunks']} chunks, {d['bytes'] / 1e6:.1f} MB, "
+            f"{d['fragmentation']:.0%} free space, {d['unused']} chunks visited <= {max_inhabited} ticks"
+            + (f" (of which {d['proto']} only partly generated)" if d["proto"] else "")
+            + (f", {d['errors']} unreadable" if d["errors"] else "")
+        )
+    return "\n".join(lines)
+
+
+def compact_region(path: str, drop: set) -> int:
+    """Rewrite a region file without the chunks in `drop`, packing the rest.
+
+    Returns bytes reclaimed. Deletes the file when nothing is left.
+    """
+    before = os.path.getsize(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    locations = read_locations(data)
+    keep = [loc for loc in locations if loc[0] not in drop]
+    if not keep:
+        os.remove(path)
+        return before
+
+    header = bytearray(2 * SECTOR)
+    body = io.BytesIO()
+    next_sector = 2
+    for index, offset, count in keep:
+        struct.pack_into(">I", header, index * 4, (next_sector << 8) | count)
+        header[SECTOR + index * 4:SECTOR + index * 4 + 4] = data[SECTOR + index * 4:SECTOR + index * 4 + 4]
+        body.write(data[offset * SECTOR:(offset + count) * SECTOR].ljust(count * SECTOR, b"\0"))
+        next_sector += count
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(body.getvalue())
+    os.replace(tmp, path)
+    return before - os.path.getsize(path)
+
+
+def prune_world(results: list) -> tuple:
+    """Drop unused chunks from region files and their entities/poi siblings.
+
+    Only call this while the server is stopped. Returns (chunks, bytes reclaimed).
+    """
+    chunks = reclaimed = 0
+    for r in results:
+        drop = set(r["unused"])
+        if not drop:
+            continue
+        world_dir = os.path.dirname(os.path.dirname(r["path"]))
+        name = os.path.basename(r["path"])
+        for sub in ("region", "entities", "poi"):
+            path = os.path.join(world_dir, sub, name)
+            if os.path.exists(path):
+                reclaimed += compact_region(path, drop)
+        chunks += len(drop)
+    return chunks, reclaimed
+
+
+async def analyze(mc_dir: str, max_inhabited: int = PRUNE_MAX_INHABITED) -> list:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, analyze_world, mc_dir, max_inhabited)
+
+
+async def prune(mc_dir: str, max_inhabited: int = PRUNE_MAX_INHABITED) -> tuple:
+    """Analyze and prune. Refuses while the server is running."""
+    from minecraft import is_server_running, supervisor, ServerBusy
+    if is_server_running():
+        return False, "Server is running. `!stop` it before pruning chunks."
+    try:
+        with supervisor.maintenance_lock("a chunk prune"):
+            results = await analyze(mc_dir, max_inhabited)
+            loop = asyncio.get_running_loop()
+            chunks, reclaimed = await loop.run_in_executor(None, prune_world, results)
+    except ServerBusy as e:
+        return False, str(e)
+    return True, f"Pruned {chunks} chunks, reclaimed {reclaimed / 1e6:.1f} MB."
+
+
+async def _cli(args):
+    from minecraft import MC_DIR, supervisor
+    mc_dir = args.dir or MC_DIR
+    if args.action == "prune" and args.apply:
+        supervisor.adopt()
+        success, msg = await prune(mc_dir, args.max_inhabited)
+        print(msg)
+        return 0 if success else 1
+    results = await analyze(mc_dir, args.max_inhabited)
+    print(format_summary(summarize(results), args.max_inhabited))
+    if args.action == "prune":
+        print("Dry run. Re-run with --apply (server stopped) to prune.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze or prune Minecraft region files.")
+    parser.add_argument("action", choices=["analyze", "prune"])
+    parser.add_argument("--dir", help="server directory (default: MC_SERVER_DIR)")
+    parser.add_argument("--max-inhabited", type=int, default=PRUNE_MAX_INHABITED,
+                        help="prune chunks with InhabitedTime at or below this many ticks")
+    parser.add_argument("--apply", action="store_true", help="actually prune (server must be stopped)")
+    from dotenv import load_dotenv
+    load_dotenv()
+    sys.exit(asyncio.run(_cli(parser.parse_args())))
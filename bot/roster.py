@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import logging
+
+log = logging.getLogger("afk-andy")
+
+NAME_RE = re.compile(r"^[A-Za-z0-9_]{3,16}$")
+NAME_SPLIT_RE = re.compile(r"[\s,;]+")
+
+# kind -> (file, add command, remove command, command run once after changes)
+LISTS = {
+    "whitelist": ("whitelist.json", "whitelist add {}", "whitelist remove {}", "whitelist reload"),
+    "ops": ("ops.json", "op {}", "deop {}", None),
+}
+FAILED_MARKERS = ("does not exist", "Unknown or incomplete", "Incorrect argument", "not found")
+UNCHANGED_MARKERS = ("already", "Nothing changed", "is not whitelisted", "is not an operator")
+
+
+class JsonFile:
+    """A JSON file re-read only when its mtime or size changes.
+
+    A missing or half-written file reads as `default`, so a server that's
+    rewriting whitelist.json at that moment never breaks a listing.
+    """
+
+    def __init__(self, path: str, default=None):
+        self.path = path
+        self.default = default if default is not None else []
+        self.reads = 0
+        self._stamp = None
+        self._data = self.default
+
+    def read(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._stamp, self._data = None, self.default
+            return self._data
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            try:
+                with open(self.path) as f:
+                    self._data = json.load(f)
+                self.reads += 1
+            except (OSError, ValueError) as e:
+                log.warning(f"Can't read {self.path}: {e}")
+                self._data = self.default
+            self._stamp = stamp
+        return self._data
+
+
+_files = {}
+
+
+def json_file(path: str) -> JsonFile:
+    """Shared cached reader for a server JSON file."""
+    path = os.path.abspath(path)
+    if path not in _files:
+        _files[path] = JsonFile(path)
+    return _files[path]
+
+
+def parse_names(text: str) -> tuple:
+    """(valid, invalid) player names from free text: spaces, commas or one per line. Case-insensitive dedupe."""
+    valid, invalid, seen = [], [], set()
+    for word in NAME_SPLIT_RE.split(text or ""):
+        word = word.strip().lstrip("-*•").strip("`'\"")
+        if not word or word.lower() in seen:
+            continue
+        seen.add(word.lower())
+        (valid if NAME_RE.match(word) else invalid).append(word)
+    return valid, invalid
+
+
+class PlayerList:
+    """whitelist.json or ops.json, diffed against a wanted set and changed in one RCON batch.
+
+    Reads go straight to the server's files (cached by mtime) and
+    usercache.json, so listing never touches RCON. Changes are planned
+    against those files first: only players who actually need adding or
+    removing get a command, then the reload command (if any) runs once.
+    """
+
+    def __init__(self, mc_dir: str, kind: str = "whitelist"):
+        self.kind = kind
+        filename, self.add_cmd, self.remove_cmd, self.reload_cmd = LISTS[kind]
+        self.file = json_file(os.path.join(mc_dir, filename))
+        self.usercache = json_file(os.path.join(mc_dir, "usercache.json"))
+
+    def entries(self) -> list:
+        return [e for e in self.file.read() if isinstance(e, dict) and e.get("name")]
+
+    def names(self) -> list:
+        return sorted((e["name"] for e in self.entries()), key=str.lower)
+
+    def uuids(self) -> dict:
+        """Lowercased name -> uuid from usercache.json, for players the server has resolved before."""
+        return {e["name"].lower(): e.get("uuid") for e in self.usercache.read()
+                if isinstance(e, dict) and e.get("name")}
+
+    def has(self, name: str, entries: list = None, cache: dict = None) -> bool:
+        """On the list by name or, when usercache knows them, by UUID (so a renamed player still counts)."""
+        entries = self.entries() if entries is None else entries
+        cache = self.uuids() if cache is None else cache
+        uuid = cache.get(name.lower())
+        return any(e["name"].lower() == name.lower() or (uuid and e.get("uuid") == uuid) for e in entries)
+
+    def diff(self, wanted: list, prune: bool = False) -> tuple:
+        """(to_add, to_remove) to reach `wanted`. Removals only with prune (a full sync)."""
+        entries = self.entries()
+        cache = self.uuids()
+        to_add = [n for n in wanted if not self.has(n, entries, cache)]
+        to_remove = []
+        if prune:
+            want_names = {n.lower() for n in wanted}
+            want_uuids = {cache[n.lower()] for n in wanted if cache.get(n.lower())}
+            to_remove = [e["name"] for e in entries
+                         if e["name"].lower() not in want_names and e.get("uuid") not in want_uuids]
+        return to_add, to_remove
+
+    async def apply(self, to_add: list, to_remove: list, batch) -> dict:
+        """Send the changes through batch(commands) -> [response or exception] and sort out what happened."""
+        result = {"added": [], "removed": [], "unchanged": [], "failed": [], "reload": None}
+        planned = [(n, "added", self.add_cmd.format(n)) for n in to_add] \
+            + [(n, "removed", self.remove_cmd.format(n)) for n in to_remove]
+        if not planned:
+            return result
+        commands = [c for _, _, c in planned]
+        if self.reload_cmd:
+            commands.append(self.reload_cmd)
+        responses = await batch(commands)
+        for (name, bucket, _), response in zip(planned, responses):
+            if isinstance(response, BaseException):
+                result["failed"].append((name, str(response)))
+            elif any(m in response for m in FAILED_MARKERS):
+                result["failed"].append((name, response.strip().splitlines()[0]))
+            elif any(m in response for m in UNCHANGED_MARKERS):
+                result["unchanged"].append(name)
+            else:
+                result[bucket].append(name)
+        if self.reload_cmd:
+            reload = responses[-1]
+            result["reload"] = f"failed: {reload}" if isinstance(reload, BaseException) else "ok"
+        return result
+
+
+def format_result(kind: str, result: dict, invalid: list = ()) -> str:
+    """One summary message for a bulk change."""
+    label = "whitelist" if kind == "whitelist" else "operator list"
+    lines = []
+    if result["added"]:
+        lines.append(f"Added to the {label} ({len(result['added'])}): {', '.join(result['added'])}")
+    if result["removed"]:
+        lines.append(f"Removed from the {label} ({len(result['removed'])}): {', '.join(result['removed'])}")
+    if result["unchanged"]:
+        lines.append(f"Already set: {', '.join(result['unchanged'])}")
+    if result["failed"]:
+        lines.append(f"Failed ({len(result['failed'])}): " + ", ".join(f"{n} ({why})" for n, why in result["failed"]))
+    if invalid:
+        lines.append(f"Skipped invalid names: {', '.join(invalid)}")
+    if result["reload"] and result["reload"] != "ok":
+        lines.append(f"`{LISTS[kind][3]}` {result['reload']}")
+    return "\n".join(lines) or f"Nothing to change, the {label} already matches."
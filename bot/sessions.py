@@ -0,0 +1,385 @@
+import os
+import time
+import zlib
+import queue
+import sqlite3
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from logwatch import parse_line, LINE_RE, JOIN, LEAVE
+
+log = logging.getLogger("afk-andy")
+
+RECONCILE_INTERVAL = float(os.getenv("SESSION_RECONCILE_INTERVAL", "120"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL,
+    seen REAL NOT NULL,
+    closed_by TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_player_start ON sessions (player, start);
+CREATE INDEX IF NOT EXISTS sessions_open ON sessions (end) WHERE end IS NULL;
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    total REAL NOT NULL DEFAULT 0,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    longest REAL NOT NULL DEFAULT 0,
+    first_seen REAL,
+    last_seen REAL
+);
+CREATE INDEX IF NOT EXISTS players_last_seen ON players (last_seen);
+CREATE TABLE IF NOT EXISTS daily (
+    player TEXT NOT NULL,
+    day TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (player, day)
+);
+CREATE INDEX IF NOT EXISTS daily_day ON daily (day);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+STOPPING_MSG = "Stopping server"
+_STOP = object()
+
+
+def stamp_today(hms: str, now: float = None) -> float:
+    """Epoch seconds for an [HH:MM:SS] from a line just read; yesterday if that would be in the future."""
+    now = now or time.time()
+    h, m, s = (int(x) for x in hms.split(":"))
+    day = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    ts = (day + timedelta(hours=h, minutes=m, seconds=s)).timestamp()
+    return ts - 86400 if ts > now + 60 else ts
+
+
+def split_days(start: float, end: float):
+    """Yield (YYYY-MM-DD, seconds) for each local day the interval touches."""
+    while start < end:
+        day = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+        next_day = (day + timedelta(days=1)).timestamp()
+        stop = min(end, next_day)
+        yield day.strftime("%Y-%m-%d"), stop - start
+        start = stop
+
+
+class SessionStore:
+    """Player sessions in SQLite, with playtime rollups kept up to date on every close.
+
+    `sessions` holds one row per join..leave. `players` (totals, longest,
+    first/last seen) and `daily` (seconds per player per day) are updated in
+    the same transaction that closes a session, so queries never scan the
+    sessions table or the logs. Writes go through a queue to one writer
+    thread, so they keep their order and never block the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.Queue()
+        db = self._connect()
+        db.executescript(SCHEMA)
+        db.close()
+        self._writer = threading.Thread(target=self._write_loop, name="sessions", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.row_factory = sqlite3.Row
+        return db
+
+    # -- writes (queued) --
+
+    def join(self, name: str, ts: float):
+        self._queue.put(("join", name, ts))
+
+    def leave(self, name: str, ts: float):
+        self._queue.put(("leave", name, ts))
+
+    def close_all(self, ts: float, how: str):
+        self._queue.put(("close_all", ts, how))
+
+    def reconcile(self, online: list, ts: float):
+        """Match open sessions to the live player list."""
+        self._queue.put(("reconcile", online, ts))
+
+    def backfill(self, files: list):
+        """One-time import of (path, max_bytes) log files, oldest first."""
+        self._queue.put(("backfill", files))
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join(timeout=10)
+
+    def _write_loop(self):
+        db = self._connect()
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                with db:
+                    getattr(self, "_do_" + item[0])(db, *item[1:])
+            except Exception as e:
+                # Keep the writer alive: a dead thread would silently drop every later write
+                log.error(f"Session store {item[0]} failed: {e}")
+        db.close()
+
+    @staticmethod
+    def _open_session(db, player: str, name: str, ts: float):
+        db.execute("INSERT INTO sessions (player, start, seen) VALUES (?, ?, ?)", (player, ts, ts))
+        db.execute(
+            "INSERT INTO players (player, name, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (player) DO UPDATE SET name = excluded.name, "
+            "first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen)",
+            (player, name, ts, ts),
+        )
+
+    @staticmethod
+    def _close_session(db, row, end: float, how: str):
+        end = max(end, row["start"])
+        duration = end - row["start"]
+        db.execute("UPDATE sessions SET end = ?, seen = ?, closed_by = ? WHERE id = ?",
+                   (end, end, how, row["id"]))
+        db.execute(
+            "UPDATE players SET total = total + ?, sessions = sessions + 1, longest = MAX(longest, ?), "
+            "last_seen = MAX(last_seen, ?) WHERE player = ?",
+            (duration, duration, end, row["player"]),
+        )
+        for day, seconds in split_days(row["start"], end):
+            db.execute(
+                "INSERT INTO daily (player, day, seconds) VALUES (?, ?, ?) "
+                "ON CONFLICT (player, day) DO UPDATE SET seconds = seconds + excluded.seconds",
+                (row["player"], day, seconds),
+            )
+
+    @staticmethod
+    def _open_rows(db, player: str = None) -> list:
+        if player:
+            return db.execute("SELECT * FROM sessions WHERE end IS NULL AND player = ?", (player,)).fetchall()
+        return db.execute("SELECT * FROM sessions WHERE end IS NULL").fetchall()
+
+    def _do_join(self, db, name: str, ts: float):
+        player = name.lower()
+        for row in self._open_rows(db, player):
+            # Missed the leave (crash, log rotation): end it when it was last known to be online
+            self._close_session(db, row, row["seen"], "rejoin")
+        self._open_session(db, player, name, ts)
+
+    def _do_leave(self, db, name: str, ts: float):
+        for row in self._open_rows(db, name.lower()):
+            self._close_session(db, row, ts, "leave")
+
+    def _do_close_all(self, db, ts: float, how: str):
+        for row in self._open_rows(db):
+            self._close_session(db, row, ts if how != "crash" else row["seen"], how)
+
+    def _do_reconcile(self, db, online: list, ts: float):
+        """`online` is the player list as of `ts`; joins and leaves logged after that win over it."""
+        present = {name.lower(): name for name in online}
+        for row in self._open_rows(db):
+            if row["player"] in present:
+                db.execute("UPDATE sessions SET seen = MAX(seen, ?) WHERE id = ?", (ts, row["id"]))
+                present.pop(row["player"])
+            elif row["start"] <= ts:
+                self._close_session(db, row, row["seen"], "crash")
+        for player, name in present.items():
+            last = db.execute("SELECT last_seen FROM players WHERE player = ?", (player,)).fetchone()
+            if last and last["last_seen"] > ts:
+                continue  # left after the snapshot was taken
+            self._open_session(db, player, name, ts)
+
+    def _do_backfill(self, db, files: list):
+        from logsearch import open_log, file_date, LogClock
+        if db.execute("SELECT 1 FROM meta WHERE key = 'backfill'").fetchone():
+            return
+        started, joins = time.monotonic(), 0
+        for path, max_bytes in files:
+            clock, last = LogClock(file_date(path)), None
+            read = 0
+            try:
+                with open_log(path) as f:
+                    for line in f:
+                        read += len(line.encode("utf-8", errors="replace"))
+                        if max_bytes is not None and read > max_bytes:
+                            break
+                        match = LINE_RE.match(line.rstrip("\n"))
+                        if not match:
+                            continue
+                        last = clock.stamp(match.group("time"))
+                        if match.group("msg") == STOPPING_MSG:
+                            self._do_close_all(db, last, "stop")
+                            continue
+                        event = parse_line(line.rstrip("\n"))
+                        if event and event.kind == JOIN:
+                            self._do_join(db, event.player, last)
+                            joins += 1
+                        elif event and event.kind == LEAVE:
+                            self._do_leave(db, event.player, last)
+            except (OSError, EOFError, zlib.error) as e:
+                # Truncated or corrupt archive: keep what was read and move on
+                log.warning(f"Backfill stopped early in {os.path.basename(path)}: {e}")
+            if max_bytes is None and last is not None:
+                # An archive always ends with the server going down or the log rolling over
+                self._do_close_all(db, last, "rotate")
+        db.execute("INSERT INTO meta (key, value) VALUES ('backfill', ?)", (datetime.now().isoformat(),))
+        log.info(f"Backfilled {joins} sessions from {len(files)} log files in {time.monotonic() - started:.1f}s")
+
+    # -- reads --
+
+    def _read(self, sql: str, args: tuple = ()) -> list:
+        db = self._connect()
+        try:
+            return db.execute(sql, args).fetchall()
+        finally:
+            db.close()
+
+    def stats(self, name: str, now: float = None):
+        """Rollup for one player plus the open session, or None if never seen."""
+        now = now or time.time()
+        player = name.lower()
+        rows = self._read("SELECT * FROM players WHERE player = ?", (player,))
+        if not rows:
+            return None
+        stats = dict(rows[0])
+        week = (datetime.now() - timedelta(days=6)).strftime("%Y-%m-%d")
+        (stats["week"],) = self._read(
+            "SELECT COALESCE(SUM(seconds), 0) FROM daily WHERE player = ? AND day >= ?", (player, week))[0]
+        open_rows = self._read("SELECT start FROM sessions WHERE player = ? AND end IS NULL", (player,))
+        stats["online_since"] = open_rows[0]["start"] if open_rows else None
+        if stats["online_since"]:
+            current = now - stats["online_since"]
+            stats["total"] += current
+            stats["sessions"] += 1
+            stats["longest"] = max(stats["longest"], current)
+            for day, seconds in split_days(stats["online_since"], now):
+                if day >= week:
+                    stats["week"] += seconds
+            stats["last_seen"] = now
+        return stats
+
+    def top(self, days: int = None, limit: int = 10, now: float = None) -> list:
+        """[(name, seconds)] by playtime, all time or over the last `days` days, open sessions included."""
+        now = now or time.time()
+        if days:
+            cutoff = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+            rows = self._read(
+                "SELECT p.player, p.name, SUM(d.seconds) AS seconds FROM daily d "
+                "JOIN players p ON p.player = d.player WHERE d.day >= ? GROUP BY d.player", (cutoff,))
+        else:
+            cutoff = None
+            rows = self._read("SELECT player, name, total AS seconds FROM players")
+        totals = {r["player"]: [r["name"], r["seconds"]] for r in rows}
+        for r in self._read("SELECT s.player, s.start, p.name FROM sessions s "
+                            "JOIN players p ON p.player = s.player WHERE s.end IS NULL"):
+            extra = sum(sec for day, sec in split_days(r["start"], now) if cutoff is None or day >= cutoff)
+            totals.setdefault(r["player"], [r["name"], 0])[1] += extra
+        ranked = sorted(totals.values(), key=lambda t: t[1], reverse=True)
+        return [(name, seconds) for name, seconds in ranked[:limit] if seconds > 0]
+
+    def last_seen(self, name: str = None, limit: int = 10) -> list:
+        """[(name, last_seen, online)] for one player, or the most recently seen players."""
+        sql = ("SELECT p.name, p.last_seen, EXISTS (SELECT 1 FROM sessions s WHERE s.player = p.player "
+               "AND s.end IS NULL) AS online FROM players p")
+        if name:
+            rows = self._read(sql + " WHERE p.player = ?", (name.lower(),))
+        else:
+            rows = self._read(sql + " ORDER BY online DESC, p.last_seen DESC LIMIT ?", (limit,))
+        return [(r["name"], r["last_seen"], bool(r["online"])) for r in rows]
+
+
+class SessionTracker:
+    """Feeds SessionStore from the log watcher and checks it against `list`.
+
+    Join/leave events arrive through LogWatcher, which resumes from its saved
+    offset, so nothing is counted twice across bot restarts. The reconcile
+    loop compares open sessions with the poller's player list: anyone
+    missing is closed at the last time they were confirmed online, which
+    covers crashes where no "left the game" line was ever written.
+    """
+
+    def __init__(self, store: SessionStore, poller, interval: float = RECONCILE_INTERVAL):
+        self.store = store
+        self.poller = poller
+        self.interval = interval
+        self._task = None
+
+    def __call__(self, event):
+        if event.kind == JOIN:
+            self.store.join(event.player, stamp_today(event.time))
+        elif event.kind == LEAVE:
+            self.store.leave(event.player, stamp_today(event.time))
+
+    def backfill(self, logs_dir: str, follower):
+        """Queue the one-time import: every archive, then latest.log up to where the watcher resumes."""
+        from logsearch import ARCHIVE_RE
+        try:
+            names = sorted(n for n in os.listdir(logs_dir) if ARCHIVE_RE.match(n))
+        except FileNotFoundError:
+            names = []
+        files = [(os.path.join(logs_dir, n), None) for n in names]
+        try:
+            st = os.stat(follower.path)
+        except FileNotFoundError:
+            st = None
+        if st is not None:
+            if follower.offset is None:
+                files.append((follower.path, st.st_size))  # follower will start at the end
+            elif follower.inode == st.st_ino and follower.offset:
+                files.append((follower.path, follower.offset))
+        self.store.backfill(files)
+
+    def on_stopped(self):
+        self.store.close_all(time.time(), "stop")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        from minecraft import STOPPED
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                snap = await self.poller.get(max_age=self.interval / 2)
+            except Exception as e:
+                log.error(f"Session reconcile failed: {e}")
+                continue
+            if snap.error:
+                continue
+            if snap.state == STOPPED:
+                self.store.reconcile([], snap.timestamp)
+            elif snap.raw_list:
+                self.store.reconcile(snap.players, snap.timestamp)
+
+
+def format_duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 48:
+        return f"{hours}h {minutes}m"
+    return f"{hours // 24}d {hours % 24}h"
+
+
+def format_ago(ts: float, now: float = None) -> str:
+    return format_duration((now or time.time()) - ts) + " ago"
@@ -0,0 +1,197 @@
+import os
+import json
+import gzip
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+log = logging.getLogger("afk-andy")
+
+MAX_DB_BYTES = int(float(os.getenv("TASK_LOG_MAX_MB", "64")) * 1024 * 1024)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    status TEXT NOT NULL,
+    task TEXT NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status_ts ON tasks (status, ts);
+CREATE INDEX IF NOT EXISTS tasks_ts ON tasks (ts);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_STOP = object()
+
+
+class TaskStore:
+    """Task/event log in SQLite (WAL mode).
+
+    append() only puts the entry on a queue, so it's safe to call from the
+    event loop. A writer thread commits queued entries in batches. When the
+    database grows past max_bytes, the oldest half is moved out into a
+    gzipped JSONL archive next to it.
+    """
+
+    def __init__(self, path: str, legacy_json: str = None, max_bytes: int = MAX_DB_BYTES,
+                 batch_size: int = 200):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        db = self._connect()
+        db.executescript(SCHEMA)
+        if legacy_json:
+            self._migrate(db, legacy_json)
+        db.close()
+        self._writer = threading.Thread(target=self._write_loop, name="task-store", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=FULL")
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _migrate(self, db: sqlite3.Connection, legacy_json: str):
+        """One-time import of the old task-log.json array."""
+        if db.execute("SELECT 1 FROM meta WHERE key = 'legacy_json'").fetchone():
+            return
+        try:
+            with open(legacy_json) as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = []
+        with db:
+            db.executemany(
+                "INSERT INTO tasks (ts, status, task, details) VALUES (?, ?, ?, ?)",
+                [self._row(e) for e in entries if isinstance(e, dict)],
+            )
+            db.execute("INSERT INTO meta (key, value) VALUES ('legacy_json', ?)",
+                       (datetime.utcnow().isoformat(),))
+        if entries:
+            log.info(f"Migrated {len(entries)} entries from {legacy_json}")
+
+    @staticmethod
+    def _row(entry: dict) -> tuple:
+        details = entry.get("details")
+        return (
+            entry.get("timestamp") or datetime.utcnow().isoformat(),
+            entry.get("status", ""),
+            entry.get("task", ""),
+            None if details is None else json.dumps(details),
+        )
+
+    def append(self, task: str, status: str, details=None):
+        """Queue an entry. Returns immediately."""
+        self._queue.put({
+            "task": task,
+            "status": status,
+            "details": details,
+            "timestamp": datetime.utcnow().isoformat(),
+        })
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join(timeout=10)
+
+    def query(self, status: str = None, since: str = None, until: str = None,
+              limit: int = 100) -> list:
+        """Newest-first entries, filtered by status and ISO timestamp range."""
+        clauses, args = [], []
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if since:
+            clauses.append("ts >= ?")
+            args.append(since)
+        if until:
+            clauses.append("ts < ?")
+            args.append(until)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        db = self._connect()
+        try:
+            rows = db.execute(
+                f"SELECT ts, status, task, details FROM tasks {where} ORDER BY ts DESC LIMIT ?",
+                (*args, limit),
+            ).fetchall()
+        finally:
+            db.close()
+        return [{
+            "task": r["task"],
+            "status": r["status"],
+            "details": json.loads(r["details"]) if r["details"] else None,
+            "timestamp": r["ts"],
+        } for r in rows]
+
+    def _write_loop(self):
+        db = self._connect()
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [i for i in items if isinstance(i, dict)]
+            if entries:
+                try:
+                    with db:
+                        db.executemany(
+                            "INSERT INTO tasks (ts, status, task, details) VALUES (?, ?, ?, ?)",
+                            [self._row(e) for e in entries],
+                        )
+                except Exception as e:
+                    log.error(f"Task log write failed ({len(entries)} entries): {e}")
+                # Errors stop here: a dead writer thread would leave every later log_task and flush() hanging
+                try:
+                    self._maybe_rotate(db)
+                except Exception as e:
+                    log.error(f"Task log rotation failed: {e}")
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is _STOP:
+                    stopping = True
+        db.close()
+
+    def _maybe_rotate(self, db: sqlite3.Connection):
+        size = 0
+        for path in (self.path, self.path + "-wal"):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        if size < self.max_bytes:
+            return
+        (count,) = db.execute("SELECT COUNT(*) FROM tasks").fetchone()
+        rows = db.execute(
+            "SELECT id, ts, status, task, details FROM tasks ORDER BY id LIMIT ?", (count // 2,)
+        ).fetchall()
+        if not rows:
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        archive = f"{os.path.splitext(self.path)[0]}-{stamp}-{rows[0]['id']}.jsonl.gz"
+        with gzip.open(archive, "wt") as f:
+            for r in rows:
+                f.write(json.dumps({
+                    "task": r["task"], "status": r["status"], "timestamp": r["ts"],
+                    "details": json.loads(r["details"]) if r["details"] else None,
+                }) + "\n")
+        with db:
+            db.execute("DELETE FROM tasks WHERE id <= ?", (rows[-1]["id"],))
+        db.execute("VACUUM")
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        log.info(f"Rotated {len(rows)} task log entries to {archive}")
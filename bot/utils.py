@@ -1,60 +1,191 @@
 import os
-import json
-import subprocess
+import atexit
+import asyncio
 import logging
-from datetime import datetime
+
+from taskstore import TaskStore
 
 log = logging.getLogger("afk-andy")
 
 PROJECT_DIR = os.path.expanduser("~/afk-andy")
 MEMORY_DIR = os.path.join(PROJECT_DIR, "memory")
 
+_task_store = None
 
-def log_task(task: str, status: str, details=None):
-    """Append a task entry to task-log.json."""
-    log_path = os.path.join(MEMORY_DIR, "task-log.json")
-    try:
-        with open(log_path) as f:
-            tasks = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        tasks = []
-
-    tasks.append({
-        "task": task,
-        "status": status,
-        "details": details,
-        "timestamp": datetime.utcnow().isoformat(),
-    })
-
-    with open(log_path, "w") as f:
-        json.dump(tasks, f, indent=2)
 
+def get_task_store() -> TaskStore:
+    """Shared task log store, opened (and migrated from task-log.json) on first use."""
+    global _task_store
+    if _task_store is None:
+        _task_store = TaskStore(
+            os.path.join(MEMORY_DIR, "task-log.db"),
+            legacy_json=os.path.join(MEMORY_DIR, "task-log.json"),
+        )
+        atexit.register(_task_store.close)
+    return _task_store
+
+
+def log_task(task: str, status: str, details=None):
+    """Append a task entry to the task log. Doesn't block on disk I/O."""
+    get_task_store().append(task, status, details)
     log.info(f"Task logged: [{status}] {task}")
 
 
-def git_sync(message: str) -> str:
-    """Auto-commit and push changes to GitHub."""
-    try:
-        subprocess.run(["git", "add", "-A"], cwd=PROJECT_DIR, check=True)
+GIT_AUTO_SYNC = os.getenv("GIT_AUTO_SYNC", "0") == "1"
+GIT_SYNC_DEBOUNCE = float(os.getenv("GIT_SYNC_DEBOUNCE", "15"))
+GIT_SYNC_MAX_WAIT = float(os.getenv("GIT_SYNC_MAX_WAIT", "120"))
+GIT_TIMEOUT = float(os.getenv("GIT_TIMEOUT", "60"))
+GIT_PUSH_RETRIES = int(os.getenv("GIT_PUSH_RETRIES", "4"))
+GIT_REMOTE = os.getenv("GIT_REMOTE", "origin")
+GIT_BRANCH = os.getenv("GIT_BRANCH", "main")
+
+_git_sync = None
+
+
+class GitError(Exception):
+    """A git command failed or timed out."""
+
+
+class GitSync:
+    """Debounced auto-commit and push, run with asyncio subprocesses.
+
+    request() returns at once. Requests that arrive within `debounce`
+    seconds of each other become one commit whose message lists them all,
+    but a batch never waits longer than `max_wait` from its first request.
+    A failed push is retried with exponential backoff. If every attempt
+    fails, the commit stays local and the next batch pushes it too.
+    Outcomes go to the task log. Point repo_dir/remote at a scratch clone
+    of a bare repository to try it without touching GitHub.
+    """
+
+    def __init__(self, repo_dir: str = PROJECT_DIR, remote: str = GIT_REMOTE, branch: str = GIT_BRANCH,
+                 debounce: float = GIT_SYNC_DEBOUNCE, max_wait: float = GIT_SYNC_MAX_WAIT,
+                 timeout: float = GIT_TIMEOUT, retries: int = GIT_PUSH_RETRIES, backoff: float = 2.0):
+        self.repo_dir = repo_dir
+        self.remote = remote
+        self.branch = branch
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.unpushed = False
+        self.last_result = None
+        self._pending = []  # [(message, future)]
+        self._flushing = False
+        self._wakeup = None
+        self._task = None
 
-        result = subprocess.run(
-            ["git", "diff", "--cached", "--quiet"],
-            cwd=PROJECT_DIR,
+    def request(self, message: str) -> asyncio.Future:
+        """Queue a sync. The future resolves to the outcome of the batch it lands in."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, future))
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+        return future
+
+    async def flush(self):
+        """Wait for everything queued so far, skipping the rest of the debounce window."""
+        if self._pending:
+            futures = [f for _, f in self._pending]
+            self._flushing = True
+            self._wakeup.set()
+            await asyncio.gather(*futures, return_exceptions=True)
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            first = loop.time()
+            # Trailing debounce: each new request restarts the quiet period, up to max_wait
+            while True:
+                self._wakeup.clear()
+                quiet = min(self.debounce, first + self.max_wait - loop.time())
+                if quiet <= 0 or self._flushing:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), quiet)
+                except asyncio.TimeoutError:
+                    break
+            batch, self._pending = self._pending, []
+            self._flushing = False
+            try:
+                result = await self._sync([m for m, _ in batch])
+            except Exception as e:
+                log.error(f"Git sync failed: {e}")
+                result = f"Git sync failed: {e}"
+            self.last_result = result
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(result)
+
+    async def _git(self, *args, check: bool = True) -> tuple:
+        """(returncode, output) of one git command, killed after `timeout`."""
+        proc = await asyncio.create_subprocess_exec(
+            "git", *args, cwd=self.repo_dir,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},  # fail instead of waiting for a password
         )
-        if result.returncode == 0:
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise GitError(f"git {args[0]} timed out after {self.timeout:.0f}s")
+        text = out.decode("utf-8", errors="replace").strip()
+        if check and proc.returncode != 0:
+            raise GitError(f"git {args[0]} exited {proc.returncode}: {text[-300:]}")
+        return proc.returncode, text
+
+    @staticmethod
+    def commit_message(messages: list) -> str:
+        unique = list(dict.fromkeys(messages))
+        if len(unique) == 1:
+            return f"Auto: {unique[0]}"
+        return f"Auto: {len(unique)} changes\n\n" + "\n".join(f"- {m}" for m in unique)
+
+    async def _sync(self, messages: list) -> str:
+        await self._git("add", "-A")
+        code, _ = await self._git("diff", "--cached", "--quiet", check=False)
+        if code == 0 and not self.unpushed:
             return "No changes to commit."
+        summary = messages[0] if len(messages) == 1 else f"{len(messages)} changes"
+        if code != 0:
+            await self._git("commit", "-m", self.commit_message(messages))
+            self.unpushed = True
+        _, head = await self._git("rev-parse", "--short", "HEAD")
 
-        subprocess.run(
-            ["git", "commit", "-m", f"Auto: {message}"],
-            cwd=PROJECT_DIR,
-            check=True,
-        )
-        subprocess.run(
-            ["git", "push", "origin", "main"],
-            cwd=PROJECT_DIR,
-            check=True,
-        )
-        return f"Pushed: {message}"
-    except subprocess.CalledProcessError as e:
-        log.error(f"Git sync failed: {e}")
-        return f"Git sync failed: {e}"
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            try:
+                await self._git("push", self.remote, f"HEAD:{self.branch}")
+                break
+            except GitError as e:
+                log.warning(f"Git push attempt {attempt}/{self.retries} failed: {e}")
+                if attempt == self.retries:
+                    log_task(f"git sync: {summary}", "failed",
+                             {"commit": head, "messages": messages, "attempts": attempt, "error": str(e)})
+                    return f"Committed {head} but push failed after {attempt} attempts: {e}"
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+        self.unpushed = False
+        log_task(f"git sync: {summary}", "pushed", {"commit": head, "messages": messages, "attempts": attempt})
+        return f"Pushed {head}: {summary}"
+
+
+def get_git_sync() -> GitSync:
+    global _git_sync
+    if _git_sync is None:
+        _git_sync = GitSync()
+    return _git_sync
+
+
+def git_sync(message: str) -> asyncio.Future:
+    """Queue an auto-commit and push of PROJECT_DIR. Doesn't block; await the result if you need it."""
+    return get_git_sync().request(message)
@@ -0,0 +1,465 @@
+"""End-to-end benchmark of the bot's command layer, offline.
+
+    venv/bin/python scripts/bench_bot.py [workload ...] [--rcon-latency-ms 2] [--rcon-fail-rate 0.01]
+    venv/bin/python scripts/bench_bot.py --script my-workload.json
+    venv/bin/python scripts/bench_bot.py --list
+
+Runs the real on_message and command handlers (setup_commands) against a
+stand-in Discord message/channel and a fake Paper server
+(scripts/fake_mc.py) that the real supervisor launches through a `java`
+shim, so !restart goes through the same stop/exit/start/"Done" path as in
+production. Everything lives in a throwaway HOME, so nothing touches the
+real memory/ directory or server.
+
+Built-in workloads: status (!status storm), chat (chatter flood), cmd
+(!cmd / !say bursts), restart, mixed (all at once), all (every one in
+turn). A script is a JSON object {"name": [step, ...]}; each step is
+{"content": "!status" or a list (round robin; "$chat" draws from a chat
+corpus), "count": 500, "concurrency": 100}.
+
+Per step it reports p50/p90/p99/max end-to-end latency (message in,
+handler done), throughput, RCON requests and failures, handler errors,
+event loop lag and RSS. Results are saved as JSON under --out, and each run is compared with the
+previous run of the same workload.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(ROOT, "bot"))
+
+RESULTS_DIR = os.path.expanduser("~/afk-andy/memory/bench")  # resolved before HOME is swapped
+CHANNEL_ID, USER_IDS = 1001, (2001, 2002)
+
+CHATTER = (
+    "anyone on tonight", "i found diamonds at y -58", "brb dinner", "where's the nether portal",
+    "can someone tp me", "the creeper blew up my house again", "who took my elytra",
+    "hello andy", "thanks andy", "tell me a joke", "good morning", "gg", "lol",
+)
+
+WORKLOADS = {
+    "status": [
+        {"content": "!status", "count": 1000, "concurrency": 200},
+        {"content": "!status fresh", "count": 200, "concurrency": 50},
+        {"content": "!players", "count": 500, "concurrency": 100},
+    ],
+    "chat": [
+        {"content": "$chat", "count": 5000, "concurrency": 200},
+    ],
+    "cmd": [
+        {"content": "!cmd time query daytime", "count": 500, "concurrency": 50},
+        {"content": "!say hello from the bench", "count": 200, "concurrency": 20},
+    ],
+    "restart": [
+        {"content": "!restart", "count": 3, "concurrency": 1},
+    ],
+    "mixed": [
+        {"content": ["!status", "$chat", "!cmd list", "$chat", "!players", "!status fresh"],
+         "count": 3000, "concurrency": 200},
+    ],
+}
+WORKLOADS["all"] = [step for name in ("status", "chat", "cmd", "restart") for step in WORKLOADS[name]]
+
+
+# -- Discord stand-ins --
+
+class FakeUser:
+    def __init__(self, user_id: int, bot: bool = False):
+        self.id = user_id
+        self.bot = bot
+        self.name = self.display_name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+
+
+class FakeChannel:
+    """Records sends; each one costs `latency` seconds like a Discord API call."""
+
+    def __init__(self, channel_id: int, latency: float):
+        self.id = channel_id
+        self.latency = latency
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+        return FakeMessage(self, FakeUser(0, bot=True), content or "")
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, author: FakeUser, content: str):
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.guild = None
+        self.id = random.getrandbits(63)
+        self._state = None  # commands.Context copies it; only real sends use it
+        self.attachments, self.mentions, self.role_mentions, self.channel_mentions = [], [], [], []
+        self.reference = None
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(self.channel.latency)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def edit(self, content=None, **kwargs):
+        await asyncio.sleep(self.channel.latency)
+        self.content = content
+
+
+def make_context_class():
+    from discord.ext import commands
+
+    class FakeContext(commands.Context):
+        async def send(self, content=None, **kwargs):
+            return await self.message.channel.send(content, **kwargs)
+
+        async def reply(self, content=None, **kwargs):
+            return await self.message.channel.send(content, **kwargs)
+
+    return FakeContext
+
+
+# -- measurement --
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class LagProbe:
+    """Samples how late a 10ms sleep wakes up, i.e. how long the loop was blocked."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> list:
+        self._task.cancel()
+        return self.samples
+
+
+def summarize(values: list) -> dict:
+    from perf import percentile
+    if not values:
+        return {}
+    ms = [v * 1000 for v in values]
+    return {
+        "p50": round(percentile(ms, 0.50), 3),
+        "p90": round(percentile(ms, 0.90), 3),
+        "p99": round(percentile(ms, 0.99), 3),
+        "max": round(max(ms), 3),
+    }
+
+
+def rcon_counts() -> tuple:
+    """(requests, failures) so far, from the bot's own RCON counter."""
+    from metrics import RCON_TOTAL
+    values = RCON_TOTAL._values  # {(result, state): count}
+    return int(sum(values.values())), int(sum(v for (result, _), v in values.items() if result == "error"))
+
+
+# -- environment --
+
+def prepare_home(tmp: str, args) -> dict:
+    """Throwaway HOME with a server dir, a `java` shim for fake_mc.py and the env the bot reads."""
+    mc_dir = os.path.join(tmp, "minecraft")
+    os.makedirs(os.path.join(tmp, "afk-andy", "memory"))
+    os.makedirs(mc_dir)
+    os.makedirs(os.path.join(tmp, "bin"))
+    with socket_port() as port:
+        rcon_port = port
+    with open(os.path.join(mc_dir, "server.properties"), "w") as f:
+        f.write(f"enable-rcon=true\nrcon.port={rcon_port}\nrcon.password=bench\nserver-port=0\n")
+    open(os.path.join(mc_dir, "paper.jar"), "w").close()
+    shim = os.path.join(tmp, "bin", "java")
+    with open(shim, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(ROOT, "scripts", "fake_mc.py")}" "$@"\n')
+    os.chmod(shim, 0o755)
+    return {
+        "HOME": tmp,
+        "PATH": os.path.join(tmp, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        "MC_SERVER_DIR": mc_dir,
+        "MC_RAM": "1G",
+        "MC_JVM_CDS": "0",
+        "MC_CPUS": "",
+        "MC_MEMORY_MAX": "",
+        "RCON_HOST": "127.0.0.1",
+        "RCON_PORT": str(rcon_port),
+        "RCON_PASSWORD": "bench",
+        "RCON_TIMEOUT": str(args.rcon_timeout),
+        "DISCORD_CHANNEL_ID": str(CHANNEL_ID),
+        "LEO_DISCORD_ID": str(USER_IDS[0]),
+        "EUGENE_DISCORD_ID": str(USER_IDS[1]),
+        "INSTANCES_FILE": os.path.join(tmp, "afk-andy", "memory", "instances.json"),
+        "FAKE_MC_BOOT_SECONDS": str(args.boot_seconds),
+        "FAKE_MC_LATENCY_MS": str(args.rcon_latency_ms),
+        "FAKE_MC_JITTER_MS": str(args.rcon_jitter_ms),
+        "FAKE_MC_FAIL_RATE": str(args.rcon_fail_rate),
+        "FAKE_MC_STALL_RATE": str(args.rcon_stall_rate),
+        "FAKE_MC_PLAYERS": str(args.players),
+    }
+
+
+class socket_port:
+    """A free localhost TCP port (closed again before use)."""
+
+    def __enter__(self) -> int:
+        import socket
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        return self.sock.getsockname()[1]
+
+    def __exit__(self, *exc):
+        self.sock.close()
+
+
+# -- runner --
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.errors = 0
+
+    async def boot(self):
+        import main
+        from commands import setup_commands
+        from poller import ServerPoller
+        from instances import InstanceRegistry
+        from minecraft import supervisor
+        self.main = main
+        self.bot = bot = main.bot
+        bot._connection.user = FakeUser(0, bot=True)  # get_context compares authors with the bot's own id
+        context_cls = make_context_class()
+        get_context = bot.get_context
+
+        async def fake_get_context(origin, *, cls=context_cls):
+            return await get_context(origin, cls=cls)
+
+        bot.get_context = fake_get_context
+        setup_commands(bot)
+
+        @bot.event
+        async def on_command_error(ctx, error):
+            self.errors += 1
+            if self.args.verbose:
+                print(f"  ! {ctx.message.content}: {error}", file=sys.stderr)
+
+        bot.poller = ServerPoller()
+        bot.instances = InstanceRegistry(bot.poller)
+        self.supervisor = supervisor
+        ok, msg = await supervisor.start()
+        if not ok or not await supervisor.wait_ready(30):
+            raise SystemExit(f"Fake server didn't come up: {msg}")
+        bot.poller.start()
+        self.channel = FakeChannel(CHANNEL_ID, self.args.discord_latency_ms / 1000)
+
+    async def shutdown(self):
+        self.bot.poller.stop()
+        await self.supervisor.stop(timeout=10)
+        await self.bot.instances.close()
+        from minecraft import get_rcon_pool
+        await get_rcon_pool().close()
+
+    def content(self, spec, i: int) -> str:
+        text = spec[i % len(spec)] if isinstance(spec, list) else spec
+        if text == "$chat":
+            return self.rng.choice(CHATTER)
+        return text
+
+    async def run_step(self, step: dict) -> dict:
+        count, concurrency = step.get("count", 100), step.get("concurrency", 10)
+        latencies, gate = [], asyncio.Semaphore(concurrency)
+        errors_before, rcon_before, sent_before = self.errors, rcon_counts(), self.channel.sent
+
+        async def one(i: int):
+            author = FakeUser(USER_IDS[i % len(USER_IDS)])
+            message = FakeMessage(self.channel, author, self.content(step["content"], i))
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    await self.main.on_message(message)
+                except Exception as e:
+                    self.errors += 1
+                    if self.args.verbose:
+                        print(f"  ! {message.content}: {e}", file=sys.stderr)
+                latencies.append(time.perf_counter() - started)
+
+        probe = LagProbe()
+        probe.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(count)))
+        wall = time.perf_counter() - started
+        lag = probe.stop()
+        rcon_after = rcon_counts()
+        return {
+            "content": step["content"],
+            "count": count,
+            "concurrency": concurrency,
+            "seconds": round(wall, 3),
+            "throughput": round(count / wall, 1) if wall else None,
+            "latency_ms": summarize(latencies),
+            "loop_lag_ms": summarize(lag),
+            "rcon_requests": rcon_after[0] - rcon_before[0],
+            "rcon_failures": rcon_after[1] - rcon_before[1],
+            "replies": self.channel.sent - sent_before,
+            "errors": self.errors - errors_before,
+            "rss_mb": round(rss_bytes() / 1024 ** 2, 1),
+        }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def previous_result(out_dir: str, workload: str):
+    try:
+        names = sorted(n for n in os.listdir(out_dir) if n.startswith(workload + "-") and n.endswith(".json"))
+    except FileNotFoundError:
+        return None
+    if not names:
+        return None
+    with open(os.path.join(out_dir, names[-1])) as f:
+        return json.load(f)
+
+
+def label(content) -> str:
+    return " | ".join(content) if isinstance(content, list) else content
+
+
+def delta(now: float, before: float, lower_is_better: bool = True) -> str:
+    if not before or now is None:
+        return ""
+    change = (now - before) / before * 100
+    better = change < 0 if lower_is_better else change > 0
+    return f" ({change:+.0f}%{' better' if better and abs(change) >= 5 else ''})"
+
+
+def print_report(result: dict, before: dict = None):
+    old_steps = {label(s["content"]): s for s in (before or {}).get("steps", [])}
+    print(f"\n== {result['workload']} @ {result['revision'] or 'working tree'} "
+          f"(rcon {result['config']['rcon_latency_ms']}ms, fail {result['config']['rcon_fail_rate']}, "
+          f"stall {result['config']['rcon_stall_rate']}, discord {result['config']['discord_latency_ms']}ms)")
+    for step in result["steps"]:
+        old = old_steps.get(label(step["content"]), {})
+        lat, olat = step["latency_ms"], old.get("latency_ms", {})
+        print(f"{label(step['content'])[:48]:48} x{step['count']} @{step['concurrency']}")
+        print(f"    latency  p50 {lat.get('p50', 0):8.2f}ms{delta(lat.get('p50'), olat.get('p50'))}"
+              f"  p99 {lat.get('p99', 0):8.2f}ms{delta(lat.get('p99'), olat.get('p99'))}"
+              f"  max {lat.get('max', 0):8.2f}ms")
+        print(f"    {step['throughput']} msg/s{delta(step['throughput'], old.get('throughput'), False)}"
+              f"  rcon {step['rcon_requests']} ({step['rcon_failures']} failed)  replies {step['replies']}  errors {step['errors']}"
+              f"  loop lag p99 {step['loop_lag_ms'].get('p99', 0):.2f}ms max {step['loop_lag_ms'].get('max', 0):.2f}ms"
+              f"  rss {step['rss_mb']}MB")
+    if before:
+        print(f"  (compared with {before['started']} @ {before['revision'] or '?'})")
+
+
+async def run(args, workloads: dict) -> list:
+    harness = Harness(args)
+    await harness.boot()
+    results = []
+    try:
+        for name, steps in workloads.items():
+            rss_start = rss_bytes()
+            result = {
+                "workload": name,
+                "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "revision": git_revision(),
+                "config": {k: getattr(args, k) for k in (
+                    "rcon_latency_ms", "rcon_jitter_ms", "rcon_fail_rate", "rcon_stall_rate",
+                    "discord_latency_ms", "players", "seed")},
+                "steps": [],
+            }
+            for step in steps:
+                result["steps"].append(await harness.run_step(step))
+            result["rss_mb"] = {"start": round(rss_start / 1024 ** 2, 1), "end": round(rss_bytes() / 1024 ** 2, 1)}
+            results.append(result)
+    finally:
+        await harness.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("workloads", nargs="*", default=["status", "chat", "cmd"])
+    parser.add_argument("--script", help="JSON file of extra workloads")
+    parser.add_argument("--list", action="store_true", help="show workloads and exit")
+    parser.add_argument("--rcon-latency-ms", type=float, default=2.0, help="fake server time per command")
+    parser.add_argument("--rcon-jitter-ms", type=float, default=1.0)
+    parser.add_argument("--rcon-fail-rate", type=float, default=0.0, help="share of commands that drop the connection")
+    parser.add_argument("--rcon-stall-rate", type=float, default=0.0, help="share of commands never answered")
+    parser.add_argument("--rcon-timeout", type=float, default=2.0)
+    parser.add_argument("--discord-latency-ms", type=float, default=20.0, help="cost of each send/reaction")
+    parser.add_argument("--boot-seconds", type=float, default=0.3)
+    parser.add_argument("--players", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=RESULTS_DIR, help="where results are saved and compared")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args()
+
+    available = dict(WORKLOADS)
+    if args.script:
+        with open(args.script) as f:
+            available.update(json.load(f))
+    if args.list:
+        for name, steps in available.items():
+            print(f"{name:8} " + "; ".join(f"{label(s['content'])} x{s.get('count', 100)}" for s in steps))
+        return
+    unknown = [w for w in args.workloads if w not in available]
+    if unknown:
+        parser.error(f"unknown workload(s) {', '.join(unknown)}; have {', '.join(available)}")
+
+    out_dir = os.path.abspath(os.path.expanduser(args.out))
+    tmp = tempfile.mkdtemp(prefix="afk-bench-")
+    try:
+        os.environ.update(prepare_home(tmp, args))
+        random.seed(args.seed)
+        results = asyncio.run(run(args, {w: available[w] for w in args.workloads}))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for result in results:
+        print_report(result, previous_result(out_dir, result["workload"]))
+        if not args.no_save:
+            os.makedirs(out_dir, exist_ok=True)
+            path = os.path.join(out_dir, f"{result['workload']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+            with open(path, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"  saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Micro-benchmark: old per-trigger substring loop vs the compiled matcher.
+
+    venv/bin/python scripts/bench_chat.py [--messages 50000]
+
+Builds a synthetic busy-channel corpus (mostly chatter that matches
+nothing, some greetings/thanks/jokes) and times both approaches.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+
+from chat import CHAT_RESPONSES, TriggerMatcher  # noqa: E402
+
+FILLER = (
+    "anyone on tonight", "i found diamonds at y -58", "brb dinner", "where's the nether portal",
+    "can someone tp me", "the creeper blew up my house again", "who took my elytra",
+    "building a farm near spawn", "server was laggy earlier", "going to the end later",
+    "need more iron for the beacon", "check out my base", "pretty sure that's a bug",
+)
+
+
+def make_corpus(n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    triggers = [t for spec in CHAT_RESPONSES.values() for t in spec["triggers"]]
+    corpus = []
+    for _ in range(n):
+        words = rng.choice(FILLER).split()
+        if rng.random() < 0.25:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(triggers))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def old_match(text: str):
+    content_lower = text.lower().strip("?.!,")
+    for name, category in CHAT_RESPONSES.items():
+        for trigger in category["triggers"]:
+            if trigger in content_lower:
+                return name
+    return None
+
+
+def bench(fn, corpus: list, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.messages)
+    start = time.perf_counter()
+    matcher = TriggerMatcher(CHAT_RESPONSES)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    old = bench(old_match, corpus, args.rounds)
+    new = bench(matcher.match, corpus, args.rounds)
+    changed = sum(old_match(t) != matcher.match(t) for t in corpus)
+
+    print(f"messages:          {len(corpus)}")
+    print(f"compile:           {compile_ms:.2f} ms")
+    print(f"substring loop:    {old / len(corpus) * 1e6:.2f} us/msg")
+    print(f"compiled matcher:  {new / len(corpus) * 1e6:.2f} us/msg  ({old / new:.1f}x)")
+    print(f"different winners: {changed} (word boundaries + specificity priority)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Stand-in for a Paper server: boot log, console stdin and an RCON listener.
+
+    venv/bin/python scripts/fake_mc.py [--port 25575 --password pw]
+
+Run from a server directory it reads rcon.port / rcon.password from
+server.properties like the real thing, so the bot's supervisor can launch
+it through a `java` shim (scripts/bench_bot.py does this). It prints the
+"Done (x.xxxs)!" line after FAKE_MC_BOOT_SECONDS, answers list / tps /
+mspt / execute if entity in Paper's formats, and exits on `stop` from
+RCON or stdin.
+
+Commands are executed one at a time, like on the server's main thread,
+each taking FAKE_MC_LATENCY_MS (± FAKE_MC_JITTER_MS). Failure injection:
+FAKE_MC_FAIL_RATE drops the connection instead of replying,
+FAKE_MC_STALL_RATE never replies. Both are probabilities per command.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+
+from rcon import encode_packet, read_packet, RconError, TYPE_LOGIN, TYPE_COMMAND  # noqa: E402
+
+BOOT_SECONDS = float(os.getenv("FAKE_MC_BOOT_SECONDS", "0.5"))
+LATENCY_MS = float(os.getenv("FAKE_MC_LATENCY_MS", "2"))
+JITTER_MS = float(os.getenv("FAKE_MC_JITTER_MS", "1"))
+FAIL_RATE = float(os.getenv("FAKE_MC_FAIL_RATE", "0"))
+STALL_RATE = float(os.getenv("FAKE_MC_STALL_RATE", "0"))
+PLAYERS = int(os.getenv("FAKE_MC_PLAYERS", "5"))
+MAX_PLAYERS = 20
+
+
+def read_properties(path: str = "server.properties") -> dict:
+    props = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and not key.startswith("#"):
+                    props[key] = value
+    except FileNotFoundError:
+        pass
+    return props
+
+
+def stamp() -> str:
+    return time.strftime("[%H:%M:%S INFO]:")
+
+
+class FakeServer:
+    def __init__(self, password: str, rng: random.Random):
+        self.password = password
+        self.rng = rng
+        self.players = [f"Player{i}" for i in range(PLAYERS)]
+        self.main_thread = asyncio.Lock()
+        self.stopping = asyncio.Event()
+        self.commands = 0
+
+    async def execute(self, command: str) -> str:
+        async with self.main_thread:
+            delay = max(0.0, self.rng.gauss(LATENCY_MS, JITTER_MS)) / 1000
+            await asyncio.sleep(delay)
+            self.commands += 1
+            return self.respond(command)
+
+    def respond(self, command: str) -> str:
+        word = command.split(" ", 1)[0].lstrip("/")
+        if word == "list":
+            names = ", ".join(self.players)
+            return f"There are {len(self.players)} of a max of {MAX_PLAYERS} players online: {names}"
+        if word == "tps":
+            tps = [round(self.rng.uniform(19.5, 20.0), 2) for _ in range(3)]
+            return "§6TPS from last 1m, 5m, 15m: " + ", ".join(f"§a{t}" for t in tps)
+        if word == "mspt":
+            windows = []
+            for _ in range(3):
+                avg = self.rng.uniform(8, 20)
+                windows.append(f"§a{avg:.1f}§7/§a{avg * 0.6:.1f}§7/§a{avg * 1.8:.1f}")
+            return "§6Server tick times §e(§7avg§e/§7min§e/§7max§e)§6 from last 5s§7,§6 10s§7,§6 1m§e:\n§6◴ " \
+                + "§7, ".join(windows)
+        if command.startswith("execute if entity"):
+            return f"Test passed, count: {self.rng.randint(300, 900)}"
+        if word == "stop":
+            print(f"{stamp()} Stopping server", flush=True)
+            self.stopping.set()
+            return "Stopping the server"
+        if word == "time" and "query" in command:
+            return f"The time is {self.rng.randint(0, 24000)}"
+        if word in ("say", "whitelist", "op", "deop", "gamerule", "kill", "forceload", "save-all"):
+            return ""
+        return f"Unknown or incomplete command, see below for error\n{command}<--[HERE]"
+
+    async def handle(self, reader, writer):
+        authed = False
+        try:
+            while not self.stopping.is_set():
+                request_id, ptype, payload = await read_packet(reader)
+                if ptype == TYPE_LOGIN:
+                    authed = payload == self.password
+                    writer.write(encode_packet(request_id if authed else -1, 2, ""))
+                elif not authed:
+                    break
+                elif ptype == TYPE_COMMAND:
+                    roll = self.rng.random()
+                    if roll < FAIL_RATE:
+                        break
+                    if roll < FAIL_RATE + STALL_RATE:
+                        await self.stopping.wait()
+                        break
+                    writer.write(encode_packet(request_id, 0, await self.execute(payload)))
+                else:
+                    # What Paper does with unknown packet types; the bot's client uses this as a sentinel
+                    writer.write(encode_packet(request_id, 0, f"Unknown request {ptype:x}"))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, RconError):
+            pass
+        finally:
+            writer.close()
+
+    async def console(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        except (OSError, ValueError):
+            return
+        while not self.stopping.is_set():
+            line = await reader.readline()
+            if not line:
+                return
+            reply = await self.execute(line.decode().strip())
+            if reply:
+                print(f"{stamp()} {reply}", flush=True)
+
+
+async def main(args) -> int:
+    props = read_properties()
+    port = args.port or int(props.get("rcon.port", 25575))
+    password = args.password or props.get("rcon.password", "")
+    server = FakeServer(password, random.Random(args.seed))
+    started = time.perf_counter()
+    print(f"{stamp()} Starting minecraft server version 1.21.4 (fake)", flush=True)
+    await asyncio.sleep(BOOT_SECONDS)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", port, reuse_address=True)
+    print(f"{stamp()} RCON running on 127.0.0.1:{port}", flush=True)
+    print(f'{stamp()} Done ({time.perf_counter() - started:.3f}s)! For help, type "help"', flush=True)
+    console = asyncio.create_task(server.console())
+    await server.stopping.wait()
+    console.cancel()
+    listener.close()
+    print(f"{stamp()} Handled {server.commands} commands", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    # Anything else is the java command line the supervisor built; ignore it
+    args, _ = parser.parse_known_args()
+    sys.exit(asyncio.run(main(args)))
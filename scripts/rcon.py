@@ -0,0 +1,186 @@
+"""Send Minecraft console commands over RCON.
+
+    venv/bin/python scripts/rcon.py time set day
+    venv/bin/python scripts/rcon.py -f commands.txt
+    printf 'time set day\\nweather clear\\n' | venv/bin/python scripts/rcon.py -
+    venv/bin/python scripts/rcon.py --json - < commands.txt
+
+Every command in one run shares a single session. Commands are sent one
+at a time in input order, and each one's timeout runs from when it's
+sent, so a long file can't time out the commands queued at its end. stdin
+is streamed, so a command goes out as soon as its line arrives and the
+previous one has been answered. If the bot is running, the session goes
+through its gateway socket (RCON_GATEWAY_SOCKET), which gives it an RCON
+connection of its own. Otherwise it logs in directly with
+RCON_HOST/PORT/PASSWORD from .env.
+
+With --json, each result is one line:
+{"command": ..., "ok": true, "response": ..., "ms": ...}, or "ok": false
+with "error". The exit status is 1 if any command failed.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "bot"))
+
+from rcon import RconConnection, RconError  # noqa: E402
+
+
+class GatewaySession:
+    """JSON-lines client for the bot's RconGateway."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+        self._waiting = {}
+        self.closed = False
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def open(cls, path: str):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def command(self, command: str, timeout: float) -> str:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self.writer.write(json.dumps({"id": request_id, "command": command}).encode() + b"\n")
+        await self.writer.drain()
+        # The gateway enforces the command's own timeout (after logging in, the
+        # first time); this only guards against a bot that stopped answering
+        try:
+            reply = await asyncio.wait_for(future, 2 * timeout)
+        except asyncio.TimeoutError:
+            self.close()
+            raise RconError(f"Gateway didn't answer within {2 * timeout}s")
+        if not reply["ok"]:
+            raise RconError(reply["error"])
+        return reply["response"]
+
+    async def _read_loop(self):
+        error = RconError("Gateway closed the connection.")
+        try:
+            async for line in self.reader:
+                reply = json.loads(line)
+                future = self._waiting.pop(reply.get("id"), None)
+                if future and not future.done():
+                    future.set_result(reply)
+        except (ConnectionError, ValueError) as e:
+            error = RconError(f"Gateway connection lost: {e}")
+        self.closed = True
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self):
+        self.closed = True
+        self._reader_task.cancel()
+        self.writer.close()
+
+
+async def open_session(args):
+    if not args.direct and args.socket and os.path.exists(args.socket):
+        try:
+            return await GatewaySession.open(args.socket)
+        except OSError:
+            pass  # bot not listening; fall back to a direct login
+    return await RconConnection.open(args.host, args.port, args.password, args.timeout)
+
+
+async def read_commands(args):
+    """Yield commands as they become available."""
+    if args.file == "-":
+        loop = asyncio.get_running_loop()
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            if line.strip() and not line.lstrip().startswith("#"):
+                yield line.strip()
+    elif args.file:
+        with open(args.file) as f:
+            for line in f:
+                if line.strip() and not line.lstrip().startswith("#"):
+                    yield line.strip()
+    else:
+        yield " ".join(args.command)
+
+
+def emit(args, command: str, response: str = None, error: str = None, ms: float = None):
+    if args.json:
+        result = {"command": command, "ok": error is None}
+        if error is None:
+            result.update(response=response, ms=ms)
+        else:
+            result["error"] = error
+        print(json.dumps(result), flush=True)
+    elif error is None:
+        print(response, flush=True)
+    else:
+        print(f"error: {command}: {error}", file=sys.stderr, flush=True)
+
+
+async def run(args) -> int:
+    try:
+        session = await open_session(args)
+    except (OSError, asyncio.TimeoutError, RconError) as e:
+        print(f"error: can't reach RCON: {e}", file=sys.stderr)
+        return 1
+
+    failed = False
+    try:
+        async for command in read_commands(args):
+            if session.closed:
+                # A timeout or drop closes the session; carry on with a fresh one
+                try:
+                    session = await open_session(args)
+                except (OSError, asyncio.TimeoutError, RconError) as e:
+                    failed = True
+                    emit(args, command, error=f"can't reach RCON: {e}")
+                    continue
+            started = time.perf_counter()
+            try:
+                response = await session.command(command, args.timeout)
+            except (RconError, OSError, asyncio.TimeoutError) as e:
+                failed = True
+                emit(args, command, error=str(e) or type(e).__name__)
+                continue
+            emit(args, command, response, ms=round((time.perf_counter() - started) * 1000, 2))
+    finally:
+        session.close()
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send commands to the Minecraft server over RCON.")
+    parser.add_argument("command", nargs="*", help="a single command (words are joined)")
+    parser.add_argument("-f", "--file", help="read one command per line from a file, or - for stdin")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per command")
+    parser.add_argument("--direct", action="store_true", help="skip the bot gateway, log in to RCON directly")
+    parser.add_argument("--timeout", type=float, default=None, help="per-command timeout in seconds")
+    args = parser.parse_args()
+    if args.command == ["-"]:
+        args.file, args.command = "-", []
+    if not args.command and not args.file:
+        parser.error("give a command, -f FILE, or - to read stdin")
+
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(ROOT, ".env"))
+    args.host = os.getenv("RCON_HOST", "localhost")
+    args.port = int(os.getenv("RCON_PORT", "25575"))
+    args.password = os.getenv("RCON_PASSWORD", "changeme")
+    args.timeout = args.timeout or float(os.getenv("RCON_TIMEOUT", "5"))
+    args.socket = os.path.expanduser(os.getenv("RCON_GATEWAY_SOCKET", "~/afk-andy/memory/rcon.sock"))
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,12 @@ cd ~/afk-andy
 echo "=== AFK Andy Setup (MC Manager) ==="
 
 # Python venv + deps
-echo "[1/4] Installing Python dependencies..."
+echo "[1/3] Installing Python dependencies..."
 python3 -m venv venv
 venv/bin/pip install -r requirements.txt
 
-# Check for screen
-echo "[2/4] Checking for screen..."
-if ! command -v screen &> /dev/null; then
-    echo "Installing screen..."
-    sudo apt install -y screen
-else
-    echo "screen is installed."
-fi
-
 # Check for Java
-echo "[3/4] Checking for Java..."
+echo "[2/3] Checking for Java..."
 if ! command -v java &> /dev/null; then
     echo "Java not found. Installing OpenJDK 21..."
     sudo apt install -y openjdk-21-jre-headless
@@ -29,7 +20,7 @@ else
 fi
 
 # Paper server setup
-echo "[4/4] Setting up Paper Minecraft server..."
+echo "[3/3] Setting up Paper Minecraft server..."
 bash scripts/setup-paper.sh
 
 echo ""
@@ -0,0 +1,42 @@
+import os
+import sys
+
+# The bot's modules import each other as top-level modules (it runs from bot/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot"))
+
+import socket
+import subprocess
+
+import pytest
+
+FAKE_MC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "fake_mc.py")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def fake_mc(tmp_path):
+    """Start scripts/fake_mc.py; returns (port, password). Call with env overrides, e.g. FAKE_MC_LATENCY_MS."""
+    procs = []
+
+    def start(**env):
+        port, password = free_port(), "hunter2"
+        proc = subprocess.Popen(
+            [sys.executable, FAKE_MC, "--port", str(port), "--password", password, "--seed", "1"],
+            cwd=tmp_path, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            env={**os.environ, "FAKE_MC_BOOT_SECONDS": "0", **{k: str(v) for k, v in env.items()}},
+        )
+        procs.append(proc)
+        for line in proc.stdout:
+            if "Done (" in line:
+                return port, password
+        raise RuntimeError("fake_mc exited before it was ready")
+
+    yield start
+    for proc in procs:
+        proc.kill()
+        proc.wait()
@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+
+from backup import BackupEngine, INDEX_FILE
+
+
+def make_world(tmp_path):
+    world = tmp_path / "mc" / "world" / "region"
+    world.mkdir(parents=True)
+    (world / "r.0.0.mca").write_bytes(os.urandom(20_000))
+    (tmp_path / "mc" / "world" / "level.dat").write_bytes(b"level")
+    return tmp_path / "mc"
+
+
+def test_listing_reads_the_index_not_the_manifests(tmp_path):
+    mc = make_world(tmp_path)
+    engine = BackupEngine(str(mc), str(tmp_path / "backups"), keep=2, workers=1)
+
+    async def snapshots(n):
+        for i in range(n):
+            (mc / "world" / "level.dat").write_bytes(b"level %d" % i)
+            await engine._snapshot()
+            time.sleep(1.1)  # snapshot names have one-second resolution
+
+    asyncio.run(snapshots(3))
+    summaries = engine.list_snapshots()
+    assert len(summaries) == 2 and summaries[0]["name"] > summaries[1]["name"]
+    assert summaries[0]["file_count"] == 2 and "files" not in summaries[0]
+
+    # A stale or missing index is rebuilt from the manifests
+    os.remove(tmp_path / "backups" / "snapshots" / INDEX_FILE)
+    assert engine.list_snapshots() == summaries
+    assert engine.load_snapshot("index") is None
+    assert engine.load_snapshot(summaries[0]["name"])["files"]["world/level.dat"]["pieces"]
+
+
+def test_flush_waiter_is_released_and_adopted_server_skips_it(tmp_path, monkeypatch):
+    import pytest
+    import minecraft
+    mc = make_world(tmp_path)
+    engine = BackupEngine(str(mc), str(tmp_path / "backups"), workers=1)
+    sent = []
+
+    async def rcon(command):
+        sent.append(command)
+        if command == "save-all flush" and fail:
+            raise RuntimeError("connection lost")
+        return "Saving the game (this may take a moment!)"
+
+    monkeypatch.setattr(minecraft, "async_rcon", rcon)
+    monkeypatch.setattr(minecraft, "server_state", lambda: minecraft.READY)
+
+    fail = True
+    monkeypatch.setattr(minecraft.supervisor, "_proc", object())  # has a console
+    with pytest.raises(RuntimeError):
+        asyncio.run(engine.backup())
+    assert minecraft.supervisor._waiters == [] and sent[-1] == "save-on"
+
+    fail = False
+    monkeypatch.setattr(minecraft.supervisor, "_proc", None)  # adopted: nothing to wait on
+    started = time.monotonic()
+    assert asyncio.run(engine.backup())["changed_files"] == 2
+    assert time.monotonic() - started < 10
+
+
+def test_server_cannot_start_during_a_restore(tmp_path, monkeypatch):
+    import threading
+    import minecraft
+    mc = make_world(tmp_path)
+    engine = BackupEngine(str(mc), str(tmp_path / "backups"), workers=1)
+    gate = threading.Event()
+    restore = engine._restore
+
+    def slow_restore(snap):
+        gate.wait(5)
+        restore(snap)
+
+    monkeypatch.setattr(engine, "_restore", slow_restore)
+
+    async def run():
+        name = (await engine._snapshot())["name"]
+        task = asyncio.create_task(engine.restore(name))
+        await asyncio.sleep(0.2)
+        during = await minecraft.start_server()  # what !start and wake-on-join call
+        gate.set()
+        return during, await task
+
+    (started, why), (restored, _) = asyncio.run(run())
+    assert not started and "restore" in why
+    assert restored and minecraft.supervisor.maintenance is None
@@ -0,0 +1,49 @@
+import sys
+import json
+import asyncio
+
+from builds import BuildQueue, DONE, render_stream_json
+
+EVENTS = [
+    {"type": "system", "subtype": "init"},
+    {"type": "assistant", "message": {"content": [{"type": "text", "text": "Setting the time."},
+                                                  {"type": "tool_use", "name": "Bash",
+                                                   "input": {"command": "rcon.py time set day"}}]}},
+    {"type": "user", "message": {"content": [{"type": "tool_result", "content": "Set the time", "is_error": False}]}},
+    {"type": "result", "subtype": "success", "num_turns": 2, "total_cost_usd": 0.031, "result": "Done."},
+]
+
+
+def run_job(tmp_path, code: str, render=None):
+    async def run():
+        queue = BuildQueue(str(tmp_path))
+        seen = []
+
+        async def notify(job):
+            seen.append(job.output)
+        job = queue.submit("test", [sys.executable, "-c", code], str(tmp_path), notify=notify, render=render)
+        while not job.finished:
+            await asyncio.sleep(0.02)
+        return job
+    return asyncio.run(run())
+
+
+def test_stream_json_is_rendered(tmp_path):
+    code = "import sys, time\n" + "".join(
+        f"sys.stdout.write({json.dumps(json.dumps(e))} + '\\n'); sys.stdout.flush(); time.sleep(0.01)\n"
+        for e in EVENTS)
+    job = run_job(tmp_path, code, render=render_stream_json)
+    assert job.state == DONE
+    assert job.output == "Setting the time.\n> Bash rcon.py time set day\n[success: 2 turns, $0.03]\n"
+    with open(job.log_path) as f:
+        log = f.read().splitlines()
+    # The log has the raw events, not the rendered summary
+    assert [json.loads(line) for line in log[1:1 + len(EVENTS)]] == EVENTS
+    assert "> Bash rcon.py time set day" not in log
+
+
+def test_multibyte_across_reads(tmp_path):
+    # 4095 bytes then a 2-byte character: the first read ends mid-character
+    code = "import sys; sys.stdout.buffer.write(b'a' * 4095 + 'é'.encode() + b'\\n')"
+    job = run_job(tmp_path, code)
+    assert "�" not in job.output and job.output.endswith("aé\n")
@@ -0,0 +1,17 @@
+import socket
+import asyncio
+
+from dashboard import Dashboard
+
+
+def test_busy_port_is_logged_not_raised():
+    async def run():
+        with socket.socket() as taken:
+            taken.bind(("127.0.0.1", 0))
+            taken.listen()
+            dashboard = Dashboard(None, host="127.0.0.1", port=taken.getsockname()[1])
+            await dashboard.start()
+            assert dashboard._runner is None and dashboard._task is None
+            await dashboard.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+"""GitSync against a scratch clone of a local bare repository."""
+import os
+import asyncio
+import subprocess
+
+import pytest
+
+import utils
+
+
+def git(cwd, *args) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    logged = []
+    monkeypatch.setattr(utils, "log_task", lambda task, status, details=None: logged.append((task, status)))
+    remote = tmp_path / "remote.git"
+    work = tmp_path / "work"
+    git(tmp_path, "init", "-q", "--bare", str(remote))
+    git(tmp_path, "init", "-q", "-b", "main", str(work))
+    git(work, "config", "user.email", "bot@example.com")
+    git(work, "config", "user.name", "bot")
+    git(work, "remote", "add", "origin", str(remote))
+    (work / "README").write_text("x\n")
+    git(work, "add", "README")
+    git(work, "commit", "-q", "-m", "init")
+    git(work, "push", "-q", "origin", "main")
+    return work, remote, logged
+
+
+def once(g: utils.GitSync, message: str) -> str:
+    async def run():
+        return await g.request(message)
+    return asyncio.run(run())
+
+
+def sync(work, **kw) -> utils.GitSync:
+    kw = {"debounce": 0.2, "max_wait": 2, "backoff": 0.05, "retries": 2, **kw}
+    return utils.GitSync(str(work), remote="origin", branch="main", **kw)
+
+
+def test_burst_becomes_one_commit(repo):
+    work, remote, logged = repo
+
+    async def run():
+        g = sync(work)
+        futures = []
+        for i in range(4):
+            (work / f"f{i}").write_text(str(i))
+            futures.append(g.request(f"change {i}"))
+            await asyncio.sleep(0.05)
+        return await asyncio.gather(*futures)
+
+    results = asyncio.run(run())
+    assert len(set(results)) == 1 and results[0].startswith("Pushed")
+    subjects = git(remote, "log", "--format=%s", "main").splitlines()
+    assert subjects == ["Auto: 4 changes", "init"]
+    body = git(remote, "log", "-1", "--format=%b", "main")
+    assert all(f"- change {i}" in body for i in range(4))
+    assert logged == [("git sync: 4 changes", "pushed")]
+
+
+def test_no_changes(repo):
+    work, remote, _ = repo
+    assert once(sync(work), "nothing") == "No changes to commit."
+    assert git(remote, "rev-list", "--count", "main") == "1"
+
+
+def test_failed_push_is_retried_with_next_batch(repo):
+    work, remote, logged = repo
+    moved = remote.with_name("gone.git")
+
+    async def run():
+        g = sync(work)
+        os.rename(remote, moved)
+        (work / "a").write_text("a")
+        first = await g.request("offline")
+        os.rename(moved, remote)
+        second = await g.request("back")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert "push failed after 2 attempts" in first
+    assert second.startswith("Pushed")
+    assert git(remote, "log", "-1", "--format=%s", "main") == "Auto: offline"
+    assert [status for _, status in logged] == ["failed", "pushed"]
+
+
+def test_git_timeout(repo):
+    work, _, _ = repo
+    (work / "b").write_text("b")
+    result = once(sync(work, timeout=0.0001), "slow")
+    assert result.startswith("Git sync failed") and "timed out" in result
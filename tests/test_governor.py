@@ -0,0 +1,47 @@
+import os
+import asyncio
+
+import pytest
+
+import governor
+
+
+class FakeGovernor:
+    dry_run = False
+    hot_radius = 16
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.sent = []
+
+    async def hot_players(self):
+        return ["Steve"]
+
+    async def send(self, command):
+        self.sent.append(command)
+        return self.reply
+
+
+def test_mob_cull_leaves_no_drops():
+    rule = next(r for r in governor.default_rules() if r.name == "mobs")
+    gov = FakeGovernor("Teleported 3 entities to 0.5, -512.0, 0.5")
+    text, _ = asyncio.run(rule.apply(gov))
+    assert gov.sent and all(" run tp @e[" in c and c.endswith("~ -512 ~") for c in gov.sent)
+    assert f"culled {3 * len(gov.sent)}" in text
+
+
+def test_items_are_left_alone_unless_opted_in():
+    if {"GOVERNOR_ENABLED", "GOVERNOR_DRY_RUN", "GOVERNOR_CULL_ITEMS"} & set(os.environ):
+        pytest.skip("governor settings overridden in the environment")
+    assert "items" not in [r.name for r in governor.default_rules()]
+    assert not governor.GOVERNOR_ENABLED and governor.GOVERNOR_DRY_RUN
+
+
+def test_item_clear_spares_recent_drops():
+    rule = governor.ItemCullRule(min_age=3600)
+    gov = FakeGovernor("Killed Item")
+    text, _ = asyncio.run(rule.apply(gov))
+    setup, store, kill = gov.sent
+    assert setup == "scoreboard objectives add afk_andy_age dummy"
+    assert store.startswith("execute at Steve as @e[type=item,distance=..16] store result score @s afk_andy_age")
+    assert kill == "execute at Steve run kill @e[type=item,distance=..16,scores={afk_andy_age=3600..}]"
@@ -0,0 +1,99 @@
+"""Wake-on-join listener, driven by idle.py's own fake client."""
+import json
+import socket
+import asyncio
+
+import pytest
+
+import idle
+from minecraft import STOPPED, STARTING
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def mc_dir(tmp_path):
+    port = free_port()
+    (tmp_path / "server.properties").write_text(f"server-ip=127.0.0.1\nserver-port={port}\nwhite-list=true\n")
+    (tmp_path / "whitelist.json").write_text(json.dumps([{"uuid": "u1", "name": "Steve"}]))
+    return tmp_path, port
+
+
+class FakeSupervisor:
+    def __init__(self, mc_dir):
+        self.mc_dir = str(mc_dir)
+        self.state = STOPPED
+        self.before_start = []
+        self.on_stopped = []
+
+    async def run_before_start(self):
+        self.state = STARTING
+        for hook in self.before_start:
+            await hook()
+
+
+def test_ping_and_join(mc_dir):
+    path, port = mc_dir
+    woken = []
+
+    async def run():
+        async def on_wake(name):
+            woken.append(name)
+        server = idle.SleepingServer(str(path), on_wake, motd="zzz")
+        await server.start()
+        try:
+            status, _ = await idle.ping("127.0.0.1", port)
+            stranger = await idle.join("127.0.0.1", port, "Herobrine")
+            steve = await idle.join("127.0.0.1", port, "steve")
+            await asyncio.sleep(0.05)
+        finally:
+            await server.stop()
+        return status, stranger, steve
+
+    status, stranger, steve = asyncio.run(run())
+    assert status["description"]["text"] == "zzz"
+    assert "not whitelisted" in stranger
+    assert steve and woken == ["steve"]
+
+
+def test_restart_releases_port_before_pending_listen(mc_dir):
+    # on_stopped schedules the listener; a restart's before_start runs before that task gets to bind
+    path, port = mc_dir
+
+    async def run():
+        sup = FakeSupervisor(path)
+        manager = idle.IdleManager(poller=None, supervisor=sup, idle_minutes=0)
+        manager.start()
+        await asyncio.sleep(0.05)
+        assert manager.sleeper.listening
+        await sup.run_before_start()
+        sup.state = STOPPED
+        for hook in sup.on_stopped:
+            hook()
+        await sup.run_before_start()
+        await asyncio.sleep(0.05)
+        return manager.sleeper.listening
+
+    assert asyncio.run(run()) is False
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", port))  # what the JVM would do next
+
+
+def test_failing_before_start_hook_resets_state(tmp_path):
+    from minecraft import ServerSupervisor
+    (tmp_path / "server.jar").write_text("")
+    sup = ServerSupervisor(str(tmp_path), "server.jar", "1G")
+    stopped = []
+
+    async def broken():
+        raise OSError("port still busy")
+
+    sup.before_start.append(broken)
+    sup.on_stopped.append(lambda: stopped.append(True))
+    ok, msg = asyncio.run(sup.start())
+    assert not ok and "port still busy" in msg
+    assert sup.state == STOPPED and stopped == [True]
@@ -0,0 +1,40 @@
+import pytest
+
+from jvm import auto_heap_mb, heap_mb, build_command, JVM_PROFILE
+
+GB = 1024 ** 3
+
+
+@pytest.fixture
+def mc_dir(tmp_path):
+    (tmp_path / "server.properties").write_text("max-players=100\nview-distance=16\n")
+    return str(tmp_path)
+
+
+def test_auto_heap_respects_memory_max(mc_dir):
+    assert auto_heap_mb(mc_dir, host_mb=64 * 1024) > 8 * 1024
+    assert auto_heap_mb(mc_dir, host_mb=64 * 1024, memory_max_mb=4096) == 3072
+
+
+def test_auto_heap_splits_host_between_instances(mc_dir):
+    alone = auto_heap_mb(mc_dir, host_mb=16 * 1024)
+    shared = auto_heap_mb(mc_dir, host_mb=16 * 1024, host_share=0.5)
+    assert shared < alone and 2 * shared <= 16 * 1024 * 0.75
+
+
+def test_explicit_heap_over_limit_is_refused(mc_dir):
+    assert heap_mb("3G", mc_dir, memory_max=4 * GB) == 3072
+    with pytest.raises(ValueError):
+        heap_mb("4G", mc_dir, memory_max=4 * GB)
+
+
+def test_defaults_launch_like_before_profiles(mc_dir, monkeypatch):
+    import os
+    import jvm
+    if {"MC_RAM", "MC_JVM_PROFILE"} & set(os.environ):
+        pytest.skip("MC_RAM/MC_JVM_PROFILE overridden in the environment")
+    from minecraft import MC_RAM
+    monkeypatch.setattr(jvm, "JVM_CDS", False)
+    monkeypatch.setattr(jvm, "JVM_EXTRA", [])
+    cmd = build_command(JVM_PROFILE, mc_dir, "paper.jar", MC_RAM)
+    assert cmd == ["java", "-Xms4096M", "-Xmx4096M", "-jar", "paper.jar", "nogui"]
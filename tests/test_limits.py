@@ -0,0 +1,32 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import limits
+
+
+def test_prefix_joins_the_cgroup_then_execs_pinned(tmp_path):
+    if not shutil.which("taskset"):
+        pytest.skip("taskset not installed")
+    parent = tmp_path / "slice"
+    parent.mkdir()
+    (parent / "cgroup.subtree_control").write_text("memory\n")
+    cgroup = parent / "afk-andy-test"
+    assert limits.prepare_cgroup("test", 2 * 1024 ** 3, parent=str(parent)) == str(cgroup)
+    cpu = min(os.sched_getaffinity(0))
+    prefix = limits.command_prefix({cpu}, str(cgroup))
+    assert prefix == ["sh", "-c", limits.JOIN_CGROUP, str(cgroup), "taskset", "-c", str(cpu)]
+    assert (cgroup / "memory.max").read_text() == str(2 * 1024 ** 3)
+
+    proc = subprocess.run([*prefix, "sh", "-c", "echo $$; grep Cpus_allowed_list /proc/self/status"],
+                          capture_output=True, text=True, check=True)
+    pid, allowed = proc.stdout.split("\n")[:2]
+    assert (cgroup / "cgroup.procs").read_text().strip() == pid  # the exec'd command kept the pid
+    assert allowed.split()[-1] == str(cpu)
+
+
+def test_no_cgroup_means_no_rlimit(monkeypatch):
+    monkeypatch.setattr(limits, "prepare_cgroup", lambda name, memory_max: None)
+    assert limits.limits_for("test", set(), 2 * 1024 ** 3) == ([], "")
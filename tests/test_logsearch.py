@@ -0,0 +1,30 @@
+import os
+from datetime import datetime
+
+from logsearch import file_date, format_page
+
+
+def test_latest_log_spanning_midnight(tmp_path):
+    path = tmp_path / "latest.log"
+    path.write_text(
+        "[22:00:00] [Server thread/INFO]: Done (3.2s)!\n"
+        "[23:59:00] [Server thread/INFO]: <Alex> still up\n"
+        "[00:30:00] [Server thread/INFO]: <Alex> past midnight\n"
+    )
+    written = datetime(2026, 3, 2, 0, 30, 5).timestamp()
+    os.utime(path, (written, written))
+    assert file_date(str(path)) == datetime(2026, 3, 1)
+
+
+def test_latest_log_read_just_before_a_new_line(tmp_path):
+    path = tmp_path / "latest.log"
+    path.write_text("[23:59:58] [Server thread/INFO]: Saving\n")
+    written = datetime(2026, 3, 1, 23, 59, 58).timestamp()
+    os.utime(path, (written, written))
+    assert file_date(str(path)) == datetime(2026, 3, 1)
+
+
+def test_page_fits_in_a_discord_message():
+    matches = [(datetime(2026, 3, 1).timestamp(), "x" * 500)] * 40
+    result = {"matches": matches, "total": 999, "files": 12, "skipped": 3, "seconds": 0.5}
+    assert len(format_page(result, 1, "q" * 300)) < 2000
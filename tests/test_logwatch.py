@@ -0,0 +1,26 @@
+import asyncio
+
+from logwatch import parse_line, DiscordRelay
+
+
+class Channel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+def test_relay_cannot_ping_or_format():
+    channel = Channel()
+
+    async def run():
+        relay = DiscordRelay(lambda: channel, window=0.01)
+        relay(parse_line("[10:00:00] [Server thread/INFO]: <Cool_Guy_> @everyone look **here** <@&123>"))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    (content, kwargs), = channel.sent
+    assert "@everyone" not in content and "\\*\\*here\\*\\*" in content and "Cool\\_Guy\\_" in content
+    mentions = kwargs["allowed_mentions"]
+    assert not mentions.everyone and not mentions.roles and not mentions.users
@@ -0,0 +1,14 @@
+import socket
+import asyncio
+
+from metrics import start_exporter
+
+
+def test_busy_port_is_logged_not_raised():
+    async def run():
+        with socket.socket() as taken:
+            taken.bind(("127.0.0.1", 0))
+            taken.listen()
+            return await start_exporter(None, host="127.0.0.1", port=taken.getsockname()[1])
+
+    assert asyncio.run(run()) is None
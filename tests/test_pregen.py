@@ -0,0 +1,63 @@
+import asyncio
+
+import pregen
+import minecraft
+from pregen import PregenJob, spiral_at
+
+
+def walk(n: int):
+    """The spiral the original generator produced."""
+    x = z = 0
+    dx, dz = 0, -1
+    for _ in range(n):
+        yield x, z
+        if x == z or (x < 0 and x == -z) or (x > 0 and x == 1 - z):
+            dx, dz = -dz, dx
+        x, z = x + dx, z + dz
+
+
+def test_spiral_at_matches_walk():
+    assert [spiral_at(i) for i in range(20_000)] == list(walk(20_000))
+
+
+def test_unconfirmed_chunks_are_retried_not_marked_done(tmp_path, monkeypatch):
+    stuck = {(1 * 16 + 8, 1 * 16 + 8)}  # chunk (1, 1) never reports loaded on the first two checks
+    checks = {}
+
+    async def rcon(command):
+        if "execute if loaded" in command:
+            x, _, z = (int(v) for v in command.split()[-3:])
+            checks[(x, z)] = checks.get((x, z), 0) + 1
+            if (x, z) in stuck and checks[(x, z)] <= 2:
+                return "Test failed"
+            return "Test passed"
+        return ""
+
+    monkeypatch.setattr(minecraft, "async_rcon", rcon)
+    monkeypatch.setattr(minecraft, "server_state", lambda: minecraft.READY)
+    monkeypatch.setattr(pregen, "PREGEN_PAUSE_ON_PLAYERS", False)
+    monkeypatch.setattr(pregen, "STEP_TIMEOUT", 0.3)
+
+    job = PregenJob(str(tmp_path / "pregen.json"), poller=None, max_batch=4)
+    job.new(16, 0, 0)  # radius 1 chunk: 9 chunks
+    asyncio.run(job._run())
+    assert not job.pending
+    assert checks[(24, 24)] == 3 and job.state.get("skipped") is None
+    assert job.status().startswith("9/9")
+
+
+def test_world_spawn_from_level_dat(tmp_path):
+    import gzip
+    import struct
+    from pregen import world_spawn
+
+    def int_tag(name, value):
+        return b"\x03" + struct.pack(">H", len(name)) + name.encode() + struct.pack(">i", value)
+
+    (tmp_path / "server.properties").write_text("level-name=survival\n")
+    (tmp_path / "survival").mkdir()
+    level = b"\x0a\x00\x00" + b"\x0a\x00\x04Data" + int_tag("SpawnX", 1200) + int_tag("SpawnZ", -340) + b"\x00\x00"
+    with gzip.open(tmp_path / "survival" / "level.dat", "wb") as f:
+        f.write(level)
+    assert world_spawn(str(tmp_path)) == (1200, -340)
+    assert world_spawn(str(tmp_path / "missing")) is None
@@ -0,0 +1,70 @@
+import time
+import asyncio
+
+import pytest
+
+from rcon import RconPool, RconError, RconAuthError
+
+
+def test_batch_outlasts_the_per_command_timeout(fake_mc):
+    # 30 commands at ~200ms each take ~6s in total, past the 1s timeout; none should fail
+    port, password = fake_mc(FAKE_MC_LATENCY_MS=200, FAKE_MC_JITTER_MS=0)
+
+    async def run():
+        pool = RconPool("127.0.0.1", port, password, timeout=1.0)
+        started = time.monotonic()
+        results = await pool.batch([f"whitelist add Player{i}" for i in range(30)] + ["list"])
+        elapsed = time.monotonic() - started
+        # The pooled connections are untouched and still usable
+        listing = await pool.command("list")
+        await pool.close()
+        return results, elapsed, listing
+
+    results, elapsed, listing = asyncio.run(run())
+    assert elapsed > 5
+    assert not [r for r in results if isinstance(r, RconError)]
+    assert results[-1].startswith("There are") and listing.startswith("There are")
+
+
+def test_batch_reports_the_rest_as_not_sent_after_a_drop(fake_mc):
+    port, password = fake_mc(FAKE_MC_FAIL_RATE=1)
+
+    async def run():
+        pool = RconPool("127.0.0.1", port, password, timeout=1.0)
+        results = await pool.batch(["whitelist add A", "whitelist add B", "whitelist reload"])
+        await pool.close()
+        return results
+
+    first, *rest = asyncio.run(run())
+    assert isinstance(first, RconError)
+    assert all(isinstance(r, RconError) and "not sent" in str(r) for r in rest)
+
+
+def test_pool_routes_concurrent_replies_over_a_bounded_set_of_connections(fake_mc):
+    port, password = fake_mc()
+
+    async def run():
+        pool = RconPool("127.0.0.1", port, password, size=2, timeout=5.0)
+        # Unknown commands are echoed back, so each reply names the command it answers
+        replies = await asyncio.gather(*(pool.command(f"probe{i}") for i in range(40)))
+        opened = len(pool._live())
+        await pool.close()
+        return replies, opened
+
+    replies, opened = asyncio.run(run())
+    assert 1 <= opened <= 2
+    assert all(f"probe{i}<--[HERE]" in r for i, r in enumerate(replies))
+
+
+def test_pool_backs_off_after_a_failed_login(fake_mc):
+    port, _ = fake_mc()
+
+    async def run():
+        pool = RconPool("127.0.0.1", port, "wrong", backoff_min=30)
+        with pytest.raises(RconAuthError):
+            await pool.command("list")
+        with pytest.raises(RconError, match="retrying in"):
+            await pool.command("list")
+        await pool.close()
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+import importlib.util
+
+import minecraft
+from rcon import RconPool
+from gateway import RconGateway
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "rcon.py")
+spec = importlib.util.spec_from_file_location("rcon_cli", SCRIPT)
+rcon_cli = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rcon_cli)
+
+# 15 commands at ~200ms each take ~3s, well past the 1s timeout
+COMMANDS = [f"whitelist add Player{i}" for i in range(15)]
+
+
+def cli_args(tmp_path, port, password, direct, socket=None):
+    commands = tmp_path / "commands.txt"
+    commands.write_text("\n".join(COMMANDS) + "\n")
+    return argparse.Namespace(
+        command=[], file=str(commands), json=True, direct=direct, timeout=1.0,
+        host="127.0.0.1", port=port, password=password, socket=socket,
+    )
+
+
+def results(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_direct_batch_outlasts_the_per_command_timeout(fake_mc, tmp_path, capsys):
+    port, password = fake_mc(FAKE_MC_LATENCY_MS=200, FAKE_MC_JITTER_MS=0)
+    status = asyncio.run(rcon_cli.run(cli_args(tmp_path, port, password, direct=True)))
+    out = results(capsys)
+    assert status == 0 and [r["command"] for r in out] == COMMANDS
+    assert all(r["ok"] for r in out)
+
+
+def test_gateway_batch_runs_on_its_own_connection(fake_mc, tmp_path, capsys, monkeypatch):
+    port, password = fake_mc(FAKE_MC_LATENCY_MS=200, FAKE_MC_JITTER_MS=0)
+    socket = str(tmp_path / "rcon.sock")
+
+    async def run():
+        pool = RconPool("127.0.0.1", port, password, timeout=1.0)
+        monkeypatch.setattr(minecraft.supervisor, "rcon_pool", pool)
+        await pool.command("list")  # the bot's own connection, which the batch must leave alone
+        bot_conn = pool._live()[0]
+        gateway = RconGateway(socket)
+        await gateway.start()
+        try:
+            status = await rcon_cli.run(cli_args(tmp_path, port, password, direct=False, socket=socket))
+        finally:
+            await gateway.stop()
+        alive = not bot_conn.closed and pool._live() == [bot_conn]
+        await pool.close()
+        return status, alive
+
+    status, alive = asyncio.run(run())
+    out = results(capsys)
+    assert status == 0 and all(r["ok"] for r in out) and len(out) == len(COMMANDS)
+    assert alive
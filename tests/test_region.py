@@ -0,0 +1,42 @@
+import struct
+import zlib
+
+import region
+
+
+def write_region(path, payloads):
+    """A region file with one chunk per payload, each in its own sector."""
+    header = bytearray(2 * region.SECTOR)
+    body = b""
+    for index, payload in enumerate(payloads):
+        data = zlib.compress(payload)
+        chunk = struct.pack(">iB", len(data) + 1, 2) + data
+        chunk += b"\0" * (-len(chunk) % region.SECTOR)
+        struct.pack_into(">I", header, index * 4, ((2 + index) << 8) | (len(chunk) // region.SECTOR))
+        body += chunk
+    path.write_bytes(bytes(header) + body)
+
+
+def test_truncated_chunk_counts_as_an_error(tmp_path):
+    good = b"\x0a\x00\x00" + b"\x04\x00\x0dInhabitedTime" + struct.pack(">q", 5000) + b"\x00"
+    path = tmp_path / "r.0.0.mca"
+    write_region(path, [b"\x0a\x00\x00", good])
+    stats = region.analyze_region(str(path), max_inhabited=0)
+    assert stats["chunks"] == 2 and stats["errors"] == 1
+    assert stats["unused"] == []
+
+
+def chunk(inhabited: int, status: str) -> bytes:
+    return (b"\x0a\x00\x00"
+            + b"\x04\x00\x0dInhabitedTime" + struct.pack(">q", inhabited)
+            + b"\x08\x00\x06Status" + struct.pack(">H", len(status)) + status.encode()
+            + b"\x00")
+
+
+def test_proto_chunks_are_never_counted_as_used(tmp_path):
+    path = tmp_path / "r.0.0.mca"
+    write_region(path, [chunk(5000, "minecraft:full"), chunk(5000, "minecraft:features"), chunk(0, "minecraft:full")])
+    stats = region.analyze_region(str(path), max_inhabited=200)
+    assert stats["proto"] == 1 and sorted(stats["unused"]) == [1, 2]
+    summary = region.format_summary(region.summarize([stats]), 200)
+    assert "2 chunks visited <= 200 ticks (of which 1 only partly generated)" in summary
@@ -0,0 +1,35 @@
+import gzip
+
+from sessions import SessionStore
+
+
+def lines(*entries) -> bytes:
+    return "".join(f"[{t}] [Server thread/INFO]: {msg}\n" for t, msg in entries).encode()
+
+
+def test_truncated_archive_does_not_kill_writer(tmp_path):
+    good = tmp_path / "2026-01-01-1.log.gz"
+    good.write_bytes(gzip.compress(lines(("10:00:00", "Alex joined the game"), ("11:00:00", "Alex left the game"))))
+    bad = tmp_path / "2026-01-02-1.log.gz"
+    data = gzip.compress(lines(*[("12:00:00", "Steve joined the game")] * 200))
+    bad.write_bytes(data[:len(data) // 2])
+
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    store.backfill([(str(good), None), (str(bad), None)])
+    store.join("Notch", 1_000_000.0)
+    assert store.flush(timeout=5)
+    assert store.stats("alex")["total"] == 3600
+    assert store.last_seen("notch")[0][2] is True
+    store.close()
+
+
+def test_reconcile_ignores_changes_newer_than_snapshot(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    store.join("Alex", 100.0)
+    store.leave("Alex", 200.0)    # left after the snapshot below was taken
+    store.join("Steve", 160.0)    # joined after it
+    store.reconcile(["Alex"], 150.0)
+    assert store.flush(timeout=5)
+    assert store.stats("alex")["sessions"] == 1
+    assert store.last_seen("steve")[0][2] is True
+    store.close()
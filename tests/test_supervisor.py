@@ -0,0 +1,36 @@
+import sys
+import asyncio
+
+from minecraft import ServerSupervisor, STOPPED
+
+# Stand-in JVM: an oversized console line, a line that trips a waiter's handler, then the Done line
+SCRIPT = """
+import sys, time
+print("x" * (3 * 1024 * 1024), flush=True)
+print("boom", flush=True)
+print('[10:00:00 INFO]: Done (1.234s)! For help, type "help"', flush=True)
+time.sleep(0.2)
+"""
+
+
+class Boom:
+    def search(self, line):
+        if line == "boom":
+            raise RuntimeError("handler bug")
+
+
+def test_watcher_survives_long_lines_and_handler_errors(tmp_path, monkeypatch):
+    (tmp_path / "server.jar").write_text("")
+    sup = ServerSupervisor(str(tmp_path), "server.jar", "1G", name="test")
+    monkeypatch.setattr(sup, "java_cmd", lambda profile=None, gc_log=None: [sys.executable, "-c", SCRIPT])
+
+    async def run():
+        ok, _ = await sup.start()
+        assert ok
+        sup._waiters.append((Boom(), asyncio.get_running_loop().create_future()))
+        ready = await sup.wait_ready(10)
+        await asyncio.wait_for(sup._exited.wait(), 10)
+        return ready
+
+    assert asyncio.run(run())
+    assert sup.boot_seconds == 1.234 and sup.state == STOPPED
@@ -0,0 +1,15 @@
+import taskstore
+
+
+def test_writer_survives_rotation_failure(tmp_path, monkeypatch):
+    def boom(db):
+        raise OSError("disk full")
+
+    store = taskstore.TaskStore(str(tmp_path / "tasks.db"))
+    monkeypatch.setattr(store, "_maybe_rotate", boom)
+    store.append("first", "ok")
+    assert store.flush(timeout=2)
+    store.append("second", "ok")
+    assert store.flush(timeout=2)
+    assert sorted(r["task"] for r in store.query()) == ["first", "second"]
+    store.close()
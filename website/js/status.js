@@ -0,0 +1,58 @@
+// AFK Andy — live server status, pushed over Server-Sent Events
+const $ = (id) => document.getElementById(id);
+let latest = null;
+
+function formatDuration(seconds) {
+    const m = Math.floor(seconds / 60);
+    if (m < 60) return `${m}m`;
+    const h = Math.floor(m / 60);
+    if (h < 48) return `${h}h ${m % 60}m`;
+    return `${Math.floor(h / 24)}d ${h % 24}h`;
+}
+
+function drawSpark(canvas, values, lo, hi) {
+    const ctx = canvas.getContext('2d');
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    if (values.length < 2) return;
+    const min = Math.min(lo, ...values);
+    const max = Math.max(hi, ...values);
+    const step = canvas.width / (values.length - 1);
+    ctx.strokeStyle = getComputedStyle(document.documentElement).getPropertyValue('--accent');
+    ctx.lineWidth = 2;
+    ctx.beginPath();
+    values.forEach((v, i) => {
+        const y = canvas.height - ((v - min) / (max - min || 1)) * (canvas.height - 4) - 2;
+        if (i === 0) ctx.moveTo(0, y);
+        else ctx.lineTo(i * step, y);
+    });
+    ctx.stroke();
+}
+
+function render(s) {
+    latest = s;
+    $('status-state').textContent = s.state;
+    $('status-state').className = 'status-value status-' + s.state;
+    $('status-uptime').textContent = s.started_at
+        ? 'up ' + formatDuration(Date.now() / 1000 - s.started_at) : '';
+    $('status-count').textContent = s.max_players != null && s.state === 'ready'
+        ? `${s.players.length} / ${s.max_players}` : '—';
+    $('status-players').textContent = s.players.length ? s.players.join(', ') : (s.error || '');
+    $('status-tps').textContent = s.tps != null ? s.tps.toFixed(1) : '—';
+    $('status-mspt').textContent = s.mspt != null ? s.mspt.toFixed(1) + ' ms' : '—';
+    drawSpark($('spark-tps'), s.spark.tps, 15, 20);
+    drawSpark($('spark-mspt'), s.spark.mspt, 0, 50);
+}
+
+function tick() {
+    if (!latest) return;
+    const age = latest.checked_at ? Math.round(Date.now() / 1000 - latest.checked_at) : null;
+    $('status-updated').textContent = age != null ? `Checked ${age}s ago` : 'Waiting for the first check...';
+    if (latest.started_at) {
+        $('status-uptime').textContent = 'up ' + formatDuration(Date.now() / 1000 - latest.started_at);
+    }
+}
+
+const source = new EventSource('events');
+source.onmessage = (e) => { render(JSON.parse(e.data)); tick(); };
+source.onerror = () => { $('status-updated').textContent = 'Reconnecting...'; };
+setInterval(tick, 1000);